@@ -4,12 +4,13 @@ from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
-from utilities import retrieve_and_open_csv_files
-from preprocess import sort_reg_data_setup, set_weeks, set_days, set_final
+from utilities import read_appended_csv, retrieve_and_open_csv_files
+from preprocess import (EnrollmentCalendar, parse_dates, sort_reg_data_setup, update_first_activity,
+                        set_weeks, set_days, set_final)
 
 class DashboardPipeline:
     def __init__(self, data_path, banner_db, dashboard_setup, semester_key, 
-                 first_day_enrollment, end_enrollment, first_day_class, last_day_year):
+                 first_day_enrollment, end_enrollment, first_day_class, last_day_year=None, incremental=False):
         self.data_path = Path(data_path)
         self.banner_db = banner_db
         self.dashboard_setup = dashboard_setup
@@ -19,6 +20,69 @@ class DashboardPipeline:
         self.first_day_class = first_day_class
         self.last_day_year = last_day_year
         self.majr_desc_d = None
+        self.calendar = EnrollmentCalendar(first_day_enrollment, end_enrollment, first_day_class)
+        self.incremental = incremental
+        self.state_path = self.data_path.parent/'Files'/f'{semester_key} Dashboard State.pkl'
+        self.export_position = None
+        self.export_appended = False
+        self.state = None
+
+    def load_state(self):
+        #the state is read once and kept, since read_registration() and first_activity() both need it
+        if self.state is None:
+            self.state = (pd.read_pickle(self.state_path) if self.state_path.exists() else
+                          {'semester_key': self.semester_key, 'watermark': None, 'first_activity': None, 'export': None})
+        return self.state
+
+    def read_registration(self):
+        """
+        Returns the registration export. In incremental mode, when the export only grew since the last run, only
+        the rows appended after the part the last run read are parsed, and where this read stopped is saved with
+        the state by first_activity().
+        """
+        keyword = f'{self.semester_key} Registration'
+        csv_files = [file for file in self.data_path.iterdir() if file.suffix == '.csv' and keyword in file.name]
+        if not self.incremental or len(csv_files) != 1:
+            return retrieve_and_open_csv_files(self.data_path, keyword=keyword)
+
+        registration, self.export_position, self.export_appended = read_appended_csv(csv_files[0],
+                                                                                    self.load_state().get('export'))
+        return registration
+
+    def first_activity(self, registration):
+        """
+        Returns each student's first registration activity. In incremental mode, only the rows after the
+        watermark, the latest ACTIVITYDATE processed by the previous run, are sorted and upserted into the first
+        activities saved with it, and the new watermark and first activities are saved for the next run.
+        """
+        if not self.incremental:
+            return sort_reg_data_setup(registration)
+
+        state = self.load_state()
+        registration.columns = [col.upper() for col in registration.columns]
+        activity = parse_dates(registration['ACTIVITYDATE'])
+        if state['watermark'] is not None:
+            newer = (activity > state['watermark']).to_numpy()
+            registration, activity = registration[newer], activity[newer]
+
+        new_activity = sort_reg_data_setup(registration.copy())
+        if state['first_activity'] is not None:
+            new_activity = update_first_activity(state['first_activity'], new_activity)
+
+        #Every remaining row is newer than the watermark, so the latest of them is the new one
+        if activity.notna().any():
+            state['watermark'] = activity.max()
+        state['first_activity'] = new_activity
+        state['export'], self.export_position = self.export_position, None
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        pd.to_pickle(state, self.state_path)
+
+        return new_activity.copy()
+
+    def reset_state(self):
+        self.state_path.unlink(missing_ok=True)
+        self.export_position = None
+        self.state = None
 
     def load_major_descriptions(self):
         majr_desc = retrieve_and_open_csv_files(self.data_path, keyword='Major Description')
@@ -26,13 +90,14 @@ class DashboardPipeline:
         self.majr_desc_d['0000'] = self.majr_desc_d.pop('0')
 
     def process_current_registration(self):
-        sp25rsts = (retrieve_and_open_csv_files(self.data_path, keyword=f'{self.semester_key} Registration')
-                    .rename(columns={'StudentID': 'ID'}))
+        sp25rsts = self.read_registration().rename(columns={'StudentID': 'ID'})
         sp25stud = (retrieve_and_open_csv_files(self.data_path, keyword=f'{self.semester_key} Enrollment')
                     .rename(columns={'STDTNO': 'ID'})[['ID', 'STYP', 'MAJR']])
-        sp25 = sort_reg_data_setup(sp25rsts)
-        sp25_wks = set_weeks(sp25, self.first_day_enrollment, self.end_enrollment, self.first_day_class)
-        sp25_days = set_days(sp25_wks, self.first_day_enrollment, self.end_enrollment, self.first_day_class, self.last_day_year)
+        sp25 = self.first_activity(sp25rsts)
+        sp25_wks = set_weeks(sp25, self.first_day_enrollment, self.end_enrollment, self.first_day_class,
+                             calendar=self.calendar)
+        sp25_days = set_days(sp25_wks, self.first_day_enrollment, self.end_enrollment, self.first_day_class,
+                             calendar=self.calendar)
         sp25_final = (set_final(sp25_days, sp25stud, self.majr_desc_d)
                       .assign(TERMID=lambda df: df['TERM'].astype(str) + df['ID'])
                       [['TERM', 'ID', 'TERMID', 'PRESENT', 'WEEK', 'WEEK_NUM', 'MONTH', 'DAY',
@@ -1,6 +1,26 @@
+import calendar
 import pandas as pd
 import numpy as np
 
+#Registration statuses in the order they are kept when a student has several changes at the same time
+RSTS_ORDER = ['RE', 'RW', 'AU', 'DD', 'DW']
+
+def parse_dates(values):
+    """
+    Parameters:
+        values (pd.Series): Column of date strings.
+
+    Returns:
+        pd.Series: Returns the same as pd.to_datetime(values), parsing each distinct string only once. A student's
+                   registration changes often share a timestamp, and every row shares one of a few RSTSDATEs.
+        
+    """
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return pd.to_datetime(values)
+
+    return pd.Series(pd.to_datetime(uniques).take(codes, allow_fill = True, fill_value = pd.NaT), index = values.index, name = values.name)
+
 #Sort the registration data to fit only one student enrollment per ID
 def sort_reg_data_setup(RSTS_DF):
     """
@@ -21,32 +41,43 @@ def sort_reg_data_setup(RSTS_DF):
     rsts.columns = [i.upper() for i in rsts.columns]
 
     #Alter RSTSDATE and ACTIVITYDATE to Datetime objects
-    rsts['RSTSDATE'], rsts['ACTIVITYDATE'] = pd.to_datetime(rsts['RSTSDATE']), pd.to_datetime(rsts['ACTIVITYDATE'])
-
-    #Make dictionary for RSTS column
-    d = {'RE': 1, 'RW': 2, 'AU':3, 'DD': 4, 'DW': 5}
-
-    #For loop to tie dictionary to RSTS for sorting
-    RSTS_SORT = [d.get(i) for i in list(rsts['RSTS'])]
-
-    #Integrate new column to 'registration' dataframe
-    rsts['RSTS_SORT'] = RSTS_SORT
-
-    #sort values so that first alteration to account is captured
-    rsts = (rsts.sort_values(['ID', 'ACTIVITYDATE', 'RSTS_SORT'], ascending = True)
-                .reset_index(drop = True)
-                .groupby('ID').first() # Filter first instance of each ID
-                .reset_index()
-           )
-
-    #filter first instance of each ID
-    #rsts = rsts.groupby('ID').first().reset_index()
+    rsts['RSTSDATE'], rsts['ACTIVITYDATE'] = parse_dates(rsts['RSTSDATE']), parse_dates(rsts['ACTIVITYDATE'])
+
+    #Map RSTS to its sort order in one categorical pass. Unknown codes sort last, like a missing RSTS_SORT
+    rsts_sort = pd.Categorical(rsts['RSTS'], categories = RSTS_ORDER).codes
+    rsts_sort = np.where(rsts_sort < 0, len(RSTS_ORDER), rsts_sort)
+
+    #Missing activity dates sort last, and rows without an ID are dropped like groupby() drops them
+    activity = rsts['ACTIVITYDATE'].to_numpy(dtype = 'datetime64[ns]').view('int64')
+    activity = np.where(rsts['ACTIVITYDATE'].isna(), np.iinfo('int64').max, activity)
+    id_codes, _ = pd.factorize(rsts['ID'], sort = True)
+
+    #One stable lexsort by ID, then ACTIVITYDATE, then RSTS order, keeping the first row of each ID so
+    #the first alteration to each account is captured
+    order = np.lexsort((rsts_sort, activity, id_codes))
+    order = order[id_codes[order] >= 0]
+    sorted_ids = id_codes[order]
+    is_first = np.r_[True, sorted_ids[1:] != sorted_ids[:-1]] if len(order) else np.empty(0, dtype = bool)
+
+    columns = ['ID', 'TERM', 'RESD', 'RSTS', 'RSTSDATE', 'ACTIVITYDATE']
+    first = rsts[columns].iloc[order[is_first]].reset_index(drop = True)
+
+    #groupby().first() takes each column's first non-missing value, so a missing value in an ID's first
+    #row is filled from its later rows
+    for col in columns[1:]:
+        missing = first[col].isna().to_numpy()
+        if missing.any():
+            rows = order[np.isin(sorted_ids, sorted_ids[is_first][missing])]
+            filled = rsts[['ID', col]].iloc[rows].groupby('ID')[col].first()
+            first.loc[missing, col] = first.loc[missing, 'ID'].map(filled).to_numpy()
+
+    rsts = first
 
     #create columns for week number, day number, and month
     rsts['WEEK_NUM'], rsts['DAY_NUM'] = rsts['ACTIVITYDATE'].dt.isocalendar()['week'].astype(int),\
                                         rsts['ACTIVITYDATE'].dt.dayofyear
-    
-    rsts['MONTH'] = [i.strftime('%b') for i in rsts['ACTIVITYDATE']]
+
+    rsts['MONTH'] = np.array(calendar.month_abbr, dtype = object)[rsts['ACTIVITYDATE'].dt.month.to_numpy()]
 
     #select only necessary columns
     rsts = rsts[['ID', 'TERM', 'MONTH', 'RESD', 'RSTS', 'RSTSDATE', 'ACTIVITYDATE',
@@ -54,7 +85,115 @@ def sort_reg_data_setup(RSTS_DF):
 
     return rsts
 
-def set_weeks(df, first_wk, final_wk, start_wk):
+def update_first_activity(first_activity, new_activity):
+    """
+    Parameters:
+        first_activity (pd.DataFrame): Each student's first registration activity so far, from sort_reg_data_setup().
+        new_activity (pd.DataFrame): Registration rows newer than every row behind first_activity, ran through
+                                     sort_reg_data_setup().
+
+    Returns:
+        pd.DataFrame: Returns the same as sort_reg_data_setup() on all of the rows. A student's first activity only
+                      changes when it is their first, and a value missing from it is filled from their new rows as
+                      groupby().first() would. Only the new students' rows are inserted and only the returning
+                      students' rows are looked up, so neither frame is hashed or sorted again.
+        
+    """
+    #both frames are sorted by ID, so each new student's place among the saved ones is a binary search
+    ids, new_ids = first_activity['ID'].to_numpy(), new_activity['ID'].to_numpy()
+    places = np.searchsorted(ids, new_ids)
+    returning = places < len(ids)
+    returning[returning] = ids[places[returning]] == new_ids[returning]
+
+    #insert the students seen for the first time at their places, keeping the rows sorted by ID like groupby()
+    inserted = places[~returning]
+    if len(inserted):
+        order = np.insert(np.arange(len(ids)), inserted, np.arange(len(ids), len(ids) + len(inserted)))
+        updated = (pd.concat([first_activity, new_activity[~returning]], ignore_index = True)
+                     .take(order)
+                     .reset_index(drop = True)
+                  )
+    else:
+        updated = first_activity.reset_index(drop = True)
+
+    #fill missing values of returning students from their first new activity. A saved row moves down by the
+    #number of new students inserted before it
+    rows = places[returning] + np.searchsorted(inserted, places[returning], side = 'right')
+    for col in ['TERM', 'RESD', 'RSTS', 'RSTSDATE']:
+        missing = updated[col].iloc[rows].isna().to_numpy()
+        if missing.any():
+            updated.iloc[rows[missing], updated.columns.get_loc(col)] = new_activity[col].to_numpy()[returning][missing]
+
+    return updated
+
+def monday(dates):
+    """
+    Returns the Monday that starts the ISO week of each datetime64[D] date. Day 0, 1970-01-01, was a Thursday,
+    three days after a Monday.
+    """
+    return dates - (dates.astype(int) + 3) % 7
+
+class EnrollmentCalendar:
+    """
+    Lookup arrays of an enrollment period, built once per semester and indexed by each date's offset from
+    the Monday of the first week of enrollment.
+
+    WEEK_NUM is the number of ISO weeks from an activity's week to the week classes start, and DAY the number
+    of days from its date to the first day of class, so both count down to 0 and go negative once classes
+    have started. They are computed from the dates themselves, so enrollment periods that cross into a new
+    year, 53-week ISO years, and leap years need no special handling.
+
+    Parameters:
+        first_day (str): First day of enrollment in the format 'YYYY-MM-DD'.
+        final_day (str): Final day of enrollment in the format 'YYYY-MM-DD'.
+        start_day (str): First day of class in the format 'YYYY-MM-DD'.
+
+    """
+    def __init__(self, first_day, final_day, start_day):
+        first, final, start = [pd.Timestamp(day).to_datetime64().astype('datetime64[D]')
+                               for day in (first_day, final_day, start_day)]
+
+        #Weeks cover every day of the first and final weeks of enrollment, days only the enrollment period
+        self.origin = monday(first)
+        dates = np.arange(self.origin, monday(final) + 7)
+
+        #Each array ends with the value of dates outside the calendar, which offsets() points to with -1
+        self.week_num = np.append((monday(start) - monday(dates)) // np.timedelta64(7, 'D'), 0).astype(float)
+        self.week_num[-1] = np.nan
+        self.week = np.array(['WK ' + str(int(week)) for week in self.week_num[:-1]] + ['WK None'], dtype = object)
+
+        self.day = np.append((start - dates).astype(float), np.nan)
+        self.day[:-1][(dates < first) | (dates > final)] = np.nan
+
+    def offsets(self, dates):
+        """
+        Returns the position of each date in the lookup arrays, or -1 for dates outside them.
+        """
+        days = pd.Series(dates).to_numpy(dtype = 'datetime64[ns]').astype('datetime64[D]')
+        offsets = (days - self.origin).astype(int)
+        inside = ~np.isnat(days) & (offsets >= 0) & (offsets < len(self.day) - 1)
+
+        return np.where(inside, offsets, -1)
+
+    @staticmethod
+    def _numbers(values):
+        #Like the dictionary lookups this replaced, a column with no missing values is integer and one with
+        #missing values is float
+        return values if np.isnan(values).any() else values.astype(int)
+
+    def week_nums(self, dates):
+        return self._numbers(self.week_num[self.offsets(dates)])
+
+    def weeks(self, dates):
+        """
+        Returns the 'WK n' label of each date's week, or 'WK None' for dates outside the calendar.
+        """
+        return self.week[self.offsets(dates)]
+
+    def days(self, dates):
+        return self._numbers(self.day[self.offsets(dates)])
+
+def set_weeks(df, first_wk, final_wk, start_wk, calendar = None):
     """
     Parameters:
         df (pd.DataFrame): Dataframe of modified RSTS data pulled from Argos after it is ran through
@@ -65,44 +204,24 @@ def set_weeks(df, first_wk, final_wk, start_wk):
                         This date should be at the end of 12 weeks into the semester. Could even be
                         set after.
         start_wk (str): String of date of first week of class, denoted by the date of the first day of class.
+        calendar (EnrollmentCalendar, optional): Calendar of the semester, built from the three dates if not given.
 
     Returns:
         pd.DataFrame: Returns a dataframe in which the weeks of enrollment have been added to the 
                       RSTS dataframe.
                       
     """
-    
-    #first retrieve the start date of enrollment, end date of being able to drop,
-    #and the start date of the semester
-    first = pd.to_datetime(pd.Series([first_wk, pd.NaT]))
-    final = pd.to_datetime(pd.Series([final_wk, pd.NaT]))
-    start = pd.to_datetime(pd.Series([start_wk, pd.NaT]))
-
-    #using the dates above, isolate the week number generated by .dt for the 
-    #week number of the year for first_wk, final_wk, start_wk
-    first_wk = first.dt.isocalendar()['week'][0].astype(int)
-
-    final_wk = final.dt.isocalendar()['week'][0].astype(int)
-
-    start_wk = start.dt.isocalendar()['week'][0].astype(int)
-
-    #now we can use those numbers to create our range numbers
-    end_of_range = (final_wk + (52-first_wk)) - (final_wk - start_wk) + 1
+    if calendar is None:
+        calendar = EnrollmentCalendar(first_wk, final_wk, start_wk)
 
-    start_of_range = -(final_wk - start_wk)
-
-    #Finally we can combine those to create a dynamic week number dictionary
-    wks = dict(zip(list(range(first_wk, (52 + 1), 1)) + list(range(1, (final_wk + 1), 1)), sorted(range(start_of_range, end_of_range, 1), reverse = True)))
-
-    #apply wks dictionary to creating two new columns, the WEEK and the WEEK_NUM
-    df['WEEK'], df['WEEK_NUM'] = ['WK ' + str(wks.get(i)) for i in df['WEEK_NUM']], \
-                                 [wks.get(i) for i in df['WEEK_NUM']]
+    #map every ACTIVITYDATE to its week of the enrollment period in one lookup
+    df['WEEK'], df['WEEK_NUM'] = calendar.weeks(df['ACTIVITYDATE']), calendar.week_nums(df['ACTIVITYDATE'])
 
     df = df[['ID', 'TERM', 'MONTH', 'WEEK', 'WEEK_NUM', 'RESD', 'RSTS', 'RSTSDATE', 'ACTIVITYDATE', 'DAY_NUM']]
     
     return df
 
-def set_days(df, first_day, final_day, start_day, last_day_of_yr):
+def set_days(df, first_day, final_day, start_day, last_day_of_yr = None, calendar = None):
     """
     Parameters:
         df (pd.DataFrame): Dataframe generated by the function set_weeks().
@@ -110,34 +229,18 @@ def set_days(df, first_day, final_day, start_day, last_day_of_yr):
         final_day (str): Final day of enrollment in the format 'YYYY-MM-DD'. This date 
                          should be the same as the final_wk date in the set_weeks() function.
         start_day (str): First day of the semesteer stored in the format 'YYYY-MM-DD'.
-        last_day_of_yr (str): This is literally the last day of the calendar year. 'YYYY-12-31'
-                              The year is the only part that needs to be updated every semester.
+        last_day_of_yr (str, optional): No longer used. The calendar accounts for the length of each year.
+        calendar (EnrollmentCalendar, optional): Calendar of the semester, built from the three dates if not given.
 
     Returns:
         pd.DataFrame: Dataframe with the days of the enrollment period added. 
         
     """
-    #set the first day of enrollment period, the last day students can 
-    #drop, and the start day of classes
-    first = pd.to_datetime(pd.Series([first_day, pd.NaT]))
-    final = pd.to_datetime(pd.Series([final_day, pd.NaT]))
-    start = pd.to_datetime(pd.Series([start_day, pd.NaT]))
-    last_day_of_yr = pd.to_datetime(pd.Series([last_day_of_yr, pd.NaT]))
-
-    #harvest the numerical day of the year on which each day falls
-    first_day = first.dt.dayofyear[0].astype(int)
-    final_day = final.dt.dayofyear[0].astype(int)
-    start_day = start.dt.dayofyear[0].astype(int)
-    EOY = last_day_of_yr.dt.dayofyear[0].astype(int)
-
-    #create the start and end of the range used for the dictionary
-    end_of_range = (final_day + (EOY-first_day)) - (final_day-start_day)
-    start_of_range = -(final_day - start_day)
-
-    #create a 'days' dictionary
-    days = dict(zip(list(range(first_day, (EOY + 1), 1)) + list(range(1, (final_day + 1), 1)), sorted(range(start_of_range, (end_of_range + 1), 1), reverse = True)))
+    if calendar is None:
+        calendar = EnrollmentCalendar(first_day, final_day, start_day)
 
-    df['DAY'] = [days.get(i) for i in df['DAY_NUM']]
+    #map every ACTIVITYDATE to its day of the enrollment period in one lookup
+    df['DAY'] = calendar.days(df['ACTIVITYDATE'])
 
     df = df[['ID', 'TERM', 'MONTH', 'WEEK', 'WEEK_NUM', 'DAY', 'RESD', 'RSTS', 'RSTSDATE', 'ACTIVITYDATE']]
 
@@ -1,8 +1,9 @@
+import argparse
 from dashboard_pipeline import DashboardPipeline
 from pathlib import Path
 
 # Define a function to initialize and run the pipeline
-def main_pipeline():
+def main_pipeline(incremental=False, full_refresh=False):
     # Parameters
     DATA_PATH = Path.cwd()/'Data'
     BANNER_DB = 'SP25_STYPE.csv'
@@ -11,7 +12,6 @@ def main_pipeline():
     FIRST_DAY_ENROLLMENT = '2024-10-16'
     END_ENROLLMENT = '2025-04-30'
     FIRST_DAY_CLASS = '2025-01-21'
-    LAST_DAY_YEAR = '2024-12-31'
 
     # Initialize the pipeline
     pipeline = DashboardPipeline(
@@ -22,12 +22,23 @@ def main_pipeline():
         first_day_enrollment=FIRST_DAY_ENROLLMENT,
         end_enrollment=END_ENROLLMENT,
         first_day_class=FIRST_DAY_CLASS,
-        last_day_year=LAST_DAY_YEAR
+        incremental=incremental
     )
+
+    # Rebuild the incremental state from the whole registration export
+    if full_refresh:
+        pipeline.reset_state()
     
     # Run the pipeline
     pipeline.run_pipeline()
 
 # Ensure it can be executed directly as a script
 if __name__ == "__main__":
-    main_pipeline()
+    parser = argparse.ArgumentParser(description='Build the daily enrollment dashboard setup.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only process the registration changes after the saved watermark. Changes that arrive '
+                             'late with an earlier ACTIVITYDATE are missed until a --full-refresh.')
+    parser.add_argument('--full-refresh', action='store_true',
+                        help='Drop the saved watermark so every registration change is reprocessed.')
+    args = parser.parse_args()
+    main_pipeline(incremental=args.incremental, full_refresh=args.full_refresh)
@@ -0,0 +1,52 @@
+# bench_enrollment_calendar.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Include 'Customer Data Setup' folder in path
+SETUP_FOLDER = Path.cwd().parent / 'Customer Data Setup'
+sys.path.insert(0, str(SETUP_FOLDER))
+
+from bench_sort_reg_data import make_registration_log
+from legacy_preprocess import set_weeks as legacy_set_weeks, set_days as legacy_set_days
+from preprocess import EnrollmentCalendar, set_weeks, set_days, sort_reg_data_setup
+
+# Spring semesters as (first day of enrollment, end of enrollment, first day of class, last day of the year).
+# Enrollment for SP21 opened in 2020, an ISO year with 53 weeks, and 2020 and 2024 are leap years
+SEMESTERS = {
+    'SP21': ('2020-10-14', '2021-04-30', '2021-01-19', '2020-12-31'),
+    'SP25': ('2024-10-16', '2025-04-30', '2025-01-21', '2024-12-31'),
+    'SP26': ('2025-10-15', '2026-04-30', '2026-01-20', '2025-12-31')
+}
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the enrollment calendar against the legacy week and day dictionaries.')
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Number of registration changes per semester.')
+    args = parser.parse_args()
+
+    print(f"{'semester':>8} {'students':>9} {'legacy_s':>9} {'new_s':>7} {'speedup':>8} {'rows_differing':>15} {'same':>5}")
+    for semester, (first_day, final_day, start_day, last_day_year) in SEMESTERS.items():
+        n_days = (pd.Timestamp(final_day) - pd.Timestamp(first_day)).days + 1
+        registration = sort_reg_data_setup(make_registration_log(args.rows, first_day=first_day, n_days=n_days))
+
+        start = time.perf_counter()
+        expected = legacy_set_weeks(registration.copy(), first_day, final_day, start_day)
+        expected = legacy_set_days(expected, first_day, final_day, start_day, last_day_year)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        calendar = EnrollmentCalendar(first_day, final_day, start_day)
+        output = set_weeks(registration.copy(), first_day, final_day, start_day, calendar=calendar)
+        output = set_days(output, first_day, final_day, start_day, calendar=calendar)
+        new_s = time.perf_counter() - start
+
+        # The legacy dictionaries assume a 52-week ISO year, so they only agree with the calendar when it has one
+        differing = (output[['WEEK', 'WEEK_NUM', 'DAY']] != expected[['WEEK', 'WEEK_NUM', 'DAY']]).any(axis=1).sum()
+        print(f"{semester:>8} {len(output):>9,} {legacy_s:>9.2f} {new_s:>7.2f} {legacy_s / new_s:>7.1f}x {differing:>15,} "
+              f"{str(output.equals(expected)):>5}")
+
+if __name__ == "__main__":
+    main()
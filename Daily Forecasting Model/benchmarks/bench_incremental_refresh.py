@@ -0,0 +1,76 @@
+# bench_incremental_refresh.py
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Include 'Customer Data Setup' folder, and the folder of utilities.py it imports from, in path
+SETUP_FOLDER = Path.cwd().parent / 'Customer Data Setup'
+sys.path.insert(0, str(SETUP_FOLDER.parent))
+sys.path.insert(0, str(SETUP_FOLDER))
+
+from bench_sort_reg_data import make_registration_log
+from dashboard_pipeline import DashboardPipeline
+from preprocess import sort_reg_data_setup
+
+FIRST_DAY = '2024-10-16'
+
+def main():
+    parser = argparse.ArgumentParser(description='Time daily full refreshes of the first registration activities against '
+                                                 'incremental refreshes from the saved state and check their outputs match.')
+    parser.add_argument('--rows', type=int, default=2_000_000, help='Number of registration changes by the last day.')
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 60, 120, 200],
+                        help='Days of enrollment at which to time a refresh.')
+    parser.add_argument('--reordered', action='store_true',
+                        help="List each day's export in the synthetic log's random order rather than in the order the "
+                             'changes were made, so it is rewritten rather than appended to and the incremental refresh '
+                             'has to parse all of it.')
+    args = parser.parse_args()
+
+    registration = make_registration_log(args.rows, first_day=FIRST_DAY, n_days=max(args.days))
+    activity = pd.to_datetime(registration['ActivityDate'], format='%m/%d/%Y %H:%M:%S')
+
+    #the export lists changes in the order they were made, so each day's export appends to the previous one
+    if not args.reordered:
+        order = np.argsort(activity.to_numpy(), kind='stable')
+        registration, activity = registration.iloc[order], activity.iloc[order]
+
+    print(f"{'day':>4} {'rows':>10} {'new_rows':>9} {'students':>9} {'full_s':>7} {'incremental_s':>14} "
+          f"{'appended':>9} {'same':>5}")
+    with tempfile.TemporaryDirectory() as folder:
+        data_path = Path(folder) / 'Data'
+        data_path.mkdir()
+        export_path = data_path / '202510 Registration.csv'
+        pipeline = DashboardPipeline(data_path, None, None, '202510', FIRST_DAY, '2025-04-30', '2025-01-21',
+                                     incremental=True)
+
+        #each day's export holds every registration change up to that day, like ZREGUSR
+        for day in args.days:
+            previous = registration[activity < pd.Timestamp(FIRST_DAY) + pd.Timedelta(days=day - 1)]
+            export = registration[activity < pd.Timestamp(FIRST_DAY) + pd.Timedelta(days=day)]
+
+            #the previous day's refresh sets the watermark, the saved first activities, and the export position
+            pipeline.reset_state()
+            previous.to_csv(export_path, index=False)
+            pipeline.first_activity(pipeline.read_registration())
+            export.to_csv(export_path, index=False)
+
+            #both refreshes start from the CSV export
+            start = time.perf_counter()
+            expected = sort_reg_data_setup(pd.read_csv(export_path))
+            full_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            output = pipeline.first_activity(pipeline.read_registration())
+            incremental_s = time.perf_counter() - start
+            appended = pipeline.export_appended
+
+            print(f"{day:>4} {len(export):>10,} {len(export) - len(previous):>9,} {len(output):>9,} {full_s:>7.2f} "
+                  f"{incremental_s:>14.2f} {str(appended):>9} {str(output.equals(expected)):>5}")
+
+if __name__ == "__main__":
+    main()
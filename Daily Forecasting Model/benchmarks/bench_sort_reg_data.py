@@ -0,0 +1,84 @@
+# bench_sort_reg_data.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Include 'Customer Data Setup' folder in path
+SETUP_FOLDER = Path.cwd().parent / 'Customer Data Setup'
+sys.path.insert(0, str(SETUP_FOLDER))
+
+from legacy_preprocess import sort_reg_data_setup as legacy_sort_reg_data_setup
+from preprocess import sort_reg_data_setup
+
+def make_registration_log(n_rows, changes_per_student=4, classes_per_session=3, first_day='2024-10-16', n_days=200,
+                          seed=101):
+    """
+    Builds a synthetic ZREGUSR export with the columns and date formats sort_reg_data_setup() expects.
+
+    Each session changes several classes at the same timestamp, so the RSTS order decides which of a
+    student's first changes is kept. A few rows have an unknown RSTS code or a missing RESD.
+
+    Parameters:
+        n_rows (int): Number of registration changes.
+        changes_per_student (int): Average number of changes per student.
+        classes_per_session (int): Average number of changes per registration session.
+        first_day (str): First day of enrollment in the format 'YYYY-MM-DD'.
+        n_days (int): Number of days of activity from first_day.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: Registration log with 'StudentID' renamed to 'ID', as DashboardPipeline reads it.
+    """
+    rng = np.random.default_rng(seed)
+    n_students = max(n_rows // changes_per_student, 1)
+
+    # Students change several classes in one session, and each session's changes share a timestamp
+    n_sessions = max(n_rows // classes_per_session, 1)
+    session = rng.integers(0, n_sessions, n_rows)
+    start = pd.Timestamp(first_day).value // 1_000_000_000
+    seconds = start + rng.integers(0, n_days * 24 * 60 * 60, n_sessions)
+    activity = pd.to_datetime(seconds[session], unit='s')
+
+    rsts = pd.DataFrame({
+        'ID': pd.Series(rng.integers(0, n_students, n_sessions)[session]).map('@{:08d}'.format),
+        'Term': 202510,
+        'Resd': rng.choice(['I', 'O', 'R', 'Z'], n_rows),
+        'Rsts': rng.choice(['RE', 'RW', 'AU', 'DD', 'DW', 'WL'], n_rows, p=[0.5, 0.2, 0.05, 0.1, 0.14, 0.01]),
+        'RstsDate': activity.strftime('%m/%d/%Y'),
+        'ActivityDate': activity.strftime('%m/%d/%Y %H:%M:%S'),
+        'Crn': rng.integers(10000, 20000, n_rows)
+    })
+    rsts.loc[rng.random(n_rows) < 0.001, 'Resd'] = np.nan
+
+    return rsts
+
+def main():
+    parser = argparse.ArgumentParser(description='Time sort_reg_data_setup() against its legacy version and check their outputs match.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000],
+                        help='Numbers of registration changes.')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'students':>9} {'legacy_s':>9} {'new_s':>7} {'speedup':>8} {'same':>5}")
+    for n_rows in args.sizes:
+        registration = make_registration_log(n_rows)
+
+        # Both versions modify their input, so each gets its own copy
+        legacy_input, new_input = registration.copy(), registration.copy()
+        start = time.perf_counter()
+        expected = legacy_sort_reg_data_setup(legacy_input)
+        legacy_s = time.perf_counter() - start
+        del legacy_input
+
+        start = time.perf_counter()
+        output = sort_reg_data_setup(new_input)
+        new_s = time.perf_counter() - start
+
+        print(f"{n_rows:>10,} {len(output):>9,} {legacy_s:>9.2f} {new_s:>7.2f} {legacy_s / new_s:>7.1f}x "
+              f"{str(output.equals(expected)):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import hashlib
+import io
 import os
 import pandas as pd
 
@@ -30,3 +32,50 @@ def retrieve_and_open_csv_files(folder_path, keyword=None):
         dataframes = pd.read_csv(csv_files[0])
 
     return dataframes
+
+def read_appended_csv(file_path, position=None, block_size=1 << 24):
+    """
+    Reads only the rows appended to a CSV file since an earlier read, for exports that grow between runs.
+
+    The bytes up to where the earlier read stopped are hashed and compared with its digest, so a file that
+    was rewritten rather than appended to is detected and read in full. Hashing them is much cheaper than
+    parsing them, but it still reads the whole file.
+
+    Parameters:
+        file_path (str or Path): Path to the CSV file.
+        position (dict, optional): Position returned by the earlier read. The whole file is read when it is None.
+        block_size (int): Number of bytes hashed at a time.
+
+    Returns:
+        pd.DataFrame: The rows after position if the file only grew since, otherwise every row.
+        dict: Position of this read, i.e. its end offset, the digest of the bytes before it, and the header.
+        bool: Whether only the appended rows were read.
+    """
+    digest = hashlib.sha256()
+    appended = False
+    with open(file_path, 'rb') as f:
+        if position is not None and os.fstat(f.fileno()).st_size >= position['offset']:
+            remaining = position['offset']
+            while remaining > 0:
+                block = f.read(min(block_size, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+            appended = remaining == 0 and digest.hexdigest() == position['digest']
+        if not appended:
+            f.seek(0)
+            digest = hashlib.sha256()
+        data = f.read()
+
+    digest.update(data)
+    offset = (position['offset'] if appended else 0) + len(data)
+    if not appended:
+        rows = pd.read_csv(io.BytesIO(data))
+        columns = list(rows.columns)
+    else:
+        columns = position['columns']
+        rows = (pd.read_csv(io.BytesIO(data), header=None, names=columns) if data.strip()
+                else pd.DataFrame(columns=columns))
+
+    return rows, {'offset': offset, 'digest': digest.hexdigest(), 'columns': columns}, appended
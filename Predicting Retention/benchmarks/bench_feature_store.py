@@ -0,0 +1,87 @@
+# bench_feature_store.py
+import argparse
+import copy
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from csv_schemas import CSV_SCHEMAS
+from data_cleaning import (
+    load_csv_files, record_retention, remove_missing_gpa,
+    combine_enrolled_and_gpa, clean_demographic_data, online_classes, pell_grant_cleansing, hs_matriculation_feature,
+    enrolled_gpa_store, clean_demographic_store, online_classes_store, pell_grant_store, hs_matriculation_store,
+    materialize_training_data
+)
+from synthetic_data import make_extracts, write_extracts
+
+def merge_chain(enrolled, gpa, pell, crhr, hs):
+    """
+    The merge steps as they ran before the feature store, each one copying the whole frame.
+    """
+    X = combine_enrolled_and_gpa(enrolled, gpa)
+    X = clean_demographic_data(X)
+    X = online_classes(crhr, X)
+    X = pell_grant_cleansing(pell, X)
+    return hs_matriculation_feature(hs, X)
+
+def store_chain(enrolled, gpa, pell, crhr, hs):
+    """
+    The same steps on a feature store, materialized once at the end. 'id' keeps the enrollment data's string
+    dtype, where the merges turned it into object.
+    """
+    store = enrolled_gpa_store(enrolled, gpa)
+    store = clean_demographic_store(store)
+    store = online_classes_store(crhr, store)
+    store = pell_grant_store(pell, store)
+    store = hs_matriculation_store(hs, store)
+    return materialize_training_data(store)
+
+def measure(chain, sources):
+    """
+    Returns the chain's output, its seconds, and its tracemalloc peak in MB. Each run gets its own copy of the
+    sources, since some steps modify them.
+    """
+    inputs = copy.deepcopy(sources)
+    start = time.perf_counter()
+    output = chain(*inputs)
+    seconds = time.perf_counter() - start
+
+    inputs = copy.deepcopy(sources)
+    tracemalloc.start()
+    chain(*inputs)
+    peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+
+    return output, seconds, peak_mb
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the merge steps on wide frames against the feature store.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Numbers of synthetic students.')
+    args = parser.parse_args()
+
+    print(f"{'students':>10} {'rows':>10} {'merge_s':>8} {'store_s':>8} {'merge_peak_mb':>14} {'store_peak_mb':>14} {'same':>5}")
+    for n_students in args.sizes:
+        extracts = make_extracts(n_students)
+        with tempfile.TemporaryDirectory() as folder:
+            folders = write_extracts(folder, extracts)
+            loaded = {schema: load_csv_files(folders[key], schema=CSV_SCHEMAS[schema]) for schema, key in
+                      [('enrollment', 'enrollment_folder'), ('gpa', 'gpa_folder'), ('pell', 'pell_folder'),
+                       ('location', 'online_folder'), ('high_school', 'high_school_folder')]}
+
+        enrolled = remove_missing_gpa(record_retention(loaded['enrollment'], extracts['semesters'], extracts['years']))
+        sources = (enrolled, loaded['gpa'], loaded['pell'], loaded['location'], loaded['high_school'])
+
+        merged, merge_s, merge_peak = measure(merge_chain, sources)
+        stored, store_s, store_peak = measure(store_chain, sources)
+        print(f"{n_students:>10,} {len(stored):>10,} {merge_s:>8.3f} {store_s:>8.3f} {merge_peak:>14.1f} "
+              f"{store_peak:>14.1f} {str(merged.equals(stored.astype({'id': object}))):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# bench_fold_matrices.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import GridSearchCV, StratifiedKFold, train_test_split
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from encoding import fit_encoding_tables, apply_encoding_tables
+from model_search import booster_params, cached_grid_search, expand_grid, fold_matrices
+from bench_model_search import SMALL_PARAMS, make_training_rows
+
+def time_per_fit(X, y, folds, candidate, n_rounds, repeat):
+    """
+    Returns the mean seconds per fit of XGBClassifier.fit() on the fold's dataframe, of xgb.train() on
+    a fold matrix that was already built, and of building the fold matrices.
+    """
+    train_idx, _ = folds[0]
+    X_fold, y_fold = X.iloc[train_idx], y.iloc[train_idx]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        xgb.XGBClassifier(objective='binary:logistic', seed=101, n_estimators=n_rounds, **candidate).fit(X_fold, y_fold)
+    dataframe_s = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    dtrain = fold_matrices(X, y, folds[:1])[0][0]
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        xgb.train(booster_params(candidate), dtrain, num_boost_round=n_rounds)
+    cached_s = (time.perf_counter() - start) / repeat
+
+    return dataframe_s, cached_s, build_s
+
+def main():
+    parser = argparse.ArgumentParser(description='Time fits on reused quantized fold matrices against fits on the dataframe.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--rounds', type=int, default=100, help='Boosting rounds of each timed fit.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--search-rows', type=int, default=10_000,
+                        help='Rows of the GridSearchCV comparison on SMALL_PARAMS. 0 skips it.')
+    args = parser.parse_args()
+
+    candidate = {'max_depth': 4, 'learning_rate': 0.1, 'colsample_bytree': 0.8, 'subsample': 0.8}
+    print(f"{'rows':>10} {'dataframe_fit_s':>16} {'cached_fit_s':>13} {'saved_per_fit_s':>16} {'build_once_s':>13}")
+    for n_rows in args.rows:
+        df = make_training_rows(n_rows)
+        X, y = df.drop('enrolled', axis=1), df['enrolled']
+        X = apply_encoding_tables(X, fit_encoding_tables(X, [col for col in X.columns if X[col].dtype == object]))
+        folds = list(StratifiedKFold(n_splits=5).split(X, y))
+
+        dataframe_s, cached_s, build_s = time_per_fit(X, y, folds, candidate, args.rounds, args.repeat)
+        print(f"{n_rows:>10,} {dataframe_s:>16.3f} {cached_s:>13.3f} {dataframe_s - cached_s:>16.3f} {build_s:>13.3f}")
+
+    if args.search_rows:
+        # Same split and encoding as train_xgboost_model()
+        df = make_training_rows(args.search_rows)
+        X_train, _, y_train, _ = train_test_split(df.drop('enrolled', axis=1), df['enrolled'], test_size=0.2, random_state=101)
+        X_train = apply_encoding_tables(X_train, fit_encoding_tables(X_train, [col for col in X_train.columns
+                                                                              if X_train[col].dtype == object]))
+
+        start = time.perf_counter()
+        grid_search = GridSearchCV(xgb.XGBClassifier(objective='binary:logistic', seed=101), param_grid=SMALL_PARAMS,
+                                   cv=5, n_jobs=-1, scoring='accuracy').fit(X_train, y_train)
+        grid_s = time.perf_counter() - start
+        best_params, report = cached_grid_search(X_train, y_train, SMALL_PARAMS, cv=5)
+
+        print(f"\nGridSearchCV: {len(expand_grid(SMALL_PARAMS)) * 5} fits in {grid_s:.1f} s, best {grid_search.best_params_}")
+        print(f"cached_grid_search: {report['fits']} fits in {report['seconds']:.1f} s, best {best_params}")
+        print(f"Same parameters: {best_params == grid_search.best_params_}, "
+              f"same CV accuracy: {np.isclose(report['cv_accuracy'], grid_search.best_score_)}")
+
+if __name__ == "__main__":
+    main()
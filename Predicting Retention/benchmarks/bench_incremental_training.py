@@ -0,0 +1,86 @@
+# bench_incremental_training.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import train_test_split
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from bench_model_search import make_training_rows
+from encoding import fit_encoding_tables, apply_encoding_tables, make_model_bundle
+from incremental_training import GUARDRAIL_METRICS, holdout_metrics, incremental_update, split_new_terms
+from model_parameters import INCREMENTAL_OPTIONS
+
+# Parameters of the full retrain, in the range the grid search picks from
+BEST_PARAMS = {'max_depth': 4, 'learning_rate': 0.1, 'n_estimators': 500, 'colsample_bytree': 0.8, 'subsample': 0.8}
+
+def full_retrain(data, response='enrolled'):
+    """
+    Refits BEST_PARAMS on every term, the step run_training.py runs after its search, and returns the bundle.
+    """
+    X = data.drop([response, 'term'], axis=1)
+    cat_cols = [col for col in X.columns if X[col].dtype.name in ('object', 'category')]
+    encoders = fit_encoding_tables(X, cat_cols)
+
+    model = xgb.XGBClassifier(objective='binary:logistic', seed=101, **BEST_PARAMS)
+    model.fit(apply_encoding_tables(X, encoders), data[response])
+
+    return make_model_bundle(model, X.columns, encoders, terms=data['term'].unique())
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a full retrain with a warm-started update on the newest term.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 500_000], help='Numbers of synthetic rows.')
+    parser.add_argument('--terms', type=int, default=5, help='Number of terms the rows are spread over.')
+    parser.add_argument('--extra-rounds', type=int, default=INCREMENTAL_OPTIONS['extra_rounds'],
+                        help='Boosting rounds added by the update.')
+    parser.add_argument('--online-retention', type=float, default=None,
+                        help='Retention rate of fully online students in the newest term, to shift it away from the '
+                             'earlier terms. Defaults to no shift.')
+    args = parser.parse_args()
+
+    options = {**INCREMENTAL_OPTIONS, 'extra_rounds': args.extra_rounds}
+    print(f"{'rows':>10} {'new_rows':>9} {'retrain_s':>10} {'update_s':>9} {'speedup':>8} "
+          + ' '.join(f"{'retrain_' + metric:>16} {'deployed_' + metric:>17}" for metric in GUARDRAIL_METRICS)
+          + f" {'accepted':>9}")
+    for n_rows in args.sizes:
+        data = make_training_rows(n_rows)
+        data['term'] = np.sort(np.random.default_rng(101).integers(0, args.terms, n_rows)) * 100 + 201980
+        if args.online_retention is not None:
+            shifted = (data['term'] == data['term'].max()) & (data['fully_online'] == 'Fully Online')
+            data.loc[shifted, 'enrolled'] = (np.random.default_rng(7).random(shifted.sum()) < args.online_retention).astype(int)
+        old, new, _ = split_new_terms(data)
+
+        # Hold back part of the newest term that neither model trains on
+        new, holdout = train_test_split(new, test_size=0.2, stratify=new['enrolled'], random_state=7)
+
+        # Model deployed before the newest term was labelled
+        saved = full_retrain(old)
+
+        start = time.perf_counter()
+        updated, report = incremental_update(data.loc[old.index.union(new.index)], saved, **options)
+        update_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        retrained = full_retrain(data.loc[old.index.union(new.index)])
+        retrain_s = time.perf_counter() - start
+
+        # Score both on the held back rows. The deployed model is the update if the guardrail accepted it
+        X_holdout = holdout.drop(['enrolled', 'term'], axis=1)
+        retrain_metrics = holdout_metrics(retrained['model'], apply_encoding_tables(X_holdout, retrained['encoders']),
+                                          holdout['enrolled'])
+        deployed_metrics = holdout_metrics((updated or saved)['model'],
+                                         apply_encoding_tables(X_holdout, saved['encoders']), holdout['enrolled'])
+        print(f"{n_rows:>10,} {len(new):>9,} {retrain_s:>10.2f} {update_s:>9.2f} {retrain_s / update_s:>7.1f}x "
+              + ' '.join(f"{retrain_metrics[metric]:>16.4f} {deployed_metrics[metric]:>17.4f}" for metric in GUARDRAIL_METRICS)
+              + f" {str(report['accepted']):>9}")
+        if not report['accepted']:
+            print(f"    {report['reason']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench_lazy_backend.py
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from csv_cache import CSVCache
+from csv_schemas import CSV_SCHEMAS
+from data_cleaning import load_csv_files
+from lazy_backend import compare_outputs, lazy_training_data
+from main_pipeline import build_pipeline
+from synthetic_data import make_extracts, write_extracts
+
+# Ways of building the dataset, each timed in its own process
+BACKENDS = ['pandas', 'duckdb', 'duckdb_parquet']
+
+# Source folder of each schema, keyed like main_pipeline.main()'s config
+SOURCES = [('enrollment', 'enrollment_folder'), ('gpa', 'gpa_folder'), ('pell', 'pell_folder'),
+           ('location', 'online_folder'), ('high_school', 'high_school_folder')]
+
+def reset_peak_memory():
+    """
+    Resets this process's peak resident memory on Linux. A child's ru_maxrss starts at its parent's peak,
+    so the peak is reset after startup and read back from VmHWM instead.
+    """
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        pass
+
+def peak_memory_mb():
+    """
+    Returns the peak resident memory since reset_peak_memory() in MB, or ru_maxrss where /proc is missing.
+    """
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def run_backend(backend, root, semesters, output, memory_limit=None):
+    """
+    Builds the training dataset from the extracts under root with one backend, writes it to output, and
+    returns its seconds and the process's peak resident memory. Runs in its own process, with its peak reset
+    first, so the peaks of the backends do not mix. 'duckdb_parquet' streams the dataset to a Parquet file without loading it in pandas.
+    """
+    folders = {key: Path(folder) for key, folder in json.loads((Path(root) / 'folders.json').read_text()).items()}
+    cache = CSVCache(Path(root) / 'cache')
+
+    reset_peak_memory()
+    start = time.perf_counter()
+    if backend == 'duckdb_parquet':
+        lazy_training_data(folders, semesters, cache, output_path=output, memory_limit=memory_limit,
+                           temp_directory=Path(root) / 'spill')
+        seconds = time.perf_counter() - start
+        return {'seconds': seconds, 'peak_mb': peak_memory_mb()}
+    elif backend == 'duckdb':
+        dataset = lazy_training_data(folders, semesters, cache, memory_limit=memory_limit,
+                                     temp_directory=Path(root) / 'spill')
+    else:
+        loaded = {schema: load_csv_files(folders[key], schema=CSV_SCHEMAS[schema], cache=cache) for schema, key in SOURCES}
+        pipeline = build_pipeline(semesters, None, loaded['gpa'], loaded['pell'], loaded['location'], loaded['high_school'])
+        dataset = pipeline.fit_transform(loaded['enrollment'])
+    seconds = time.perf_counter() - start
+    dataset.to_pickle(output)
+
+    return {'seconds': seconds, 'peak_mb': peak_memory_mb()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the duckdb backend with the pandas pipeline and check their outputs match.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Numbers of synthetic students.')
+    parser.add_argument('--memory-limit', default='2GB', help="DuckDB memory limit.")
+    parser.add_argument('--missing-ages', type=float, default=0.01,
+                        help="Share of enrollment rows with a blank AGE, which both backends must fill with 'Not Enrolled'.")
+    parser.add_argument('--run', choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument('--root', help=argparse.SUPPRESS)
+    parser.add_argument('--semesters', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process running one backend
+    if args.run:
+        result = run_backend(args.run, args.root, args.semesters, Path(args.root) / f'{args.run}.out', args.memory_limit)
+        print(json.dumps(result))
+        return
+
+    print(f"{'students':>10} {'rows':>10} {'backend':>15} {'seconds':>8} {'peak_mb':>8} {'parity':>7}")
+    for n_students in args.sizes:
+        extracts = make_extracts(n_students, missing_ages=args.missing_ages)
+        with tempfile.TemporaryDirectory() as root:
+            folders = write_extracts(root, extracts)
+            semesters = extracts['semesters']
+            del extracts
+            (Path(root) / 'folders.json').write_text(json.dumps({key: str(folder) for key, folder in folders.items()}))
+
+            # Parse every CSV into the Parquet cache first, so both backends start from the cached extracts
+            cache = CSVCache(Path(root) / 'cache')
+            for schema, key in SOURCES:
+                load_csv_files(folders[key], schema=CSV_SCHEMAS[schema], cache=cache)
+
+            results = {}
+            for backend in BACKENDS:
+                command = [sys.executable, __file__, '--run', backend, '--root', root, '--semesters', *semesters]
+                if args.memory_limit:
+                    command += ['--memory-limit', args.memory_limit]
+                child = subprocess.run(command, capture_output=True, text=True, check=True)
+                results[backend] = json.loads(child.stdout.strip().splitlines()[-1])
+
+            expected = pd.read_pickle(Path(root) / 'pandas.out')
+            outputs = {'pandas': expected, 'duckdb': pd.read_pickle(Path(root) / 'duckdb.out'),
+                       'duckdb_parquet': pd.read_parquet(Path(root) / 'duckdb_parquet.out')}
+            for backend in BACKENDS:
+                differences = compare_outputs(expected, outputs[backend])
+                print(f"{n_students:>10,} {len(outputs[backend]):>10,} {backend:>15} {results[backend]['seconds']:>8.2f} "
+                      f"{results[backend]['peak_mb']:>8.1f} {str(not differences):>7}")
+                for difference in differences:
+                    print(f"    {difference}")
+
+if __name__ == "__main__":
+    main()
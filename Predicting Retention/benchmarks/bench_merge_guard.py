@@ -0,0 +1,76 @@
+# bench_merge_guard.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from merge_guard import guarded_merge
+
+def make_frames(n_rows, seed=101):
+    """
+    Returns an enrollment-like left frame with unique (id, term) keys in shuffled order, and a right frame
+    with one feature row for most of those keys.
+    """
+    rng = np.random.default_rng(seed)
+    terms = np.array([201980, 202080, 202180, 202280])
+    left = pd.DataFrame({
+        'id': np.char.add('@', np.char.zfill((np.arange(n_rows) // len(terms)).astype(str), 8)),
+        'term': np.tile(terms, n_rows // len(terms) + 1)[:n_rows],
+        'totcr': rng.integers(3, 19, n_rows)
+    }).sample(frac=1, random_state=seed).reset_index(drop=True)
+    right = left[['id', 'term']].sample(frac=0.9, random_state=seed).assign(feature=1)
+
+    return left, right
+
+def sort_and_compare(left, right):
+    """
+    The validation hs_matriculation_feature() used to run: merge, drop duplicate keys, then sort both key frames.
+    """
+    merged = left.merge(right, how='left', on=['id', 'term']).drop_duplicates(subset=['id', 'term'])
+    df1 = left[['term', 'id']].sort_values(by=['term', 'id']).reset_index(drop=True)
+    df2 = merged[['term', 'id']].sort_values(by=['term', 'id']).reset_index(drop=True)
+    if not df1.equals(df2):
+        raise ValueError("The DataFrames are different after the merge. Check the merging logic.")
+
+    return merged
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the merge guard against the sort-and-compare merge validation.')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'merge_s':>9} {'sort_compare_s':>15} {'guarded_s':>10} {'same_output':>12}")
+    for n_rows in args.rows:
+        left, right = make_frames(n_rows)
+        merge_s = best_of(lambda: left.merge(right, how='left', on=['id', 'term']), args.repeat)
+        sort_s = best_of(lambda: sort_and_compare(left, right), args.repeat)
+        guard_s = best_of(lambda: guarded_merge(left, right, on=['id', 'term'], cardinality='many_to_one'), args.repeat)
+        same = sort_and_compare(left, right).equals(guarded_merge(left, right, on=['id', 'term']))
+        print(f"{n_rows:>10,} {merge_s:>9.3f} {sort_s:>15.3f} {guard_s:>10.3f} {str(same):>12}")
+
+    # Show the report of a merge that would fan out
+    left, right = make_frames(10_000)
+    try:
+        guarded_merge(left, pd.concat([right, right.head(3)]), on=['id', 'term'])
+    except ValueError as error:
+        print(f"\nFan-out report:\n{error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# bench_model_search.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import GridSearchCV, train_test_split
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from data_preparation import load_and_prepare_data
+from encoding import fit_encoding_tables, apply_encoding_tables
+from model_parameters import PARAMS, HALVING_OPTIONS
+from model_search import expand_grid, successive_halving_search
+
+# Smaller grid for a quick comparison, with the same shape as PARAMS
+SMALL_PARAMS = {
+    'max_depth': [3, 5],
+    'learning_rate': [0.1, 0.01],
+    'n_estimators': [100, 300],
+    'colsample_bytree': [0.8],
+    'subsample': [0.8]
+}
+
+def make_training_rows(n_rows, seed=101):
+    """
+    Builds synthetic students whose enrollment depends on their GPA, credit hours and Pell status,
+    so the searches have a signal to find.
+
+    Parameters:
+        n_rows (int): Number of students.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: Features in the shape returned by load_and_prepare_data(), with 'enrolled'.
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'stype': rng.choice(['C', 'F', 'T', 'N'], n_rows),
+        'gender': rng.choice(['F', 'M'], n_rows),
+        'ethn_desc': rng.choice(['White', 'Hispanic', 'Black', 'Asian', 'Missing'], n_rows),
+        'resd': rng.choice(['I', 'O', 'R'], n_rows),
+        'fully_online': rng.choice(['Fully Online', 'Not Fully Online'], n_rows, p=[0.2, 0.8]),
+        'acd_std_desc': rng.choice(['Good Standing', 'Academic Warning', 'Academic Probation'], n_rows, p=[0.8, 0.15, 0.05]),
+        'age': rng.integers(17, 60, n_rows),
+        'term_att_crhr': rng.integers(1, 19, n_rows),
+        'term_gpa': rng.uniform(0, 4, n_rows).round(2),
+        'inst_gpa': rng.uniform(0, 4, n_rows).round(2),
+        'inst_earned': rng.integers(0, 90, n_rows),
+        'pell': rng.integers(0, 2, n_rows),
+        'subsidized': rng.integers(0, 2, n_rows),
+        'unsubsidized': rng.integers(0, 2, n_rows),
+        'summer_plus': rng.integers(0, 2, n_rows),
+        'kansas_promise': rng.integers(0, 2, n_rows),
+        'all_fafsa': rng.integers(0, 2, n_rows),
+        'hs_matriculation': rng.choice(['Matriculated from HS', 'Not From HS'], n_rows)
+    })
+    df['term_earn_crhr'] = np.minimum(df['term_att_crhr'], rng.integers(0, 19, n_rows))
+    df['no_pell'] = 1 - df['pell']
+
+    logit = (1.2 * (df['term_gpa'] - 2) + 0.08 * (df['term_att_crhr'] - 9) + 0.5 * df['pell']
+             - 0.8 * (df['acd_std_desc'] != 'Good Standing') - 0.4 * (df['fully_online'] == 'Fully Online'))
+    df['enrolled'] = (rng.random(n_rows) < 1 / (1 + np.exp(-logit))).astype(int)
+
+    return df
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the exhaustive grid search with the successive halving search.')
+    parser.add_argument('--data-path', type=Path, default=None,
+                        help='Cleaned dataset to train on. Defaults to synthetic students.')
+    parser.add_argument('--rows', type=int, default=20_000, help='Number of synthetic students.')
+    parser.add_argument('--grid', choices=['small', 'full'], default='small',
+                        help='SMALL_PARAMS for a quick run, or model_parameters.PARAMS.')
+    parser.add_argument('--skip-grid', action='store_true', help='Only run the halving search.')
+    parser.add_argument('--max-seconds', type=float, default=HALVING_OPTIONS['max_seconds'])
+    parser.add_argument('--max-fits', type=int, default=HALVING_OPTIONS['max_fits'])
+    args = parser.parse_args()
+
+    df = load_and_prepare_data(args.data_path) if args.data_path else make_training_rows(args.rows)
+    params = PARAMS if args.grid == 'full' else SMALL_PARAMS
+
+    # Same split and encoding as train_xgboost_model()
+    X = df.drop('enrolled', axis=1)
+    y = df['enrolled']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=101)
+    cat_cols = [col for col in X_train.columns if X_train[col].dtype.name in ('object', 'category')]
+    encoders = fit_encoding_tables(X_train, cat_cols)
+    X_train, X_test = apply_encoding_tables(X_train, encoders), apply_encoding_tables(X_test, encoders)
+
+    results = []
+    if not args.skip_grid:
+        start = time.perf_counter()
+        grid_search = GridSearchCV(xgb.XGBClassifier(objective='binary:logistic', seed=101), param_grid=params,
+                                   cv=5, n_jobs=-1, scoring='accuracy')
+        grid_search.fit(X_train, y_train)
+        grid_s = time.perf_counter() - start
+        grid_accuracy = accuracy_score(y_test, grid_search.best_estimator_.predict(X_test))
+        results.append(('grid', len(expand_grid(params)) * 5, grid_s, grid_accuracy, grid_search.best_params_))
+
+    options = {**HALVING_OPTIONS, 'max_seconds': args.max_seconds, 'max_fits': args.max_fits}
+    start = time.perf_counter()
+    best_params, report = successive_halving_search(X_train, y_train, params, **options)
+    model = xgb.XGBClassifier(objective='binary:logistic', seed=101, **best_params).fit(X_train, y_train)
+    halving_s = time.perf_counter() - start
+    results.append(('halving', report['fits'] + 1, halving_s, accuracy_score(y_test, model.predict(X_test)), best_params))
+
+    print(f"{len(X_train):,} training rows, {len(expand_grid(params))} grid points")
+    print(f"{'search':>8} {'fits':>6} {'seconds':>9} {'test_accuracy':>14}  params")
+    for search, fits, seconds, accuracy, best in results:
+        print(f"{search:>8} {fits:>6} {seconds:>9.1f} {accuracy:>14.4f}  {best}")
+
+if __name__ == "__main__":
+    main()
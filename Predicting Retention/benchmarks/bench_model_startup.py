@@ -0,0 +1,123 @@
+# bench_model_startup.py
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+# Each child process starts cold, loads the model one way and scores a single student
+PICKLE_PATH = """
+from prediction import load_model_bundle, preprocess_data, predict, CAT_FEATURES
+bundle = load_model_bundle(model_path)
+features = bundle['features']
+student = pd.DataFrame([row], columns=features)
+predict(bundle['model'], preprocess_data(student, features, CAT_FEATURES, bundle['encoders']))
+"""
+
+NATIVE_PATH = """
+from native_model import load_native_model
+model = load_native_model(model_path)
+student = pd.DataFrame([row], columns=model.features)
+model.predict(student)
+"""
+
+CHILD = """
+import time
+start = time.perf_counter()
+import sys, json
+sys.path.insert(0, {scripts!r})
+import pandas as pd
+model_path, row = {model_path!r}, json.loads({row!r})
+{body}
+print(json.dumps({{'first_prediction_s': time.perf_counter() - start, 'modules': len(sys.modules)}}))
+"""
+
+def build_throwaway_model(folder, n_rows=5_000, seed=101):
+    """
+    Trains a small model on synthetic features and saves it in both formats, for running the
+    benchmark without the training data.
+
+    Parameters:
+        folder (Path): Folder the pickle, booster and metadata are saved in.
+        n_rows (int): Number of synthetic students.
+        seed (int): Random seed.
+
+    Returns:
+        Path: Path of the pickled bundle.
+    """
+    import joblib
+    import numpy as np
+    import pandas as pd
+    import xgboost as xgb
+
+    from encoding import fit_encoding_tables, apply_encoding_tables, make_model_bundle
+    from native_model import save_native_model
+    from prediction import MODEL_FEATURES, CAT_FEATURES
+
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({col: rng.choice(['A', 'B', 'C'], n_rows) if col in CAT_FEATURES else rng.random(n_rows)
+                      for col in MODEL_FEATURES})
+    y = rng.integers(0, 2, n_rows)
+
+    encoders = fit_encoding_tables(X, CAT_FEATURES)
+    model = xgb.XGBClassifier(objective='binary:logistic', n_estimators=100, max_depth=6, seed=seed)
+    model.fit(apply_encoding_tables(X, encoders), y)
+
+    model_path = Path(folder) / 'xgb_retention_model.pkl'
+    bundle = make_model_bundle(model, MODEL_FEATURES, encoders)
+    joblib.dump(bundle, model_path)
+    save_native_model(bundle, model_path)
+
+    return model_path
+
+def sample_row(model_path):
+    """
+    Returns one student as a list of feature values, using the first category of each encoded feature.
+    """
+    with open(model_path.with_suffix('.json')) as f:
+        metadata = json.load(f)
+
+    return [metadata['encoders'][col][0] if col in metadata['encoders'] else 0.0 for col in metadata['features']]
+
+def time_startup(body, model_path, row):
+    """
+    Runs one cold process and returns its wall time with the time and module count it reported.
+    """
+    code = CHILD.format(scripts=str(SCRIPTS_FOLDER), model_path=str(model_path), row=json.dumps(row), body=body)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    wall_s = time.perf_counter() - start
+
+    return wall_s, json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare time to first prediction of the pickled and native models.')
+    parser.add_argument('--model-path', type=Path, default=SCRIPTS_FOLDER / 'models/xgb_retention_model.pkl',
+                        help='Pickled bundle saved by run_training.py, with its .ubj and .json next to it.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--throwaway', action='store_true', help='Benchmark a small model trained on synthetic data.')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        model_path = args.model_path
+        if args.throwaway or not model_path.with_suffix('.json').exists():
+            print('Native model not found, training a throwaway model on synthetic data...')
+            model_path = build_throwaway_model(folder)
+
+        row = sample_row(model_path)
+        print(f"{'path':>8} {'median_wall_s':>14} {'median_first_s':>15} {'modules':>8}")
+        for name, body in [('pickle', PICKLE_PATH), ('native', NATIVE_PATH)]:
+            runs = [time_startup(body, model_path, row) for _ in range(args.repeat)]
+            wall_s = statistics.median(wall for wall, _ in runs)
+            first_s = statistics.median(child['first_prediction_s'] for _, child in runs)
+            print(f"{name:>8} {wall_s:>14.3f} {first_s:>15.3f} {runs[-1][1]['modules']:>8}")
+
+if __name__ == "__main__":
+    main()
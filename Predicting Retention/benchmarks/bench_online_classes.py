@@ -0,0 +1,104 @@
+# bench_online_classes.py
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Include 'code' folder in path
+CODE_FOLDER = Path.cwd().parent / 'code'
+sys.path.insert(0, str(CODE_FOLDER))
+
+from processing import count_all_online_classes
+
+def legacy_count_online_classes(df, term):
+    """
+    Reference copy of the original per-student loop, kept for parity and timing comparison.
+
+    Parameters:
+        df (pd.DataFrame): Dataframe of CrHr enrollment with 'id', 'term' and 'loc' columns.
+        term (int): Six digit integer designating the semester to isolate.
+
+    Returns:
+        pd.DataFrame: Online class counts for the term.
+    """
+    temporary_df = df[df['term'] == term]
+    all_online = {}
+    for i in temporary_df['id'].unique():
+        temp = temporary_df[temporary_df['id'] == i]
+        online = 0
+        for j in temp['loc']:
+            if j == 'V':
+                online += 1
+        all_online[i] = [len(temp), online, online/len(temp)]
+
+    online_df = (pd.DataFrame.from_dict(all_online).T
+                   .reset_index()
+                   .rename(columns = {'index':'id', 0:'num_of_classes', 1:'num_online', 2:'perc_online'})
+                )
+    online_df['fully_online'] = ['Fully Online' if i == 1.0 else 'Not Fully Online' for i in online_df['perc_online']]
+    online_df['term'] = term
+
+    return online_df[['id', 'term', 'num_of_classes', 'num_online', 'perc_online', 'fully_online']]
+
+def legacy_count_all_online_classes(df):
+    """
+    Runs the reference loop once per term, the way data_cleaning.online_classes() used to.
+    """
+    return (pd.concat([legacy_count_online_classes(df, i) for i in df['term'].unique()])
+              .reset_index(drop = True)
+           )
+
+def make_course_rows(n_rows, seed = 101):
+    """
+    Builds synthetic credit hour rows with roughly four classes per student per term.
+
+    Parameters:
+        n_rows (int): Number of course rows to generate.
+        seed (int): Random seed.
+
+    Returns:
+        pd.DataFrame: Dataframe with 'id', 'term', 'crn' and 'loc' columns.
+    """
+    rng = np.random.default_rng(seed)
+    terms = np.array([201980, 202080, 202180, 202280, 202380])
+    n_students = max(n_rows // (4 * len(terms)), 1)
+
+    # A third of the students take everything online, the rest mix locations
+    ids = rng.integers(1, n_students + 1, n_rows)
+    fully_online = ids % 3 == 0
+    loc = np.where(fully_online, 'V', rng.choice(['V', 'M', 'C'], n_rows, p = [0.3, 0.6, 0.1]))
+
+    return pd.DataFrame({'id': ids,
+                         'term': rng.choice(terms, n_rows),
+                         'crn': rng.integers(10000, 99999, n_rows),
+                         'loc': loc})
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark count_all_online_classes() against the per-student loop.')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = [10_000, 100_000, 1_000_000, 5_000_000])
+    parser.add_argument('--legacy-max', type = int, default = 100_000,
+                        help = 'Largest size to run the quadratic reference loop on.')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'students':>10} {'vectorized_s':>13} {'legacy_s':>10} {'speedup':>8}")
+    for n_rows in args.sizes:
+        crhr_df = make_course_rows(n_rows)
+        online_df, vectorized_s = time_call(count_all_online_classes, crhr_df)
+
+        legacy_s = np.nan
+        if n_rows <= args.legacy_max:
+            legacy_df, legacy_s = time_call(legacy_count_all_online_classes, crhr_df)
+            pd.testing.assert_frame_equal(online_df, legacy_df)
+
+        print(f"{n_rows:>10,} {len(online_df):>10,} {vectorized_s:>13.3f} {legacy_s:>10.3f} {legacy_s / vectorized_s:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench_pipeline_steps.py
+import argparse
+import copy
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from csv_schemas import CSV_SCHEMAS
+from main_pipeline import build_pipeline
+from pipeline_steps import LoadCSVFiles
+from synthetic_data import make_extracts, write_extracts
+
+# Source folder and schema of each LoadCSVFiles step, in the order main_pipeline.main() loads them
+SOURCES = [('enrollment', 'enrollment_folder'), ('gpa', 'gpa_folder'), ('pell', 'pell_folder'),
+           ('location', 'online_folder'), ('high_school', 'high_school_folder')]
+
+def measure(step, X, memory=True):
+    """
+    Runs step.transform(X) once for its time and, when memory is True, once more under tracemalloc for
+    the peak memory it allocates. Both runs get their own copy of X, since some steps modify their input.
+
+    Returns:
+        tuple: The step's output and its measurements.
+    """
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    output = step.transform(copy.deepcopy(X))
+    result = {'seconds': time.perf_counter() - start_wall, 'cpu_seconds': time.process_time() - start_cpu}
+
+    if memory:
+        X_copy = copy.deepcopy(X)
+        tracemalloc.start()
+        step.transform(X_copy)
+        result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+
+    rows_in = len(X) if X is not None else 0
+    return output, {**result, 'rows_in': rows_in, 'rows_out': len(output)}
+
+def bench_size(n_students, folder, memory=True):
+    """
+    Writes synthetic extracts for n_students, then measures every LoadCSVFiles and pipeline step on them.
+    """
+    extracts = make_extracts(n_students)
+    folders = write_extracts(folder, extracts)
+
+    results, loaded = [], {}
+    for schema, folder_key in SOURCES:
+        step = LoadCSVFiles(folders[folder_key], schema=CSV_SCHEMAS[schema])
+        loaded[schema], result = measure(step, None, memory)
+        results.append({'students': n_students, 'step': f'load_csv_files[{schema}]', **result})
+
+    # Feed each step the previous step's output, as the pipeline does
+    pipeline = build_pipeline(extracts['semesters'], extracts['years'], loaded['gpa'], loaded['pell'],
+                              loaded['location'], loaded['high_school'])
+    X = loaded['enrollment']
+    for name, step in pipeline.steps:
+        X, result = measure(step, X, memory)
+        results.append({'students': n_students, 'step': name, **result})
+
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and memory-profile each pipeline step on synthetic extracts.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+                        help='Numbers of synthetic students.')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc run of each step.')
+    parser.add_argument('--json', type=Path, default=None, help='Also write the measurements to this JSON file.')
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'students':>10} {'step':<30} {'rows_in':>10} {'rows_out':>10} {'seconds':>9} {'cpu_s':>8} {'peak_mb':>9}")
+    for n_students in args.sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            for result in bench_size(n_students, folder, memory=not args.no_memory):
+                results.append(result)
+                print(f"{result['students']:>10,} {result['step']:<30} {result['rows_in']:>10,} {result['rows_out']:>10,} "
+                      f"{result['seconds']:>9.3f} {result['cpu_seconds']:>8.3f} {result.get('peak_mb', float('nan')):>9.1f}")
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
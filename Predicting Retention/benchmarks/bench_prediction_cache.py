@@ -0,0 +1,74 @@
+# bench_prediction_cache.py
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import xgboost as xgb
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from bench_model_search import make_training_rows
+from encoding import fit_encoding_tables, apply_encoding_tables
+from prediction import CAT_FEATURES, MODEL_FEATURES, predict, preprocess_data
+from prediction_cache import PredictionCache, predict_cached
+
+def change_rows(df, share, seed=7):
+    """
+    Returns a copy of df where a share of the students took more credit hours and got a new term GPA,
+    as between two daily scoring runs.
+    """
+    rng = np.random.default_rng(seed)
+    changed = df.copy()
+    rows = rng.random(len(df)) < share
+    changed.loc[rows, 'term_att_crhr'] = changed.loc[rows, 'term_att_crhr'] + 1
+    changed.loc[rows, 'term_gpa'] = rng.uniform(0, 4, rows.sum()).round(2)
+
+    return changed
+
+def main():
+    parser = argparse.ArgumentParser(description='Time daily scoring runs with and without the prediction cache.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000], help='Numbers of synthetic students.')
+    parser.add_argument('--changed', type=float, nargs='+', default=[0.01, 0.05, 0.25],
+                        help="Shares of students whose features change between runs.")
+    parser.add_argument('--n-estimators', type=int, default=500, help='Boosting rounds of the model.')
+    args = parser.parse_args()
+
+    # Train a model on students it will later score
+    train = make_training_rows(50_000)
+    encoders = fit_encoding_tables(train, CAT_FEATURES)
+    model = xgb.XGBClassifier(objective='binary:logistic', seed=101, n_estimators=args.n_estimators, max_depth=5)
+    model.fit(apply_encoding_tables(train[MODEL_FEATURES], encoders), train['enrolled'])
+
+    print(f"{'students':>10} {'changed':>8} {'uncached_s':>11} {'cached_s':>9} {'hit_rate':>9} {'same':>5}")
+    for n_students in args.sizes:
+        students = make_training_rows(n_students, seed=11)
+        with tempfile.TemporaryDirectory() as folder:
+            # Fill the cache with the first run
+            cache = PredictionCache(folder, 'bench')
+            predict_cached(model, preprocess_data(students, MODEL_FEATURES, CAT_FEATURES, encoders), cache)
+            cache.save()
+
+            for share in args.changed:
+                today = change_rows(students, share)
+
+                start = time.perf_counter()
+                expected = predict(model, preprocess_data(today, MODEL_FEATURES, CAT_FEATURES, encoders))
+                uncached_s = time.perf_counter() - start
+
+                # Each run opens the cache from disk, as prediction.py does
+                start = time.perf_counter()
+                cache = PredictionCache(folder, 'bench')
+                predictions = predict_cached(model, preprocess_data(today, MODEL_FEATURES, CAT_FEATURES, encoders), cache)
+                cache.save()
+                cached_s = time.perf_counter() - start
+
+                print(f"{n_students:>10,} {share:>8.0%} {uncached_s:>11.3f} {cached_s:>9.3f} {cache.hit_rate():>9.1%} "
+                      f"{str(bool((predictions == expected).all())):>5}")
+
+if __name__ == "__main__":
+    main()
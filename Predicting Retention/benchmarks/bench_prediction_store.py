@@ -0,0 +1,59 @@
+# bench_prediction_store.py
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from bench_model_search import make_training_rows
+from prediction_store import PredictionStore
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare rewriting the predictions CSV with upserts into the prediction store.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000], help='Numbers of scored rows.')
+    parser.add_argument('--terms', type=int, default=5, help='Number of terms the rows are spread over.')
+    parser.add_argument('--changed', type=float, default=0.05,
+                        help="Share of the latest term's predictions that change between runs.")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'csv_s':>7} {'csv_mb':>7} {'upsert_s':>9} {'written_mb':>11} {'terms_written':>14} {'same':>5}")
+    for n_rows in args.sizes:
+        rng = np.random.default_rng(101)
+        scored = make_training_rows(n_rows)
+        scored['id'] = [f'@{i:08d}' for i in range(n_rows)]
+        scored['term'] = np.sort(rng.integers(0, args.terms, n_rows)) * 100 + 201980
+        scored['predicted_enrollment'] = rng.integers(0, 2, n_rows)
+
+        with tempfile.TemporaryDirectory() as folder:
+            store = PredictionStore(Path(folder) / 'store')
+            store.upsert(scored, 'v1')
+
+            # The next daily run, where some of the latest term's predictions change
+            latest = scored['term'] == scored['term'].max()
+            flipped = latest & (rng.random(n_rows) < args.changed)
+            scored.loc[flipped, 'predicted_enrollment'] = 1 - scored.loc[flipped, 'predicted_enrollment']
+
+            start = time.perf_counter()
+            scored.to_csv(Path(folder) / 'predictions.csv', index=False)
+            csv_s = time.perf_counter() - start
+            csv_mb = (Path(folder) / 'predictions.csv').stat().st_size / 1024**2
+
+            start = time.perf_counter()
+            report = store.upsert(scored, 'v1')
+            upsert_s = time.perf_counter() - start
+            written_mb = sum(store.partition_path(term).stat().st_size for term in report['written']) / 1024**2
+
+            stored = store.read().sort_values(['term', 'id'], ignore_index=True)
+            expected = scored[['id', 'term', 'predicted_enrollment']].sort_values(['term', 'id'], ignore_index=True)
+            same = (stored['predicted_enrollment'].to_numpy() == expected['predicted_enrollment'].to_numpy()).all()
+            print(f"{n_rows:>10,} {csv_s:>7.2f} {csv_mb:>7.1f} {upsert_s:>9.2f} {written_mb:>11.1f} "
+                  f"{len(report['written']):>14} {str(bool(same)):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# bench_thread_budget.py
+import argparse
+import sys
+from pathlib import Path
+
+from sklearn.model_selection import train_test_split
+
+# Include 'scripts' folder in path
+SCRIPTS_FOLDER = Path.cwd().parent / 'scripts'
+sys.path.insert(0, str(SCRIPTS_FOLDER))
+
+from encoding import fit_encoding_tables, apply_encoding_tables
+from model_search import cached_grid_search
+from thread_budget import CPUMeter, available_cores, print_thread_report, probe_thread_splits, thread_splits
+from bench_model_search import SMALL_PARAMS, make_training_rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the cached grid search under every split of a core budget.')
+    parser.add_argument('--cores', type=int, default=available_cores())
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--probe', action='store_true', help="Also print the 'auto' policy's probe and its pick.")
+    args = parser.parse_args()
+
+    # Same split and encoding as train_xgboost_model()
+    df = make_training_rows(args.rows)
+    X_train, _, y_train, _ = train_test_split(df.drop('enrolled', axis=1), df['enrolled'], test_size=0.2, random_state=101)
+    X_train = apply_encoding_tables(X_train, fit_encoding_tables(X_train, [col for col in X_train.columns
+                                                                          if X_train[col].dtype == object]))
+
+    if args.probe:
+        best, probe = probe_thread_splits(X_train, y_train, args.cores)
+        print('Probe:')
+        print_thread_report(probe)
+        print(f"'auto' picks {best[0]} concurrent fits x {best[1]} threads\n")
+
+    results, chosen = [], set()
+    for outer, inner in thread_splits(args.cores):
+        with CPUMeter(args.cores) as meter:
+            best_params, report = cached_grid_search(X_train, y_train, SMALL_PARAMS, n_jobs=outer, nthread=inner)
+            meter.fits = report['fits']
+        results.append({'outer': outer, 'inner': inner, **meter.summary()})
+        chosen.add(tuple(sorted(best_params.items())))
+
+    print(f'Cached grid search on {len(X_train):,} rows, {args.cores} cores:')
+    print_thread_report(results)
+    print(f"Every split picked the same parameters: {len(chosen) == 1}")
+
+if __name__ == "__main__":
+    main()
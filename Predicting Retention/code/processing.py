@@ -47,50 +47,131 @@ def find_enrolled(prev_term, curr_term, sem_0, sem_1):
 
     return prev_curr_cnt, prev_curr
 
-# Create function for looping through semesters and counting all online classes for 
-# each student
-def count_online_classes(df, term):
+# Season prefixes used to label terms by their last two digits
+TERM_SEASONS = {'10': 'sp', '80': 'fa'}
+
+def term_label(term):
+    """
+    term (int or str): Six digit semester code (i.e. 201980 becomes 'fa19', 202010 becomes 'sp20').
+    Terms with an unrecognized season keep their full code.
+    """
+    term = str(term)
+    season = TERM_SEASONS.get(term[4:])
+    
+    return season + term[2:4] if season else term
+
+# Create function that labels retention for every consecutive pair of terms in one pass
+def label_retention(df, terms, labels = None):
+    """
+    df (pd.DataFrame): "all_sems" dataframe of student enrollment for every term in terms.
+    terms (list): Six digit semester codes in chronological order. Each term is compared with the term
+                  after it, so Fall to Fall, Fall to Spring, or pairs with gaps all work the same way.
+    labels (list, optional): One label per consecutive pair for the 'terms' column of the rate table.
+                             Defaults to labels like 'fa19_fa20' built with term_label().
+
+    Returns the same two outputs as find_enrolled(), for all pairs at once: the per-pair counts and 
+    percent enrolled, and the rows of every previous term with the 'enrolled' column added.
+    """
+    terms = [int(i) for i in terms]
+    if labels is None:
+        labels = [term_label(i) + '_' + term_label(j) for i, j in zip(terms[:-1], terms[1:])]
+    
+    # Map each previous term to the term it is compared with and to its position in the list
+    next_term = dict(zip(terms[:-1], terms[1:]))
+    pair_order = {term: i for i, term in enumerate(terms[:-1])}
+    
+    # Isolate the previous terms, keeping each pair together in the order of terms
+    prev_terms = df[df['term'].isin(next_term)]
+    pair = prev_terms['term'].map(pair_order)
+    prev_terms = prev_terms.iloc[np.argsort(pair.to_numpy(), kind = 'stable')]
+    
+    # Create column for the current terms that shows all the students enrolled
+    curr_terms = (df.loc[df['term'].isin(terms[1:]), ['id', 'term']]
+                    .rename(columns = {'term':'_next_term'})
+                    .assign(enrolled = 'Enrolled')
+                 )
+
+    # Join every previous term to its current term at once
+    prev_curr = (prev_terms.assign(_next_term = prev_terms['term'].map(next_term))
+                           .merge(curr_terms, how = 'left', on = ['id', '_next_term'])
+                           .drop(columns = '_next_term')
+                           .reset_index(drop = True)
+                )
+
+    # Fill the NaN values with 'Not Enrolled', adding it as a category to categorical columns first
+    for col in prev_curr.select_dtypes('category').columns:
+        if 'Not Enrolled' not in prev_curr[col].cat.categories:
+            prev_curr[col] = prev_curr[col].cat.add_categories('Not Enrolled')
+    prev_curr = prev_curr.fillna('Not Enrolled')
+
+    # Create dataframe of the count of students from each previous term enrolled in its current term
+    prev_curr_cnt = (prev_curr.assign(_pair = prev_curr['term'].map(pair_order))
+                              .groupby(['_pair', 'enrolled'])['id'].count()
+                              .reset_index()
+                              .rename(columns = {'id':'cnt'})
+                    )
+
+    # Create column that shows the percent of students who enrolled within each pair
+    prev_curr_cnt['percent'] = prev_curr_cnt['cnt'] / prev_curr_cnt.groupby('_pair')['cnt'].transform('sum')
+    
+    # Record the terms
+    prev_curr_cnt['terms'] = prev_curr_cnt['_pair'].map(dict(enumerate(labels)))
+    
+    # Reorganize the dataframe
+    prev_curr_cnt = prev_curr_cnt[['terms', 'enrolled', 'cnt', 'percent']]
+
+    return prev_curr_cnt, prev_curr
+
+# Create function for counting all online classes for each student in every term at once
+def count_all_online_classes(df):
     """
     df (pd.DataFrame): Datafrme of CrHr enrollment for the previous four Fall or Spring Semesters, 
                        taken from IR data. Pulled Day-1, 20th-Day, and EOT, eliminated duplicates by
                        term, id, and crn.
-    term (int): Six digit integer designating the semester you wish to isolate (i.e. 201980, 202080, etc.)
-    
+
+    Returns one row per (id, term) in a single groupby pass. Rows are ordered by term (in order of
+    first appearance) and then by id (in order of first appearance within the term), which matches
+    concatenating count_online_classes() over df['term'].unique().
     """
     
-    # fiFilter the dataframe by the semester
-    temporary_df = df[df['term'] == term]
-    
-    # Create dictionary for each id and the count of classes
-    # as well as the percent of those classes that are online
-    all_online = {}
-    
-    for i in temporary_df['id'].unique():
-        temp = temporary_df[temporary_df['id'] == i]
-        online = 0
-        for j in temp['loc']:
-            if j == 'V':
-                online += 1
-            else:
-                online += 0
-        all_online[i] = [len(temp), online, online/len(temp)]
-    
-    # Make all_online dictionary into a dataframe
-    online_df = (pd.DataFrame.from_dict(all_online).T
-                   .reset_index()
-                   .rename(columns = {'index':'id',
-                                      0:'num_of_classes',
-                                      1:'num_online',
-                                      2:'perc_online'})
+    # Flag each class taken online
+    classes = pd.DataFrame({'term_order': pd.factorize(df['term'])[0],
+                            'term': df['term'].to_numpy(),
+                            'id': df['id'].to_numpy(),
+                            'online': (df['loc'] == 'V').to_numpy()})
+    
+    # Count the classes and the online classes for each student in each term
+    online_df = (classes.groupby(['term_order', 'id', 'term'], sort = False)['online']
+                        .agg(['size', 'sum'])
+                        .reset_index()
+                        .sort_values('term_order', kind = 'stable')
+                        .reset_index(drop = True)
+                        .rename(columns = {'size':'num_of_classes',
+                                           'sum':'num_online'})
                 )
+    online_df['num_of_classes'] = online_df['num_of_classes'].astype(float)
+    online_df['num_online'] = online_df['num_online'].astype(float)
+    online_df['perc_online'] = online_df['num_online'] / online_df['num_of_classes']
 
     # Label the students who are fully online verses those that aare not
-    online_df['fully_online'] = ['Fully Online' if i == 1.0 else 'Not Fully Online' for i in online_df['perc_online']]
-    
-    # Label the term
-    online_df['term'] = term
+    online_df['fully_online'] = np.where(online_df['perc_online'] == 1.0, 'Fully Online', 'Not Fully Online')
     
     # Reorganize the dataframe
     online_df = online_df[['id', 'term', 'num_of_classes', 'num_online', 'perc_online', 'fully_online']]
     
     return online_df
+
+# Create function for counting all online classes for each student in a single term
+def count_online_classes(df, term):
+    """
+    df (pd.DataFrame): Datafrme of CrHr enrollment for the previous four Fall or Spring Semesters, 
+                       taken from IR data. Pulled Day-1, 20th-Day, and EOT, eliminated duplicates by
+                       term, id, and crn.
+    term (int): Six digit integer designating the semester you wish to isolate (i.e. 201980, 202080, etc.)
+    
+    """
+    
+    # Filter the dataframe by the semester
+    online_df = count_all_online_classes(df[df['term'] == term])
+    
+    return online_df
@@ -0,0 +1,157 @@
+# csv_cache.py
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+class CSVCache:
+    """
+    On-disk Parquet cache for parsed CSV extracts.
+
+    Each CSV is stored once under its path and a hash of its contents, so a new or changed file is the
+    only one that gets parsed again. The content hash is kept in a small sidecar with the file's size and
+    modification time, and the file is only read to hash it again when either of them changes. The least
+    recently used entries are evicted once the cache grows past max_bytes.
+
+    Parameters:
+        cache_folder (str or Path): Folder where the Parquet files are stored.
+        max_bytes (int): Size limit of the cache folder. Defaults to 2 GB.
+    """
+    def __init__(self, cache_folder, max_bytes=2 * 1024**3):
+        self.cache_folder = Path(cache_folder)
+        self.max_bytes = max_bytes
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _path_key(file_path):
+        return hashlib.blake2b(str(Path(file_path).resolve()).encode(), digest_size=8).hexdigest()
+
+    @staticmethod
+    def content_hash(file_path):
+        """
+        Returns a hex digest of the file's contents.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def _sidecar_path(self, file_path):
+        return self.cache_folder / f'{self._path_key(file_path)}.fingerprint.json'
+
+    def fingerprint(self, file_path):
+        """
+        Returns the hash of the file's contents. It is reused from the sidecar while the file's size and
+        modification time are unchanged, so a cache hit does not read the CSV.
+        """
+        stat = Path(file_path).stat()
+        sidecar = self._sidecar_path(file_path)
+        try:
+            saved = json.loads(sidecar.read_text())
+            if saved['size'] == stat.st_size and saved['mtime_ns'] == stat.st_mtime_ns:
+                return saved['content']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        content = self.content_hash(file_path)
+        temp_sidecar = sidecar.with_suffix(f'.{os.getpid()}.tmp')
+        temp_sidecar.write_text(json.dumps({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'content': content}))
+        os.replace(temp_sidecar, sidecar)
+
+        return content
+
+    def entry_path(self, file_path, variant=None):
+        key = self.fingerprint(file_path)
+        if variant is not None:
+            key += '-' + hashlib.blake2b(variant.encode(), digest_size=4).hexdigest()
+
+        return self.cache_folder / f'{self._path_key(file_path)}-{key}.parquet'
+
+    def load(self, file_path, parse, columns=None, variant=None):
+        """
+        Returns the cached dataframe for file_path, parsing and storing it first on a miss.
+
+        Parameters:
+            file_path (str or Path): Path to the CSV file.
+            parse (callable): Function with no arguments that parses the CSV into a dataframe.
+            columns (list, optional): Columns to read. Columns that are not in the file are skipped.
+            variant (str, optional): Describes how parse reads the file, e.g. its schema. Files parsed
+                                     a different way are stored under a different entry.
+
+        Returns:
+            pd.DataFrame: Parsed CSV.
+        """
+        entry = self.entry_path(file_path, variant)
+        if entry.exists():
+            # Mark the entry as recently used for eviction
+            os.utime(entry)
+            return self._read(entry, columns)
+
+        df = parse()
+
+        # Drop the entries of older versions of this file, keeping the other variants of this version
+        self.invalidate_stale(file_path)
+        temp_entry = entry.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            df.to_parquet(temp_entry, index=False)
+            os.replace(temp_entry, entry)
+        except (ImportError, ValueError, TypeError):
+            # Columns with mixed types cannot be stored in Parquet, so this file is parsed every time
+            temp_entry.unlink(missing_ok=True)
+        else:
+            self.evict()
+
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+
+        return df
+
+    @staticmethod
+    def _read(entry, columns=None):
+        if columns is not None:
+            import pyarrow.parquet as pq
+            names = pq.read_schema(entry).names
+            columns = [col for col in columns if col in names]
+
+        return pd.read_parquet(entry, columns=columns)
+
+    def invalidate(self, file_path=None):
+        """
+        Removes the cached entries and content hash of file_path, or of every file when file_path is None.
+        """
+        key = '*' if file_path is None else self._path_key(file_path)
+        for pattern in [f'{key}-*.parquet', f'{key}.fingerprint.json']:
+            for entry in self.cache_folder.glob(pattern):
+                entry.unlink(missing_ok=True)
+
+    def invalidate_stale(self, file_path):
+        """
+        Removes the entries of file_path stored under another version of its contents.
+        """
+        content = self.fingerprint(file_path)
+        for entry in self.cache_folder.glob(f'{self._path_key(file_path)}-*.parquet'):
+            if entry.stem.split('-')[1] != content:
+                entry.unlink(missing_ok=True)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        for entry in self.cache_folder.glob('*.parquet'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,77 @@
+# csv_schemas.py
+
+# Declared schema for each folder of Banner extracts read by load_csv_files().
+#   match:      Lowercase columns that identify the folder's files when no schema is passed.
+#   rename:     Columns renamed to the 'id' and 'term' keys used by every merge.
+#   sort:       Columns the combined dataframe is sorted by after renaming.
+#   dtypes:     Columns read with a declared dtype instead of pandas inference.
+#   categories: Repeated label columns stored as categoricals.
+# Columns that are missing from a file are ignored, and every other column is inferred.
+ID_DTYPE = 'string[pyarrow]'
+
+CSV_SCHEMAS = {
+    'gpa': {
+        'match': ['studentid', 'gpatrm'],
+        'rename': {'studentid': 'id', 'gpatrm': 'term'},
+        'sort': ['term'],
+        'dtypes': {'studentid': ID_DTYPE},
+        'categories': ['acd_std_desc']
+    },
+    'pell': {
+        'match': ['loan_grant_term'],
+        'rename': {'loan_grant_term': 'term'},
+        'sort': ['term', 'id'],
+        'dtypes': {'id': ID_DTYPE},
+        'categories': ['pell_nopell']
+    },
+    'high_school': {
+        'match': ['stdtid', 'termentered'],
+        'rename': {'stdtid': 'id', 'termentered': 'term'},
+        'sort': None,
+        'dtypes': {'stdtid': ID_DTYPE},
+        'categories': []
+    },
+    'enrollment': {
+        'match': ['pidm', 'majr_desc1'],
+        'rename': {},
+        'sort': None,
+        'dtypes': {'id': ID_DTYPE, 'term': 'int32', 'pidm': 'int32'},
+        'categories': ['status', 'stype', 'resd_desc', 'degcode', 'majr_desc1', 'gender', 'mrtl',
+                       'ethn_desc', 'cnty_desc1', 'styp', 'resd']
+    },
+    'location': {
+        'match': ['loc'],
+        'rename': {},
+        'sort': None,
+        'dtypes': {'id': ID_DTYPE, 'term': 'int32'},
+        'categories': ['loc']
+    }
+}
+
+# Columns the cleaning steps read from each folder, before renaming. The pandas and duckdb backends
+# only load these from the cached extracts.
+PIPELINE_COLUMNS = {
+    'enrollment': ['term', 'pidm', 'age', 'id', 'totcr', 'status', 'stype', 'resd_desc', 'degcode',
+                   'majr_desc1', 'gender', 'ethn_desc', 'cnty_desc1', 'styp', 'resd'],
+    'gpa': ['studentid', 'gpatrm', 'acd_std_desc', 'term_att_crhr', 'term_earn_crhr', 'term_gpa', 'inst_gpa',
+            'inst_earned', 'inst_hrs_att', 'overall_gpa'],
+    'pell': ['id', 'loan_grant_term', 'pell_nopell', 'accept_amt', 'paid_date'],
+    'high_school': ['stdtid', 'termentered', 'hsgraddte'],
+    'location': ['id', 'term', 'loc']
+}
+
+def detect_schema(columns):
+    """
+    Returns the first schema whose 'match' columns are all in columns, or None.
+
+    Parameters:
+        columns (list): Lowercase column names of the combined extract.
+
+    Returns:
+        dict: Matching schema from CSV_SCHEMAS.
+    """
+    for schema in CSV_SCHEMAS.values():
+        if all(col in columns for col in schema['match']):
+            return schema
+
+    return None
@@ -3,57 +3,119 @@ import numpy as np
 
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from pandas.api.types import union_categoricals
+
 # Include 'code' folder in path
 CODE_FOLDER = Path.cwd().parent / 'code'
 sys.path.insert(0, str(CODE_FOLDER))
 
 # Import custom modules
-from processing import select_sem, find_enrolled, count_online_classes
+from processing import label_retention, count_all_online_classes
+from csv_schemas import detect_schema
+from feature_store import FeatureStore
+from merge_guard import guarded_merge
+
+def schema_variant(schema):
+    """
+    Returns the string that files parsed with schema are cached under, so each schema gets its own entries.
+    """
+    return None if schema is None else repr(sorted(schema.items()))
 
-def load_csv_files(folder_path):
+def read_csv_file(file_path, schema = None, cache = None, columns = None):
     """
-    Load multiple CSV files and combine them into a single DataFrame.
+    Load a single CSV file with the pyarrow engine, using the dtypes declared in its schema.
 
     Parameters:
-        file_paths (list): List of file paths to load.
-        lowercase_columns (bool): Whether to lowercase column names
+        file_path (str): Path to the CSV file.
+        schema (dict, optional): Folder schema from csv_schemas.CSV_SCHEMAS.
+        cache (CSVCache, optional): Parquet cache of parsed files.
+        columns (list, optional): Lowercase column names to load. Loads every column by default.
+
+    Returns:
+        pd.DataFrame: Dataframe with lowercase column names.
+
+    """
+    def parse():
+        # Match the declared dtypes to the file's own column headings
+        dtype = None
+        if schema is not None:
+            declared = {**schema['dtypes'], **{col: 'category' for col in schema['categories']}}
+            header = pd.read_csv(file_path, nrows = 0).columns
+            dtype = {col: declared[col.lower()] for col in header if col.lower() in declared}
+        
+        try:
+            df = pd.read_csv(file_path, engine = 'pyarrow', dtype = dtype)
+        except ImportError:
+            df = pd.read_csv(file_path, dtype = dtype)
+
+        return df.rename(columns = str.lower)
+
+    if cache is not None:
+        # Files parsed with a different schema are cached separately
+        return cache.load(file_path, parse, columns = columns, variant = schema_variant(schema))
+    
+    df = parse()
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    
+    return df
+
+def csv_file_paths(folder_path):
+    """
+    Returns the paths of the folder's CSV files, in the order their rows are combined.
+    """
+    # Only process files with .csv extention
+    return [os.path.join(folder_path, file_name) for file_name in os.listdir(folder_path)
+            if file_name.endswith('.csv')]
+
+def load_csv_files(folder_path, schema = None, cache = None, columns = None, max_workers = None):
+    """
+    Load multiple CSV files in parallel and combine them into a single DataFrame.
+
+    Parameters:
+        folder_path (str): Path to the folder of CSV files to load.
+        schema (dict, optional): Folder schema from csv_schemas.CSV_SCHEMAS. Detected from the first 
+                                 file's columns when not given.
+        cache (CSVCache, optional): Parquet cache of parsed files. Only new or changed files are parsed.
+        columns (list, optional): Lowercase column names to load. Loads every column by default.
+        max_workers (int, optional): Number of files read at the same time.
 
     Returns:
         pd.DataFrame: Combined dataframe.
 
     """
-    all_dfs = []
-    for file_name in os.listdir(folder_path):
-        # Only process files with .csv extention
-        if file_name.endswith('.csv'):
-            file_path = os.path.join(folder_path, file_name)
-            df = (pd.read_csv(file_path)
-                    .rename(columns = str.lower)
-                 )
-            all_dfs.append(df)
+    file_paths = csv_file_paths(folder_path)
+
+    # Check for special column headings from the gpa, pell, or high school dataframes
+    if schema is None and file_paths:
+        header = pd.read_csv(file_paths[0], nrows = 0).rename(columns = str.lower).columns
+        schema = detect_schema(list(header))
+
+    with ThreadPoolExecutor(max_workers = max_workers) as executor:
+        all_dfs = list(executor.map(lambda file_path: read_csv_file(file_path, schema, cache, columns), file_paths))
+
+    # Give every file the same categories so the combined columns stay categorical
+    if schema is not None:
+        for col in schema['categories']:
+            dfs_with_col = [df for df in all_dfs if col in df.columns]
+            if dfs_with_col:
+                categories = union_categoricals([df[col] for df in dfs_with_col]).categories
+                for df in dfs_with_col:
+                    df[col] = df[col].cat.set_categories(categories)
 
     # Combine all dfs
     combined_df = (pd.concat(all_dfs, ignore_index = True)
                      .reset_index(drop = True)
                   )
 
-    # Check for special column heading from gpa dataframe or pell dataframe
-    if all(col in combined_df.columns for col in ['studentid', 'gpatrm']):
-        combined_df = (combined_df.rename(columns = {'studentid':'id', 'gpatrm':'term'})
-                                  .sort_values('term', ascending = True)
-                      )
-    elif 'loan_grant_term' in list(combined_df.columns):
-        combined_df = (combined_df.rename(columns = {'loan_grant_term':'term'})
-                                  .sort_values(['term', 'id'], ascending = True)
-                      )
-    elif all(col in combined_df.columns for col in ['stdtid', 'termentered']):
-        combined_df = (combined_df.rename(columns = {'stdtid':'id', 'termentered':'term'})
-                                  .rename(columns = str.lower)
-                      )
-    else:
-        combined_df = combined_df
+    # Rename the id and term columns and sort the dataframe the way the schema declares
+    if schema is not None:
+        combined_df = combined_df.rename(columns = schema['rename'])
+        if schema['sort']:
+            combined_df = combined_df.sort_values(schema['sort'], ascending = True)
     
     return combined_df
 
@@ -74,39 +136,29 @@ def remove_missing_gpa(gpa_df):
 
     return all_gpas
     
-def record_retention(all_sem_stud_data, semesters, years):
+def record_retention(all_sem_stud_data, semesters, years = None):
     """
-    Identifies students who retained from Fall to Fall
+    Identifies students who retained from each semester to the next (Fall to Fall, Fall to Spring, etc.)
 
     Parameters:
         all_sem_stud_data (pd.DataFrame): Student enrollment dataframe.
-        semesters (int): List of six digit semester codes saved as string.
-        years (int): List of two digit integers indicating the year.
+        semesters (int): List of six digit semester codes saved as string, in chronological order.
+        years (int, optional): List of two digit integers indicating the year. Used to label the
+                               pairs as 'fa19_fa20'. Defaults to labels built from the semester codes.
 
     Returns:
         pd.DataFrame: Dataframe with new "enrolled" column created.
         
     """
     
-    # Loop through each semester to compare them to one another and 
-    # record who enrolled from one semester to the next.
-    perc_enrolled = []
-    all_enrolled = []
-    
-    for i in range(1, 5, 1):
-        temp_perc = find_enrolled(select_sem(all_sem_stud_data, int(semesters[i-1])), 
-                             select_sem(all_sem_stud_data, int(semesters[i])), 
-                             years[i - 1], years[i])[0]
-        temp_enrolled = find_enrolled(select_sem(all_sem_stud_data, int(semesters[i-1])), 
-                             select_sem(all_sem_stud_data, int(semesters[i])), 
-                             years[i - 1], years[i])[1]
-        perc_enrolled.append(temp_perc)
-        all_enrolled.append(temp_enrolled)
-
-    # Combine the all semesters of with the enrolled/unenrolled students in it
-    all_enrolled_df = (pd.concat(all_enrolled)
-                         .reset_index(drop = True)
-                      )
+    # Label each semester pair's retention
+    labels = None
+    if years is not None:
+        labels = ['fa' + str(years[i - 1]) + '_' + 'fa' + str(years[i]) for i in range(1, len(years))]
+
+    # Compare every semester to the next one and record who enrolled from one semester 
+    # to the next in a single pass.
+    perc_enrolled, all_enrolled_df = label_retention(all_sem_stud_data, semesters, labels = labels)
 
     return all_enrolled_df
 
@@ -121,7 +173,7 @@ def combine_enrolled_and_gpa(all_enrolled_df, all_gpas):
     Returns:
         pd.DataFrame: Returns 
     """
-    combined_dfs = all_enrolled_df.merge(all_gpas, how = 'left', on = ['id', 'term'])
+    combined_dfs = guarded_merge(all_enrolled_df, all_gpas, on = ['id', 'term'], cardinality = 'many_to_one')
 
     # Reorganize the columns to 
     combined_dfs = combined_dfs[['term', 'pidm', 'age', 'id', 'totcr', 'status', 'stype', 'resd_desc',
@@ -147,12 +199,29 @@ def clean_demographic_data(combined_dfs):
 
     """
     cleaned_combined_dfs = combined_dfs.drop(columns = ['mrtl'], errors = 'ignore') 
-    cleaned_combined_dfs = cleaned_combined_dfs[combined_dfs['gender'] != 'Not Enrolled']
-    cleaned_combined_dfs = cleaned_combined_dfs[combined_dfs['cnty_desc1'] != 'Not Enrolled']
-    cleaned_combined_dfs['ethn_desc'] = cleaned_combined_dfs['ethn_desc'].replace('Not Enrolled', 'Missing')
+    cleaned_combined_dfs = cleaned_combined_dfs[valid_demographic_rows(combined_dfs)]
+    cleaned_combined_dfs['ethn_desc'] = fill_missing_ethnicity(cleaned_combined_dfs['ethn_desc'])
 
     return cleaned_combined_dfs
 
+def valid_demographic_rows(df):
+    """
+    Returns a boolean mask of the rows whose gender and county were recorded.
+    """
+    return (df['gender'] != 'Not Enrolled') & (df['cnty_desc1'] != 'Not Enrolled')
+
+def fill_missing_ethnicity(ethn_desc):
+    """
+    Returns the ethnicity column with 'Not Enrolled' replaced by 'Missing'.
+    """
+    if isinstance(ethn_desc.dtype, pd.CategoricalDtype):
+        # Categorical columns need 'Missing' as a category before it can be set
+        if 'Missing' not in ethn_desc.cat.categories:
+            ethn_desc = ethn_desc.cat.add_categories('Missing')
+        return ethn_desc.mask(ethn_desc == 'Not Enrolled', 'Missing').cat.remove_unused_categories()
+
+    return ethn_desc.replace('Not Enrolled', 'Missing')
+
 def online_classes(crhr_df, cleaned_combined_dfs):
     """
     Returns online student information combined with enrollment and gpa dataframe
@@ -167,21 +236,10 @@ def online_classes(crhr_df, cleaned_combined_dfs):
         
     """    
 
-    # Loop through all the previous Fall semesters and
-    # use the count_online_classes() function
-    all_sems_online = []
-    
-    for i in crhr_df['term'].unique():
-        temp = count_online_classes(crhr_df, i)
-        all_sems_online.append(temp)
-
-    # Pull together all semesters' fully online data
-    fully_online = (pd.concat(all_sems_online).reset_index(drop = True)
-                      [['id', 'term', 'fully_online']]
-                   )
+    fully_online = fully_online_features(crhr_df)
     
     # Merge enrolled_gpas and fully_online datasets
-    enrolled_gpas_online = (cleaned_combined_dfs.merge(fully_online, how = 'left', on = ['id', 'term'])
+    enrolled_gpas_online = (guarded_merge(cleaned_combined_dfs, fully_online, on = ['id', 'term'], cardinality = 'many_to_one')
                                [['term', 'pidm', 'age', 'id', 'totcr', 'status', 'stype', 'resd_desc',
                                 'degcode', 'majr_desc1', 'gender', 'ethn_desc', 'cnty_desc1', 'styp',
                                 'resd', 'acd_std_desc', 'term_att_crhr', 'term_earn_crhr', 'term_gpa',
@@ -191,16 +249,23 @@ def online_classes(crhr_df, cleaned_combined_dfs):
     
     return enrolled_gpas_online    
 
-def pell_grant_cleansing(pell, enrolled_gpas_online):
+def fully_online_features(crhr_df):
     """
-    Returns a dataframe that combines the enrollment data, GPA data, online data, and FAFSA data.
+    Returns the 'fully_online' flag of every student and term in the credit hour data.
+    """
+    # Count the online classes for every student in all of the previous Fall semesters at once
+    return count_all_online_classes(crhr_df)[['id', 'term', 'fully_online']]
+
+def fafsa_features(pell):
+    """
+    Returns the accepted and paid out financial aid of every student and term, one column per type of aid.
 
     Parameters:
-        pell_df (pd.DataFrame): Dataframe of FAFSA data pulled using PL/SQL from Oracle's Banner DB.
-        enrolled_gpas_online (pd.DataFrame): Dataframe of combined enrollment, GPA< and online data.
+        pell (pd.DataFrame): Dataframe of FAFSA data pulled using PL/SQL from Oracle's Banner DB.
 
     Returns:
-        pd.DataFrame: Dataframe with combined data.
+        pd.DataFrame: 'id' and 'term' with the no_pell, pell, subsidized, unsubsidized, summer_plus,
+                      kansas_promise and all_fafsa columns.
         
     """
     # Fill all null values in 'accepted_amt' with zeros
@@ -253,19 +318,35 @@ def pell_grant_cleansing(pell, enrolled_gpas_online):
     final_pell['NO PELL'] = [1 if i >= 1 else 0 for i in final_pell['NO PELL']]
     
     # View final pell
-    final_pell = final_pell.reset_index(drop = True)
+    final_pell = (final_pell.reset_index(drop = True)
+                            .rename(columns = {
+                                'Summer Plus':'summer_plus',
+                                'Kansas Promise':'kansas_promise',
+                                'NO PELL':'no_pell',
+                                'Subsidized':'subsidized',
+                                'PELL':'pell',
+                                'Unsubsidized':'unsubsidized'
+                            })
+                 )
+
+    return final_pell
+
+def pell_grant_cleansing(pell, enrolled_gpas_online):
+    """
+    Returns a dataframe that combines the enrollment data, GPA data, online data, and FAFSA data.
+
+    Parameters:
+        pell_df (pd.DataFrame): Dataframe of FAFSA data pulled using PL/SQL from Oracle's Banner DB.
+        enrolled_gpas_online (pd.DataFrame): Dataframe of combined enrollment, GPA< and online data.
+
+    Returns:
+        pd.DataFrame: Dataframe with combined data.
+        
+    """
+    final_pell = fafsa_features(pell)
 
     # Merge fafsa dataframe with enrolled_gpas_online dataframe
-    enrolled_gpas_online_fafsa = (enrolled_gpas_online.merge(final_pell, how = 'left', on = ['id', 'term'])
-                                      .rename(columns = {
-                                          'Summer Plus':'summer_plus',
-                                          'Kansas Promise':'kansas_promise',
-                                          'NO PELL':'no_pell',
-                                          'Subsidized':'subsidized',
-                                          'PELL':'pell',
-                                          'Unsubsidized':'unsubsidized'
-                                      })
-                                 )
+    enrolled_gpas_online_fafsa = guarded_merge(enrolled_gpas_online, final_pell, on = ['id', 'term'], cardinality = 'many_to_one')
     
     # Loop thrugh the FAFSA columns and fill all NaN values with 0 and make 
     # column into integer
@@ -284,18 +365,17 @@ def pell_grant_cleansing(pell, enrolled_gpas_online):
 
     return enrolled_gpas_online_fafsa
 
-def hs_matriculation_feature(high_school_df, enrolled_gpas_online_fafsa):
+def hs_matriculation_features(high_school_df):
     """
-    Returns a dataframe with all combined engineered features.
+    Returns the 'hs_matriculation' label of every student and term in the high school data.
 
     Parameters:
         high_school_df (pd.DataFrame): Dataframe pulled from Argos demographic report. The primary feature engineered here is
             generated by isolating the year a student graduated and if that student started the Fall semester immediately following
             their HS graduation. If they did, then they matriculated directly from HS.
-        enrolled_gpas_online_fafsa (pd.DataFrame): Combined dataframe of the pipeline up through this point.
 
     Returns:
-        pd.DataFrame: Dataframe with hs_matriculation feature added in.
+        pd.DataFrame: 'id', 'term' and 'hs_matriculation', keeping the first high school record of each student and term.
         
     """
     # Make hsgraddte into datetime object
@@ -314,33 +394,119 @@ def hs_matriculation_feature(high_school_df, enrolled_gpas_online_fafsa):
     # Identify which students enrolled in the Fall right after HS Graduation
     high_school_df['hs_matriculation'] = ['From HS' if  i == j else 'Not From HS' for i, j in zip(high_school_df['term_year'], high_school_df['hs_grad_yr'])]
     
-    # Merge enrolled_gpas_online_fafsa with all_hs[['id', 'term', 'hs_matriculation']]
-    all_hs_for_merge = high_school_df[['id', 'term', 'hs_matriculation']]
-    all_hs_for_merge['term'] = all_hs_for_merge['term'].astype(int)
-    
-    enrolled_gpas_online_fafsa_hs = (enrolled_gpas_online_fafsa.merge(all_hs_for_merge, how = 'left', on = ['id', 'term'])
-                                        .drop_duplicates(subset = ['id', 'term'])
-                                    )
-
-    # Validate data integrity
-    df1 = enrolled_gpas_online_fafsa[['term', 'id']]
-    df2 = enrolled_gpas_online_fafsa_hs[['term', 'id']]
-    df1_sorted = df1.sort_values(by=['term', 'id']).reset_index(drop=True)
-    df2_sorted = df2.sort_values(by=['term', 'id']).reset_index(drop=True)
-    
-    # Raise an exception if the DataFrames are not identical
-    if not df1_sorted.equals(df2_sorted):
-        raise ValueError("The DataFrames are different after the merge. Check the merging logic.")
+    # Keep the first high school record of each student and term
+    all_hs_for_merge = (high_school_df[['id', 'term', 'hs_matriculation']]
+                            .astype({'term': int})
+                            .drop_duplicates(subset = ['id', 'term'])
+                       )
+
+    return all_hs_for_merge
+
+# Columns of the training dataset, in order
+TRAINING_COLUMNS = ['term', 'pidm', 'age', 'id', 'totcr', 'status', 'stype', 'resd_desc',
+                    'degcode', 'majr_desc1', 'gender', 'ethn_desc', 'cnty_desc1', 'styp',
+                    'resd', 'acd_std_desc', 'term_att_crhr', 'term_earn_crhr', 'term_gpa',
+                    'inst_gpa', 'inst_earned', 'inst_hrs_att', 'overall_gpa',
+                    'fully_online', 'no_pell', 'pell', 'subsidized', 'unsubsidized',
+                    'summer_plus', 'kansas_promise', 'all_fafsa', 'hs_matriculation', 'enrolled']
+
+def hs_matriculation_feature(high_school_df, enrolled_gpas_online_fafsa):
+    """
+    Returns a dataframe with all combined engineered features.
+
+    Parameters:
+        high_school_df (pd.DataFrame): Dataframe pulled from Argos demographic report.
+        enrolled_gpas_online_fafsa (pd.DataFrame): Combined dataframe of the pipeline up through this point.
+
+    Returns:
+        pd.DataFrame: Dataframe with hs_matriculation feature added in.
+        
+    """
+    # Merge enrolled_gpas_online_fafsa with all_hs[['id', 'term', 'hs_matriculation']]. The merge guard raises an 
+    # exception if either side has more than one row for a student and term, so a duplicated training row is
+    # reported rather than carried into the training dataset
+    enrolled_gpas_online_fafsa_hs = guarded_merge(enrolled_gpas_online_fafsa, hs_matriculation_features(high_school_df),
+                                                  on = ['id', 'term'], cardinality = 'one_to_one')
 
     # Reorient columns
-    enrolled_gpas_online_fafsa_hs = enrolled_gpas_online_fafsa_hs[['term', 'pidm', 'age', 'id', 'totcr', 'status', 'stype', 'resd_desc',
-                                       'degcode', 'majr_desc1', 'gender', 'ethn_desc', 'cnty_desc1', 'styp',
-                                       'resd', 'acd_std_desc', 'term_att_crhr', 'term_earn_crhr', 'term_gpa',
-                                       'inst_gpa', 'inst_earned', 'inst_hrs_att', 'overall_gpa',
-                                       'fully_online', 'no_pell', 'pell', 'subsidized', 'unsubsidized',
-                                       'summer_plus', 'kansas_promise', 'all_fafsa', 'hs_matriculation', 'enrolled']]
-
-    return enrolled_gpas_online_fafsa_hs
+    return enrolled_gpas_online_fafsa_hs[TRAINING_COLUMNS]
+
+# Feature store versions of the merge steps, used by the pipeline. Each one adds only its new columns to the
+# store, aligned by (id, term), and the training dataset is selected once by materialize_training_data().
+def enrolled_gpa_store(all_enrolled_df, all_gpas):
+    """
+    Opens a feature store on the enrollment data, adds the GPA columns, and keeps the students with an overall GPA.
+    Same rows and values as combine_enrolled_and_gpa().
+    """
+    store = FeatureStore(all_enrolled_df).add(all_gpas)
+
+    return store.filter(store['overall_gpa'].notna())
+
+def clean_demographic_store(store):
+    """
+    Same cleaning as clean_demographic_data(), on a feature store.
+    """
+    store = store.filter(valid_demographic_rows(store.frame))
+
+    return store.assign(ethn_desc = fill_missing_ethnicity(store['ethn_desc']))
+
+def online_classes_store(crhr_df, store):
+    """
+    Adds the 'fully_online' column to a feature store.
+    """
+    return store.add(fully_online_features(crhr_df))
+
+def pell_grant_store(pell, store):
+    """
+    Adds the FAFSA columns to a feature store, with 0 for students who received no aid.
+    """
+    final_pell = fafsa_features(pell)
+    fafsa_cols = [col for col in final_pell.columns if col not in ['id', 'term']]
+    store = store.add(final_pell, columns = fafsa_cols)
+
+    return store.assign(**{col: store[col].fillna(0).astype(int) for col in fafsa_cols})
+
+def hs_matriculation_store(high_school_df, store):
+    """
+    Adds the 'hs_matriculation' column to a feature store.
+    """
+    return store.add(hs_matriculation_features(high_school_df))
+
+def materialize_training_data(store):
+    """
+    Returns the training dataset with TRAINING_COLUMNS, selected from the feature store in one copy.
+    """
+    return store.materialize(TRAINING_COLUMNS)
+
+# Label columns stored as boolean flags in compact mode, with the label that becomes True
+FLAG_COLUMNS = {'enrolled': 'Enrolled'}
+
+def compact_dtypes(df, max_category_ratio = 0.5):
+    """
+    Returns a copy of the dataframe with compact dtypes, used by the opt-in compact mode.
+
+    Parameters:
+        df (pd.DataFrame): Dataframe from any stage of the pipeline.
+        max_category_ratio (float): Text columns with at most this share of distinct values become categoricals.
+
+    Returns:
+        pd.DataFrame: Dataframe where FLAG_COLUMNS are booleans, repeated text is categorical, and integers
+                      are downcast to the smallest type that holds them (int8, int16, or int32).
+        
+    """
+    compact_df = df.copy()
+    
+    for col in compact_df.columns:
+        values = compact_df[col]
+        if col in FLAG_COLUMNS and not pd.api.types.is_bool_dtype(values):
+            # Rows that were already compacted keep their True and False flags
+            compact_df[col] = values.isin([True, FLAG_COLUMNS[col]])
+        elif pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            compact_df[col] = pd.to_numeric(values, downcast = 'integer')
+        elif values.dtype == 'object' and values.nunique() <= max_category_ratio * len(values):
+            compact_df[col] = values.astype('category')
+
+    return compact_df
 
 if __name__ == "__main__":
     # Create folder pathways
@@ -1,29 +1,48 @@
 import pandas as pd
 import numpy as np
 
-def load_and_prepare_data(data_path):
+from data_cleaning import compact_dtypes
+from profiling import memory_report
+
+def load_and_prepare_data(data_path, compact = False, keep_term = False):
     
     """
     Returns dataframe ready for XGBoost model.
 
     Parameters:
         data_path (str): Path to cleaned dataframe from data preparation (enrolled_gpas_online_fafsa_hs).
+                         Either the .csv file or the .parquet file written in compact mode.
+        compact (bool): Whether to use categoricals and downcast integers, reporting memory before and after.
+        keep_term (bool): Whether to keep the 'term' column, which incremental training splits the new terms by.
 
     Returns:
         pd.Dataframe: Modifed dataframe set up for XGBoost model.
     """
 
     # Load data
-    df = pd.read_csv(data_path)
+    if str(data_path).endswith('.parquet'):
+        df = pd.read_parquet(data_path)
+    else:
+        df = pd.read_csv(data_path)
 
     df = df[['enrolled', 'stype', 'gender', 'ethn_desc', 'resd', 'fully_online',
              'acd_std_desc', 'age', 'term_att_crhr', 'term_earn_crhr', 'term_gpa',
              'inst_gpa', 'inst_earned', 'no_pell', 'pell', 'subsidized', 'unsubsidized', 
-             'summer_plus', 'kansas_promise', 'all_fafsa', 'hs_matriculation']]
+             'summer_plus', 'kansas_promise', 'all_fafsa', 'hs_matriculation'] + (['term'] if keep_term else [])]
+
+    if compact:
+        memory_report('Before compacting', df)
+        df = compact_dtypes(df)
+        memory_report('After compacting', df)
 
     # Filter and encode data
-    df['enrolled'] = [1 if i == 'Enrolled' else 0 for i in df['enrolled']]
+    if pd.api.types.is_bool_dtype(df['enrolled']):
+        df['enrolled'] = df['enrolled'].astype('int8')
+    else:
+        df['enrolled'] = [1 if i == 'Enrolled' else 0 for i in df['enrolled']]
     df = df[df['resd'] != 'Z']
+    if isinstance(df['hs_matriculation'].dtype, pd.CategoricalDtype) and 'Not From HS' not in df['hs_matriculation'].cat.categories:
+        df['hs_matriculation'] = df['hs_matriculation'].cat.add_categories('Not From HS')
     df['hs_matriculation'] = df['hs_matriculation'].fillna('Not From HS')
     df = df[(df['age'] <= 60) & (df['age'] >= 10)]
     df = df[df['ethn_desc'] != 'DO NOT USE - Hispanic']
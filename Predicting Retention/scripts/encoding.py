@@ -0,0 +1,46 @@
+# encoding.py
+import pandas as pd
+
+# Code given to categories that were not seen in training
+UNSEEN_CODE = -1
+
+def fit_encoding_tables(df, columns):
+    """
+    Returns the encoding table of each categorical column, saved with the model so scoring reuses it.
+
+    Parameters:
+        df (pd.DataFrame): Training features.
+        columns (list): Categorical columns to encode.
+
+    Returns:
+        dict: Column name mapped to its sorted categories. A category's code is its position in the list,
+              the same code sklearn's LabelEncoder assigns.
+    """
+    return {col: sorted(df[col].astype(str).unique()) for col in columns}
+
+def apply_encoding_tables(df, encoders):
+    """
+    Encodes categorical columns with fitted tables, one vectorized lookup per column.
+
+    Parameters:
+        df (pd.DataFrame): Features to encode.
+        encoders (dict): Tables from fit_encoding_tables().
+
+    Returns:
+        pd.DataFrame: Copy of df with each encoded column replaced by its codes. Categories missing from
+                      a table get UNSEEN_CODE.
+    """
+    encoded = df.copy()
+    for col, categories in encoders.items():
+        if col in encoded.columns:
+            encoded[col] = pd.Categorical(encoded[col].astype(str), categories=categories).codes
+
+    return encoded
+
+def make_model_bundle(model, features, encoders, terms=None):
+    """
+    Returns the model bundle saved by run_training.py and loaded by prediction.py. 'terms' lists the terms the
+    model was trained on, so an incremental update only adds the terms it has not seen.
+    """
+    return {'model': model, 'features': list(features), 'encoders': encoders, 'unseen_code': UNSEEN_CODE,
+            'terms': None if terms is None else sorted(int(term) for term in terms)}
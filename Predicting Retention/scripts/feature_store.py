@@ -0,0 +1,168 @@
+# feature_store.py
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+from pandas.api.types import is_extension_array_dtype
+
+from merge_guard import duplicate_keys
+
+# Columns every feature frame is keyed by
+KEYS = ['id', 'term']
+
+def key_kind(dtype):
+    """
+    Returns the kind of a key column's dtype that get_indexer() can match: 'numeric' for integers and
+    floats, 'text' for strings, objects and categoricals, and the dtype's own kind otherwise.
+    """
+    if dtype.kind in 'iuf':
+        return 'numeric'
+    if dtype.kind in 'OSU':
+        return 'text'
+    return dtype.kind
+
+def renumbered(frame):
+    """
+    Returns a shallow copy of frame with a fresh RangeIndex. Unlike reset_index(), no column is copied.
+    """
+    frame = frame.copy(deep=False)
+    frame.index = pd.RangeIndex(len(frame))
+    return frame
+
+class FeatureStore:
+    """
+    Student and term rows keyed by a dense integer (id, term) index, that feature builders add columns to.
+
+    Each id and term gets an integer code, and a row's key is id_code * n_terms + term_code. Adding a feature
+    frame looks its keys up in a table of that size, so aligning new columns is linear in the rows and copies
+    nothing but the new columns, where a merge copies the whole frame. materialize() selects the training
+    columns once at the end.
+
+    Every method returns a new store that shares its unchanged columns with this one, so a pipeline step
+    never modifies its input.
+
+    Parameters:
+        frame (pd.DataFrame): Base rows with 'id' and 'term' columns and one row per key, e.g. the labeled
+                              enrollment data. Raises a ValueError listing the offending keys otherwise.
+    """
+    def __init__(self, frame):
+        n_rows, offending = duplicate_keys(frame, KEYS)
+        if n_rows:
+            raise ValueError(f"The store's base frame has {n_rows:,} rows sharing an (id, term) key. "
+                             f"Offending keys:\n{offending.to_string(index=False)}")
+
+        self.frame = renumbered(frame)
+        self.id_index = pd.Index(self.frame['id'].unique())
+        self.term_index = pd.Index(self.frame['term'].unique())
+        self.keys = self.encode(self.frame)
+
+    @property
+    def n_keys(self):
+        return len(self.id_index) * len(self.term_index)
+
+    @property
+    def columns(self):
+        return self.frame.columns
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    @property
+    def ndim(self):
+        return 2
+
+    def __len__(self):
+        return len(self.frame)
+
+    def __getitem__(self, column):
+        return self.frame[column]
+
+    def encode(self, df):
+        """
+        Returns the dense key of each row of df, or -1 where its id or term is not in the store.
+        """
+        id_codes = self.id_index.get_indexer(df['id'])
+        term_codes = self.term_index.get_indexer(df['term'])
+        keys = id_codes.astype(np.int64) * len(self.term_index) + term_codes
+
+        return np.where((id_codes >= 0) & (term_codes >= 0), keys, -1)
+
+    def _replace(self, frame, keys):
+        store = object.__new__(FeatureStore)
+        store.frame, store.keys = frame, keys
+        store.id_index, store.term_index = self.id_index, self.term_index
+        return store
+
+    def align(self, features):
+        """
+        Returns the row of features that belongs to each store row, or -1 for store rows it has no row for.
+
+        Raises a ValueError listing the offending keys if features has more than one row for a key in the
+        store, which a merge would fan out, and a ValueError if a key column's dtype cannot match the store's,
+        e.g. a text term against integer terms, which a merge also rejects.
+        """
+        for col, index in zip(KEYS, [self.id_index, self.term_index]):
+            if key_kind(features[col].dtype) != key_kind(index.dtype):
+                raise ValueError(f"The feature frame's '{col}' column is {features[col].dtype}, which cannot match "
+                                 f"the store's {index.dtype} '{col}' keys")
+
+        keys = self.encode(features)
+        matched = np.flatnonzero(keys >= 0)
+
+        lookup = np.full(self.n_keys, -1, dtype=np.int64)
+        lookup[keys[matched]] = matched
+        if np.count_nonzero(lookup >= 0) < len(matched):
+            n_rows, offending = duplicate_keys(features.iloc[matched], KEYS)
+            raise ValueError(f"The feature frame has {n_rows:,} rows sharing an (id, term) key of the store. "
+                             f"Offending keys:\n{offending.to_string(index=False)}")
+
+        return lookup[self.keys]
+
+    def add(self, features, columns=None):
+        """
+        Adds feature columns, aligned to the store's rows by their (id, term) keys.
+
+        Parameters:
+            features (pd.DataFrame): Feature frame with 'id' and 'term' columns and at most one row per key.
+            columns (list, optional): Columns to add. Defaults to every column of features but the keys.
+
+        Returns:
+            FeatureStore: Store with the new columns. Rows without a feature row get missing values, with the
+                          same dtypes a left merge would give them.
+        """
+        if columns is None:
+            columns = [col for col in features.columns if col not in KEYS]
+        existing = [col for col in columns if col in self.frame.columns]
+        if existing:
+            raise ValueError(f"The store already has the columns {existing}")
+
+        indexer = self.align(features)
+        new_columns = {}
+        for col in columns:
+            values = features[col].array if is_extension_array_dtype(features[col].dtype) else features[col].to_numpy()
+            new_columns[col] = take(values, indexer, allow_fill=True)
+
+        return self.assign(**new_columns)
+
+    def assign(self, **columns):
+        """
+        Adds or replaces columns computed from the store's own rows.
+        """
+        frame = self.frame.copy(deep=False)
+        for col, values in columns.items():
+            frame[col] = values
+
+        return self._replace(frame, self.keys)
+
+    def filter(self, mask):
+        """
+        Keeps the rows where mask is True.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        return self._replace(renumbered(self.frame[mask]), self.keys[mask])
+
+    def materialize(self, columns):
+        """
+        Returns the store's rows as a dataframe with the given columns, in that order.
+        """
+        return self.frame[list(columns)]
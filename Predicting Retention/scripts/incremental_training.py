@@ -0,0 +1,189 @@
+# incremental_training.py
+import time
+
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from encoding import apply_encoding_tables, make_model_bundle
+
+# Metrics compared by the guardrail, and whether higher is better
+GUARDRAIL_METRICS = {'accuracy': True, 'auc': True, 'log_loss': False}
+
+def split_new_terms(data, new_terms=None, trained_terms=None):
+    """
+    Splits the prepared dataset into the rows of the newly labelled terms and the rows of every earlier term.
+
+    Parameters:
+        data (pd.DataFrame): Dataset from load_and_prepare_data(keep_term=True).
+        new_terms (list, optional): Terms to add to the model. Defaults to the terms in data missing from
+                                    trained_terms, or to the latest term in data when trained_terms is None.
+        trained_terms (list, optional): Terms the model was already trained on. They are never new terms.
+
+    Returns:
+        tuple: The earlier rows, the new rows, and the new terms.
+    """
+    if new_terms is None:
+        new_terms = [data['term'].max()] if trained_terms is None else data['term'].unique()
+    if trained_terms is not None:
+        trained_terms = set(trained_terms)
+        new_terms = [term for term in new_terms if term not in trained_terms]
+    is_new = data['term'].isin(new_terms)
+
+    return data[~is_new], data[is_new], data.loc[is_new, 'term'].drop_duplicates().tolist()
+
+def holdout_metrics(model, X, y):
+    """
+    Returns the accuracy, ROC AUC and log loss of model on a holdout set.
+    """
+    probability = model.predict_proba(X)[:, 1]
+    return {
+        'accuracy': accuracy_score(y, (probability > 0.5).astype(int)),
+        'auc': roc_auc_score(y, probability) if y.nunique() > 1 else float('nan'),
+        'log_loss': log_loss(y, probability, labels=[0, 1])
+    }
+
+def degraded_metrics(candidate, baseline, tolerance):
+    """
+    Returns the metrics where the candidate is worse than the baseline by more than tolerance.
+    """
+    degraded = []
+    for metric, higher_is_better in GUARDRAIL_METRICS.items():
+        change = candidate[metric] - baseline[metric]
+        if (-change if higher_is_better else change) > tolerance:
+            degraded.append(metric)
+
+    return degraded
+
+def warm_start_model(model, X, y, extra_rounds, cores=None):
+    """
+    Continues boosting a trained XGBClassifier on new rows.
+
+    Parameters:
+        model (xgb.XGBClassifier): Trained model. It is not modified.
+        X (pd.DataFrame): Encoded features of the new rows.
+        y (pd.Series): Response of the new rows.
+        extra_rounds (int): Boosting rounds added on top of the model's trees.
+        cores (int, optional): XGBoost threads. Defaults to the model's.
+
+    Returns:
+        xgb.XGBClassifier: Model with the original trees followed by extra_rounds new ones.
+    """
+    params = model.get_params()
+    params['n_estimators'] = extra_rounds
+    if cores is not None:
+        params['n_jobs'] = cores
+
+    candidate = xgb.XGBClassifier(**params)
+    candidate.fit(X, y, xgb_model=model.get_booster())
+
+    return candidate
+
+def incremental_update(data, bundle, response='enrolled', new_terms=None, extra_rounds=100, holdout_size=0.2,
+                       tolerance=0.005, cores=None, random_state=101):
+    """
+    Refreshes a trained model with the newly labelled terms, without retraining it from scratch.
+
+    Only terms missing from the bundle's 'terms' are added, so the holdout is out of sample for the saved
+    model too. A stratified holdout is held back from the new terms. The rest of them is used to continue
+    boosting the saved model for extra_rounds rounds, with its encoding tables unchanged. A second holdout of
+    the same size is sampled from the terms the saved model was trained on, so an update that fits the new terms
+    by forgetting the earlier ones is caught. The warm-started model is only accepted if none of its metrics on
+    either holdout is worse than the saved model's by more than tolerance.
+
+    Parameters:
+        data (pd.DataFrame): Dataset from load_and_prepare_data(keep_term=True).
+        bundle (dict): Saved model bundle from encoding.make_model_bundle().
+        response (str): String of response variable name.
+        new_terms (list, optional): Terms to add to the model. Defaults to every term in data the bundle was not
+                                    trained on. Terms it was trained on are skipped.
+        extra_rounds (int): Boosting rounds added on the new terms.
+        holdout_size (float): Share of the new terms' rows held back for the guardrail. The same number of rows
+                              is sampled from the trained terms.
+        tolerance (float): How much worse than the saved model each guardrail metric may be.
+        cores (int, optional): XGBoost threads. Defaults to the saved model's.
+        random_state (int): Seed of the holdout split.
+
+    Returns:
+        tuple: The updated model bundle, or None if the guardrail rejected it and the model should be fully
+               retrained, and a report of the rows, metrics, and seconds of the update. The report's 'up_to_date'
+               is True when the bundle was already trained on every term, so there is nothing to retrain.
+    """
+    start = time.perf_counter()
+    report = {'new_terms': [], 'skipped_terms': [], 'new_rows': 0, 'extra_rounds': extra_rounds, 'accepted': False,
+              'up_to_date': False}
+
+    # Without the terms it was trained on, the saved model's holdout could be in-sample
+    trained_terms = bundle.get('terms') if isinstance(bundle, dict) else None
+    if trained_terms is None:
+        report['reason'] = 'the saved model does not record the terms it was trained on'
+        return None, report
+
+    if new_terms is not None:
+        report['skipped_terms'] = sorted(int(term) for term in new_terms if term in set(trained_terms))
+    _, new_rows, new_terms = split_new_terms(data, new_terms, trained_terms)
+    report['new_terms'], report['new_rows'] = new_terms, len(new_rows)
+    if not new_terms:
+        report['up_to_date'] = True
+        report['reason'] = 'the saved model was already trained on every requested term'
+        return None, report
+
+    # Warm starting needs both outcomes in the new terms' training and holdout rows
+    if new_rows.empty or new_rows[response].nunique() < 2:
+        report['reason'] = 'the new terms do not have both outcomes'
+        return None, report
+
+    # Hold back part of the new terms, encoded with the saved tables so the trees see the same codes
+    X = apply_encoding_tables(new_rows[bundle['features']], bundle['encoders'])
+    y = new_rows[response]
+    X_train, X_holdout, y_train, y_holdout = train_test_split(X, y, test_size=holdout_size, stratify=y,
+                                                              random_state=random_state)
+
+    # Sample as many rows from the trained terms. The saved model has seen them, so this holdout checks that the
+    # update keeps its fit to the earlier terms rather than estimating its accuracy on them
+    trained_rows = data[data['term'].isin(trained_terms)]
+    trained_rows = trained_rows.sample(n=min(len(trained_rows), len(y_holdout)), random_state=random_state)
+    X_trained = apply_encoding_tables(trained_rows[bundle['features']], bundle['encoders'])
+    y_trained = trained_rows[response]
+    report['trained_rows'] = len(trained_rows)
+
+    # Continue boosting on the new terms, and score both models on the same holdouts
+    candidate = warm_start_model(bundle['model'], X_train, y_train, extra_rounds, cores=cores)
+    report['baseline'] = holdout_metrics(bundle['model'], X_holdout, y_holdout)
+    report['candidate'] = holdout_metrics(candidate, X_holdout, y_holdout)
+    if len(trained_rows):
+        report['trained_baseline'] = holdout_metrics(bundle['model'], X_trained, y_trained)
+        report['trained_candidate'] = holdout_metrics(candidate, X_trained, y_trained)
+    report['seconds'] = time.perf_counter() - start
+
+    degraded = [f'new term {metric}' for metric in degraded_metrics(report['candidate'], report['baseline'], tolerance)]
+    if len(trained_rows):
+        degraded += [f'trained term {metric}' for metric in
+                     degraded_metrics(report['trained_candidate'], report['trained_baseline'], tolerance)]
+    if degraded:
+        report['reason'] = f"holdout {', '.join(degraded)} degraded by more than {tolerance}"
+        return None, report
+
+    report['accepted'] = True
+    return make_model_bundle(candidate, bundle['features'], bundle['encoders'], trained_terms + new_terms), report
+
+def print_update_report(report):
+    """
+    Prints the holdout metrics of the saved and the warm-started model, and whether the update was accepted.
+    """
+    print(f"Incremental update on terms {report['new_terms']}: {report['new_rows']:,} rows, "
+          f"{report['extra_rounds']} extra rounds")
+    if report['skipped_terms']:
+        print(f"Skipped terms the saved model was trained on: {report['skipped_terms']}")
+    if 'candidate' in report:
+        trained = 'trained_candidate' in report
+        print(f"{'metric':>10} {'saved':>8} {'updated':>8}" + (f" {'trained_saved':>14} {'trained_updated':>16}" if trained else ''))
+        for metric in GUARDRAIL_METRICS:
+            print(f"{metric:>10} {report['baseline'][metric]:>8.4f} {report['candidate'][metric]:>8.4f}"
+                  + (f" {report['trained_baseline'][metric]:>14.4f} {report['trained_candidate'][metric]:>16.4f}"
+                     if trained else ''))
+        print(f"Update time: {report['seconds']:,.1f} s")
+    if report['up_to_date']:
+        print(f"Nothing to update: {report['reason']}")
+    else:
+        print('Accepted' if report['accepted'] else f"Rejected: {report['reason']}")
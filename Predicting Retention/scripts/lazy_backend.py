@@ -0,0 +1,285 @@
+# lazy_backend.py
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+from csv_schemas import CSV_SCHEMAS, PIPELINE_COLUMNS
+from data_cleaning import TRAINING_COLUMNS, csv_file_paths, read_csv_file, schema_variant
+
+# Enrollment columns the training dataset keeps. Only these are read from the enrollment extracts.
+ENROLLMENT_COLUMNS = PIPELINE_COLUMNS['enrollment']
+
+# GPA columns the training dataset keeps, and the numeric ones the pandas left merge turns into floats when
+# a student has no GPA row
+GPA_COLUMNS = PIPELINE_COLUMNS['gpa'][2:]
+GPA_NUMERIC_COLUMNS = GPA_COLUMNS[1:]
+
+# Column of each FAFSA feature and the pell_nopell label it counts
+FAFSA_LABELS = {'no_pell': 'NO PELL', 'pell': 'PELL', 'subsidized': 'Subsidized', 'unsubsidized': 'Unsubsidized',
+                'summer_plus': 'Summer Plus', 'kansas_promise': 'Kansas Promise'}
+
+# Formats tried, in order, for high school graduation dates stored as text
+DATE_FORMATS = ['%m/%d/%Y', '%Y-%m-%d', '%m/%d/%Y %H:%M:%S', '%Y-%m-%d %H:%M:%S']
+
+def cached_extracts(folder_path, schema, cache):
+    """
+    Returns the cached Parquet file of each CSV in the folder, in the order load_csv_files() combines them.
+    Files that are not cached yet are parsed and cached first, one at a time.
+    """
+    entries = []
+    for file_path in csv_file_paths(folder_path):
+        entry = cache.entry_path(file_path, schema_variant(schema))
+        if not entry.exists():
+            read_csv_file(file_path, schema, cache, columns = [])
+        if not entry.exists():
+            raise ValueError(f"{file_path} could not be cached as Parquet, so the lazy backend cannot read it. "
+                             "Use the pandas backend.")
+        entries.append(entry.resolve().as_posix())
+
+    return entries
+
+def _scan(entries, columns, renames):
+    """
+    Returns SQL that scans the Parquet entries with their file and row position, reading only columns.
+    """
+    files = _files(entries)
+    select = ', '.join(f'"{col}" AS "{renames.get(col, col)}"' for col in columns)
+    return (f"SELECT {select}, list_position({files}, filename) AS _file, file_row_number AS _row "
+            f"FROM read_parquet({files}, union_by_name = true, filename = true, file_row_number = true)")
+
+def _literal(text):
+    """
+    Returns text quoted as a SQL string literal, e.g. a path with an apostrophe in it.
+    """
+    return "'" + str(text).replace("'", "''") + "'"
+
+def _files(entries):
+    """
+    Returns a SQL list of the Parquet entries.
+    """
+    return '[' + ', '.join(_literal(entry) for entry in entries) + ']'
+
+def _year(con, entries, column):
+    """
+    Returns SQL for the year of a date column, which the Parquet cache stores as a timestamp or as text.
+    """
+    column_type = con.execute(f"SELECT typeof(\"{column}\") FROM read_parquet({_files(entries[:1])}) LIMIT 1").fetchone()
+    if column_type is not None and column_type[0] in ('DATE', 'TIMESTAMP', 'TIMESTAMP_NS', 'TIMESTAMP WITH TIME ZONE'):
+        return f'year("{column}")'
+
+    parsed = ', '.join(f"try_strptime(\"{column}\", '{fmt}')" for fmt in DATE_FORMATS)
+    return f'year(coalesce({parsed}))'
+
+def training_data_query(con, sources, semesters, gpa_floats = True, filled = (), select = None):
+    """
+    Builds the query that runs every cleaning step of the pipeline, from record_retention to
+    hs_matriculation_feature, over the cached Parquet extracts.
+
+    Parameters:
+        con (duckdb.DuckDBPyConnection): Connection the query runs on.
+        sources (dict): Parquet entries of the 'enrollment', 'gpa', 'pell', 'location' and 'high_school' extracts.
+        semesters (list): Six digit semester codes, in chronological order.
+        gpa_floats (bool): Return the numeric GPA columns as floats, as the pandas merge does when a student
+                           has no GPA row.
+        filled (list): Enrollment columns besides the categorical ones that have missing values. The pandas
+                       pipeline fills every missing enrollment value with 'Not Enrolled', which turns such a
+                       column into text, so these are returned as text with the same fill.
+        select (str, optional): Final statement run on the steps' results instead of selecting the dataset.
+
+    Returns:
+        str: The query. Its rows and values are those of the pandas pipeline, in the same order.
+    """
+    terms = [int(semester) for semester in semesters]
+    pairs = ', '.join(f'({prev}, {curr}, {i})' for i, (prev, curr) in enumerate(zip(terms[:-1], terms[1:])))
+    label_columns = [col for col in ENROLLMENT_COLUMNS if col in CSV_SCHEMAS['enrollment']['categories']]
+    enrollment_select = ', '.join(f"coalesce(e.{col}, 'Not Enrolled') AS {col}" if col in label_columns
+                                  else f"coalesce(e.{col}::VARCHAR, 'Not Enrolled') AS {col}" if col in filled
+                                  else f'e.{col}' for col in ENROLLMENT_COLUMNS)
+    gpa_select = ', '.join(f'g.{col}::DOUBLE AS {col}' if gpa_floats and col in GPA_NUMERIC_COLUMNS else f'g.{col}'
+                           for col in GPA_COLUMNS)
+    fafsa_counts = ',\n               '.join(f"count_if(pell_nopell = '{label}')::BIGINT AS {col}"
+                                            for col, label in FAFSA_LABELS.items())
+    fafsa_labels = ', '.join(f"'{label}'" for label in FAFSA_LABELS.values())
+    final_columns = []
+    for col in TRAINING_COLUMNS:
+        if col == 'no_pell':
+            final_columns.append('least(coalesce(f.no_pell, 0), 1) AS no_pell')
+        elif col in FAFSA_LABELS or col == 'all_fafsa':
+            final_columns.append(f'coalesce(f.{col}, 0) AS {col}')
+        elif col == 'fully_online':
+            final_columns.append('o.fully_online')
+        elif col == 'hs_matriculation':
+            final_columns.append('h.hs_matriculation')
+        else:
+            final_columns.append(f'c.{col}')
+    final_select = ',\n           '.join(final_columns)
+    if select is None:
+        select = f"""SELECT {final_select}
+    FROM cleaned c
+    LEFT JOIN online o ON o.id = c.id AND o.term = c.term
+    LEFT JOIN fafsa f ON f.id = c.id AND f.term = c.term
+    LEFT JOIN hs h ON h.id = c.id AND h.term = c.term
+    ORDER BY c._pair, c._file, c._row"""
+    renames = {schema: CSV_SCHEMAS[schema]['rename'] for schema in CSV_SCHEMAS}
+    hs_year = _year(con, sources['high_school'], 'hsgraddte')
+
+    return f"""
+    WITH enrollment AS ({_scan(sources['enrollment'], ENROLLMENT_COLUMNS, renames['enrollment'])}
+                        WHERE term IN ({', '.join(map(str, terms))})),
+    pairs(term, next_term, _pair) AS (VALUES {pairs}),
+
+    -- record_retention: every previous term's students, labeled by whether they enrolled in the next term
+    retention AS (
+        SELECT {enrollment_select}, p._pair, e._file, e._row,
+               CASE WHEN n.id IS NULL THEN 'Not Enrolled' ELSE 'Enrolled' END AS enrolled
+        FROM enrollment e
+        JOIN pairs p ON e.term = p.term
+        LEFT JOIN (SELECT id, term FROM enrollment WHERE term IN ({', '.join(map(str, terms[1:]))})) n
+               ON n.id = e.id AND n.term = p.next_term
+    ),
+
+    -- combine_enrolled_and_gpa and clean_demographic_data
+    gpa AS ({_scan(sources['gpa'], PIPELINE_COLUMNS['gpa'], renames['gpa'])}),
+    cleaned AS (
+        SELECT r.* REPLACE (CASE WHEN r.ethn_desc = 'Not Enrolled' THEN 'Missing' ELSE r.ethn_desc END AS ethn_desc),
+               {gpa_select}
+        FROM retention r
+        LEFT JOIN gpa g ON g.id = r.id AND g.term = r.term
+        WHERE g.overall_gpa IS NOT NULL AND r.gender <> 'Not Enrolled' AND r.cnty_desc1 <> 'Not Enrolled'
+    ),
+
+    -- online_classes
+    online AS (
+        SELECT id, term, CASE WHEN count_if(loc = 'V') = count(*) THEN 'Fully Online' ELSE 'Not Fully Online' END AS fully_online
+        FROM ({_scan(sources['location'], PIPELINE_COLUMNS['location'], renames['location'])})
+        WHERE id IS NOT NULL AND term IS NOT NULL
+        GROUP BY id, term
+    ),
+
+    -- pell_grant_cleansing: aid that was accepted and paid out, counted by type
+    fafsa AS (
+        SELECT id, term,
+               {fafsa_counts},
+               count_if(pell_nopell IN ({fafsa_labels}))::BIGINT AS all_fafsa
+        FROM ({_scan(sources['pell'], PIPELINE_COLUMNS['pell'], renames['pell'])})
+        WHERE paid_date IS NOT NULL AND trunc(coalesce(accept_amt, 0)) <> 0 AND id IS NOT NULL AND term IS NOT NULL
+        GROUP BY id, term
+    ),
+
+    -- hs_matriculation_feature: the first high school record of each student and term
+    hs AS (
+        SELECT id, term,
+               CASE WHEN term // 100 = coalesce({hs_year}, 0) THEN 'From HS' ELSE 'Not From HS' END AS hs_matriculation
+        FROM (SELECT * REPLACE (term::BIGINT AS term)
+              FROM ({_scan(sources['high_school'], PIPELINE_COLUMNS['high_school'], renames['high_school'])}))
+        QUALIFY row_number() OVER (PARTITION BY id, term ORDER BY _file, _row) = 1
+    )
+
+    {select}
+    """
+
+def duplicate_gpa_keys(con, entries, limit = 10):
+    """
+    Returns up to limit (id, term) keys with more than one GPA row, which the pandas merge guard rejects.
+    """
+    scan = _scan(entries, ['studentid', 'gpatrm'], CSV_SCHEMAS['gpa']['rename'])
+    return con.execute(f"SELECT id, term, count(*) AS rows FROM ({scan}) WHERE id IS NOT NULL AND term IS NOT NULL "
+                       f"GROUP BY id, term HAVING count(*) > 1 LIMIT {int(limit)}").df()
+
+def lazy_training_data(folders, semesters, cache, output_path = None, memory_limit = None, temp_directory = None,
+                       threads = None):
+    """
+    Runs the cleaning pipeline as one DuckDB query over the Parquet extracts cached by CSVCache.
+
+    DuckDB reads only the columns and terms the query needs from each file, and its joins, aggregations and
+    final sort stream through the data, spilling to temp_directory past memory_limit, so the extracts never
+    have to fit in memory at once.
+
+    Parameters:
+        folders (dict): Folder of each source, keyed like main_pipeline.main()'s config.
+        semesters (list): Six digit semester codes, in chronological order.
+        cache (CSVCache): Parquet cache of the parsed CSV files. Files missing from it are parsed first.
+        output_path (str or Path, optional): Parquet file the training dataset is written to without passing
+                                             through pandas. The dataset is returned when it is None.
+        memory_limit (str, optional): DuckDB memory limit, e.g. '4GB'.
+        temp_directory (str or Path, optional): Folder DuckDB spills to.
+        threads (int, optional): Number of DuckDB threads.
+
+    Returns:
+        pd.DataFrame: The training dataset with TRAINING_COLUMNS, or None when it was written to output_path.
+    """
+    if duckdb is None:
+        raise ImportError("The lazy backend needs DuckDB. Install it with 'pip install duckdb'.")
+
+    sources = {
+        'enrollment': cached_extracts(folders['enrollment_folder'], CSV_SCHEMAS['enrollment'], cache),
+        'gpa': cached_extracts(folders['gpa_folder'], CSV_SCHEMAS['gpa'], cache),
+        'pell': cached_extracts(folders['pell_folder'], CSV_SCHEMAS['pell'], cache),
+        'location': cached_extracts(folders['online_folder'], CSV_SCHEMAS['location'], cache),
+        'high_school': cached_extracts(folders['high_school_folder'], CSV_SCHEMAS['high_school'], cache)
+    }
+
+    con = duckdb.connect()
+    try:
+        if memory_limit is not None:
+            con.execute(f"SET memory_limit = '{memory_limit}'")
+        if temp_directory is not None:
+            con.execute(f"SET temp_directory = {_literal(temp_directory)}")
+        if threads is not None:
+            con.execute(f"SET threads = {int(threads)}")
+
+        # Same check as the merge guard of combine_enrolled_and_gpa()
+        offending = duplicate_gpa_keys(con, sources['gpa'])
+        if len(offending):
+            raise ValueError(f"The right side of a many_to_one merge on ['id', 'term'] has rows sharing a key. "
+                             f"Offending keys:\n{offending.to_string(index = False)}")
+
+        # The pandas merge only turns integer GPA columns into floats when a student has no GPA row, and its
+        # 'Not Enrolled' fill only turns the other enrollment columns into text when one has a missing value
+        nullable = [col for col in ENROLLMENT_COLUMNS if col not in CSV_SCHEMAS['enrollment']['categories']]
+        counts = con.execute(training_data_query(con, sources, semesters, select = (
+            "SELECT (SELECT count(*) FROM retention r ANTI JOIN gpa g ON g.id = r.id AND g.term = r.term), "
+            + ', '.join(f'count_if({col} IS NULL)' for col in nullable) + " FROM retention"))).fetchone()
+        unmatched, missing = counts[0], dict(zip(nullable, counts[1:]))
+
+        query = training_data_query(con, sources, semesters, gpa_floats = unmatched > 0,
+                                    filled = [col for col in nullable if missing[col]])
+        if output_path is not None:
+            con.execute(f"COPY ({query}) TO {_literal(output_path)} (FORMAT PARQUET)")
+            return None
+
+        return con.execute(query).df()
+    finally:
+        con.close()
+
+def compare_outputs(expected, actual):
+    """
+    Checks the lazy backend's output against the pandas pipeline's, row by row.
+
+    Values are compared as the CSV output stores them, so a category and its label, an integer and the
+    same float, or a number and its text in a column filled with 'Not Enrolled', are equal.
+
+    Returns:
+        list: Description of each difference. Empty when the outputs match.
+    """
+    differences = []
+    if list(expected.columns) != list(actual.columns):
+        return [f'columns differ: {list(expected.columns)} vs {list(actual.columns)}']
+    if len(expected) != len(actual):
+        return [f'row counts differ: {len(expected):,} vs {len(actual):,}']
+
+    for col in expected.columns:
+        left, right = expected[col].reset_index(drop = True), actual[col].reset_index(drop = True)
+        if pd.api.types.is_numeric_dtype(left) and pd.api.types.is_numeric_dtype(right):
+            same = (left.astype(float) == right.astype(float)) | (left.isna() & right.isna())
+        else:
+            same = (left.astype(str) == right.astype(str)) | (left.isna() & right.isna())
+        if not same.all():
+            row = int((~same).to_numpy().argmax())
+            differences.append(f"{col}: {int((~same).sum()):,} rows differ, first at row {row} "
+                               f"({left.iloc[row]!r} vs {right.iloc[row]!r})")
+
+    return differences
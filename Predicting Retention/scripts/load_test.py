@@ -0,0 +1,93 @@
+# load_test.py
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prediction import MODEL_FEATURES
+
+async def post(reader, writer, path, payload=None):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    method = 'GET' if payload is None else 'POST'
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+
+    # Read the status line and headers, then the body
+    await reader.readline()
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode().partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    return json.loads(await reader.readexactly(int(headers['content-length'])))
+
+async def open_connection(host, port, unix_socket):
+    if unix_socket is not None:
+        return await asyncio.open_unix_connection(unix_socket)
+    return await asyncio.open_connection(host, port)
+
+async def client(students, n_requests, latencies, host, port, unix_socket):
+    """
+    Sends n_requests single-student requests one after another over one keep-alive connection.
+    """
+    reader, writer = await open_connection(host, port, unix_socket)
+    for i in range(n_requests):
+        start = time.perf_counter()
+        await post(reader, writer, '/score', students[i % len(students)])
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def run_load_test(students, concurrency, n_requests, host='127.0.0.1', port=8765, unix_socket=None):
+    """
+    Runs concurrent clients against the scoring server and reports client-side latency and throughput.
+
+    Parameters:
+        students (list): Student feature dicts to send, cycled through by each client.
+        concurrency (int): Number of clients sending requests at the same time.
+        n_requests (int): Number of requests sent by each client.
+        host (str), port (int), unix_socket (str, optional): Where the server is listening.
+
+    Returns:
+        dict: Client-side results, with the server's own /stats under 'server'.
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(students[i::concurrency] or students, n_requests, latencies, host, port, unix_socket)
+                           for i in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await open_connection(host, port, unix_socket)
+    server_stats = await post(reader, writer, '/stats')
+    writer.close()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+        'server': server_stats
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the local scoring server.")
+    parser.add_argument("--data-path", type=Path, default=Path.cwd() / 'data/new_data/new_cleaned_data.csv')
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200, help="Requests sent by each client.")
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None)
+    args = parser.parse_args()
+
+    # Send real student rows, with missing values as JSON nulls
+    sample = pd.read_csv(args.data_path, usecols=MODEL_FEATURES, nrows=10_000)
+    students = json.loads(sample.to_json(orient='records'))
+
+    results = asyncio.run(run_load_test(students, args.concurrency, args.requests,
+                                        args.host, args.port, args.unix_socket))
+    print(json.dumps(results, indent=2))
@@ -1,19 +1,66 @@
 # main_pipeline.py
+import argparse
+import pandas as pd
+from joblib import Memory
 from sklearn.pipeline import Pipeline
 from pathlib import Path
 from pipeline_steps import (
-    LoadCSVFiles,
     RecordRetention,
     RemoveMissingGPA,
     CombineEnrolledAndGPA,
     CleanDemographicData,
     OnlineClasses,
     PellGrantCleansing,
-    HSMatriculationFeature
+    HSMatriculationFeature,
+    MaterializeTrainingData
 )
-from data_cleaning import load_csv_files
+from data_cleaning import load_csv_files, compact_dtypes
+from csv_cache import CSVCache
+from csv_schemas import CSV_SCHEMAS, PIPELINE_COLUMNS
+from lazy_backend import lazy_training_data
+from profiling import instrument_steps, instrumented, memory_report, start_run_log, stop_run_log
 
-def main():
+def build_pipeline(semesters, years, gpa_data, pell_data, crhr_data, hs_data, memory=None):
+    """
+    Builds the cleaning pipeline that turns the enrollment data into the training dataset.
+
+    Parameters:
+    - semesters (list): Six digit semester codes, in chronological order.
+    - years (list): Two digit years used to label each semester pair.
+    - gpa_data, pell_data, crhr_data, hs_data (pd.DataFrame): Supporting data for the merge steps.
+    - memory (joblib.Memory, optional): Caches each step's output under a hash of its input and parameters.
+
+    Returns:
+    - Pipeline: The cleaning pipeline. The merge steps add their columns to a FeatureStore keyed by (id, term),
+      and the last step selects the training dataset from it once. Each step records its measurements while a
+      run log is active.
+    """
+    return Pipeline(instrument_steps([
+        ("record_retention", RecordRetention(semesters, years)),
+        ("remove_missing_gpa", RemoveMissingGPA()),
+        ("combine_enrolled_and_gpa", CombineEnrolledAndGPA(gpa_data)),
+        ("clean_demographic_data", CleanDemographicData()),
+        ("online_classes", OnlineClasses(crhr_data)),
+        ("pell_grant_cleansing", PellGrantCleansing(pell_data)),
+        ("hs_matriculation_feature", HSMatriculationFeature(hs_data)),
+        ("materialize_training_data", MaterializeTrainingData())
+    ]), memory=memory)
+
+def pending_semesters(processed, semesters, years):
+    """
+    Returns the semesters and years still needed to label the pairs missing from the processed dataset.
+
+    Rows in the processed dataset carry the earlier term of their pair, so a pair is done when its
+    first semester is in the 'term' column. Returns empty lists when every pair is done.
+    """
+    done = set(processed['term'].astype(str))
+    for i, semester in enumerate(semesters[:-1]):
+        if semester not in done:
+            return semesters[i:], years[i:]
+
+    return [], []
+
+def main(clear_cache=False, incremental=False, compact=False, backend="pandas", memory_limit=None):
     config = {
         "enrollment_folder": Path.cwd().parent / "Files/Enrollment",
         "gpa_folder": Path.cwd().parent / "Files/GPA and CrHrs",
@@ -22,33 +69,117 @@ def main():
         "high_school_folder": Path.cwd().parents[1] / "Enrollments/High School Enrollments/Files",
         "semesters": ['201980', '202080', '202180', '202280', '202380'],
         "years": [19, 20, 21, 22, 23],
-        "output_path": Path("data/processed/FA19 - FA23 Demographic Cleaned Dataset.csv")
+        "output_path": Path("data/processed/FA19 - FA23 Demographic Cleaned Dataset.csv"),
+        "cache_folder": Path("data/cache/csv"),
+        "cache_max_bytes": 2 * 1024**3,
+        "stage_cache_folder": Path("data/cache/stages"),
+        "stage_cache_max_bytes": 2 * 1024**3,
+        "lazy_temp_folder": Path("data/cache/duckdb"),
+        "lazy_memory_limit": "2GB"
     }
 
-    # Load supporting data (e.g., GPA, Pell, etc.)
-    gpa_data = load_csv_files(config["gpa_folder"])
-    pell_data = load_csv_files(config["pell_folder"])
-    crhr_data = load_csv_files(config["online_folder"])
-    hs_data = load_csv_files(config["high_school_folder"])
+    # Compact mode stores the dataset with compact dtypes as Parquet
+    if compact:
+        config["output_path"] = config["output_path"].with_suffix(".parquet")
 
-    # Define the pipeline
-    pipeline = Pipeline([
-        ("load_enrollment_data", LoadCSVFiles(config["enrollment_folder"])),
-        ("record_retention", RecordRetention(config["semesters"], config["years"])),
-        ("remove_missing_gpa", RemoveMissingGPA()),
-        ("combine_enrolled_and_gpa", CombineEnrolledAndGPA(gpa_data)),
-        ("clean_demographic_data", CleanDemographicData()),
-        ("online_classes", OnlineClasses(crhr_data)),
-        ("pell_grant_cleansing", PellGrantCleansing(pell_data)),
-        ("hs_matriculation_feature", HSMatriculationFeature(hs_data))
-    ])
+    # Parsed CSV extracts are cached as Parquet and only re-parsed when a file changes
+    cache = CSVCache(config["cache_folder"], max_bytes=config["cache_max_bytes"])
+
+    # Each pipeline step's output is cached under a hash of its input and parameters
+    memory = Memory(config["stage_cache_folder"], verbose=0)
+    if clear_cache:
+        cache.invalidate()
+        memory.clear(warn=False)
+
+    # In incremental mode, only label the semester pairs missing from the processed dataset
+    semesters, years = config["semesters"], config["years"]
+    processed = None
+    if incremental and config["output_path"].exists():
+        if compact:
+            processed = pd.read_parquet(config["output_path"])
+        else:
+            processed = pd.read_csv(config["output_path"])
+        semesters, years = pending_semesters(processed, semesters, years)
+        if not semesters:
+            print("Processed dataset already covers every semester pair.")
+            return processed
 
-    # Execute the pipeline
-    final_dataset = pipeline.fit_transform(None)
+    if backend == "duckdb":
+        # Run every cleaning step as one out-of-core query over the cached Parquet extracts
+        config["lazy_temp_folder"].mkdir(parents=True, exist_ok=True)
+        final_dataset = instrumented("lazy_training_data", lazy_training_data, config, semesters, cache,
+                                     memory_limit=memory_limit or config["lazy_memory_limit"],
+                                     temp_directory=config["lazy_temp_folder"])
+    else:
+        # Load enrollment and supporting data (e.g., GPA, Pell, etc.), reading only the columns the steps use
+        enrollment_data = instrumented("load_csv_files[enrollment]", load_csv_files, config["enrollment_folder"],
+                                       schema=CSV_SCHEMAS["enrollment"], cache=cache,
+                                       columns=PIPELINE_COLUMNS["enrollment"])
+        gpa_data = instrumented("load_csv_files[gpa]", load_csv_files, config["gpa_folder"],
+                                schema=CSV_SCHEMAS["gpa"], cache=cache, columns=PIPELINE_COLUMNS["gpa"])
+        pell_data = instrumented("load_csv_files[pell]", load_csv_files, config["pell_folder"],
+                                 schema=CSV_SCHEMAS["pell"], cache=cache, columns=PIPELINE_COLUMNS["pell"])
+        crhr_data = instrumented("load_csv_files[location]", load_csv_files, config["online_folder"],
+                                 schema=CSV_SCHEMAS["location"], cache=cache, columns=PIPELINE_COLUMNS["location"])
+        hs_data = instrumented("load_csv_files[high_school]", load_csv_files, config["high_school_folder"],
+                               schema=CSV_SCHEMAS["high_school"], cache=cache,
+                               columns=PIPELINE_COLUMNS["high_school"])
+
+        # In compact mode the extracts are compacted as they are loaded, so the pipeline holds them with
+        # compact dtypes throughout its run instead of only compacting the dataset it writes
+        if compact:
+            enrollment_data, gpa_data, pell_data, crhr_data, hs_data = (
+                compact_dtypes(df) for df in [enrollment_data, gpa_data, pell_data, crhr_data, hs_data])
+
+        # Define and execute the pipeline
+        pipeline = build_pipeline(semesters, years, gpa_data, pell_data, crhr_data, hs_data, memory=memory)
+        final_dataset = pipeline.fit_transform(enrollment_data)
+        memory.reduce_size(bytes_limit=config["stage_cache_max_bytes"])
+
+    # Append the new semester pairs, replacing any rows they recomputed. The compact dataset stores its labels
+    # as flags, so the new rows are compacted first.
+    if processed is not None:
+        if compact:
+            final_dataset = compact_dtypes(final_dataset)
+        recomputed = [int(semester) for semester in semesters[:-1]]
+        final_dataset = pd.concat([processed[~processed['term'].isin(recomputed)], final_dataset],
+                                  ignore_index=True)
 
     # Save the final dataset
     config["output_path"].parent.mkdir(parents=True, exist_ok=True)
-    final_dataset.to_csv(config["output_path"], index=False)
+    if compact:
+        memory_report("Before compacting", final_dataset)
+        final_dataset = compact_dtypes(final_dataset)
+        memory_report("After compacting", final_dataset)
+        final_dataset.to_parquet(config["output_path"], index=False)
+    else:
+        final_dataset.to_csv(config["output_path"], index=False)
+
+    return final_dataset
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the retention training dataset.")
+    parser.add_argument("--clear-cache", action="store_true", help="Invalidate the cached CSV extracts and pipeline steps first.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only compute the semester pairs missing from the processed dataset and append them.")
+    parser.add_argument("--compact", action="store_true",
+                        help="Store the dataset with categoricals, downcast integers, and boolean flags as Parquet.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record each step's time, memory, and row counts to the run log.")
+    parser.add_argument("--profile-log", type=Path, default=Path("data/logs/pipeline_runs.jsonl"))
+    parser.add_argument("--summary", action="store_true", help="Print a table of the recorded steps at the end.")
+    parser.add_argument("--backend", choices=["pandas", "duckdb"], default="pandas",
+                        help="'duckdb' runs the cleaning steps lazily over the cached Parquet extracts (needs duckdb).")
+    parser.add_argument("--memory-limit", default=None, help="Memory limit of the duckdb backend, e.g. '4GB'. Defaults to 2GB.")
+    args = parser.parse_args()
+
+    # Instrumentation is only on when profiling, otherwise every step runs uninstrumented
+    run_log = start_run_log(args.profile_log) if args.profile or args.summary else None
+    try:
+        main(clear_cache=args.clear_cache, incremental=args.incremental, compact=args.compact,
+             backend=args.backend, memory_limit=args.memory_limit)
+    finally:
+        stop_run_log()
+
+    if run_log is not None and args.summary:
+        run_log.summary()
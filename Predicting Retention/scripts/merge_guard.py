@@ -0,0 +1,88 @@
+# merge_guard.py
+import pandas as pd
+
+# Whether the left and right keys of each merge cardinality must be unique
+CARDINALITIES = {
+    'one_to_one': (True, True),
+    'one_to_many': (True, False),
+    'many_to_one': (False, True),
+    'many_to_many': (False, False)
+}
+
+def key_hashes(df, on):
+    """
+    Returns one 64-bit hash per row of the key columns. Categorical columns hash by value, so the same key
+    hashes the same way whatever its dtype's categories are.
+    """
+    return pd.util.hash_pandas_object(df[on], index=False).to_numpy()
+
+def duplicate_keys(df, on, limit = 10):
+    """
+    Finds the keys shared by more than one row with a single hash table pass over the key hashes.
+
+    Parameters:
+        df (pd.DataFrame): Dataframe whose keys should be unique.
+        on (list): Key columns.
+        limit (int): Largest number of offending keys to return.
+
+    Returns:
+        tuple: Number of rows with a duplicated key, and up to limit of those keys with their row counts.
+    """
+    on = list(on)
+    hashed = pd.Series(key_hashes(df, on)).duplicated(keep = False).to_numpy()
+    if not hashed.any():
+        return 0, pd.DataFrame(columns = on + ['rows'])
+
+    # Confirm the hash matches on the few flagged rows, so a hash collision is never reported
+    flagged = df.loc[hashed, on]
+    flagged = flagged[flagged.duplicated(keep = False)]
+    offending = (flagged.groupby(on, observed = True, sort = False).size()
+                        .rename('rows')
+                        .reset_index()
+                )
+
+    return len(flagged), offending.head(limit)
+
+def check_unique_keys(df, on, side, cardinality, limit = 10):
+    """
+    Raises a ValueError listing the offending keys if df has more than one row for any key.
+    """
+    n_rows, offending = duplicate_keys(df, on, limit)
+    if n_rows:
+        raise ValueError(f"The {side} side of a {cardinality} merge on {list(on)} has {n_rows:,} rows sharing a key. "
+                         f"Offending keys:\n{offending.to_string(index = False)}")
+
+def guarded_merge(left, right, on, how = 'left', cardinality = 'many_to_one', limit = 10, **kwargs):
+    """
+    Merges two dataframes after checking their keys against the declared cardinality, so a merge can never
+    silently fan out rows. All checks hash the keys once and run in linear time, without sorting.
+
+    Parameters:
+        left, right (pd.DataFrame): Dataframes to merge.
+        on (list): Key columns.
+        how (str): Merge type passed to DataFrame.merge().
+        cardinality (str): One of CARDINALITIES. 'many_to_one' requires unique right keys, for example.
+        limit (int): Largest number of offending keys listed in an error.
+        **kwargs: Other arguments of DataFrame.merge().
+
+    Returns:
+        pd.DataFrame: The merged dataframe. A left merge has exactly the keys of left, in the same order.
+    """
+    if cardinality not in CARDINALITIES:
+        raise ValueError(f"Unknown merge cardinality '{cardinality}', expected one of {list(CARDINALITIES)}")
+
+    on = [on] if isinstance(on, str) else list(on)
+    left_unique, right_unique = CARDINALITIES[cardinality]
+    if left_unique:
+        check_unique_keys(left, on, 'left', cardinality, limit)
+    if right_unique:
+        check_unique_keys(right, on, 'right', cardinality, limit)
+
+    merged = left.merge(right, how = how, on = on, **kwargs)
+
+    # A left merge onto unique right keys keeps every left row exactly once, so its keys are left's keys
+    if how == 'left' and right_unique and len(merged) != len(left):
+        raise ValueError(f"The {cardinality} merge on {on} changed its left keys: {len(left):,} rows in, "
+                         f"{len(merged):,} rows out.")
+
+    return merged
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 # Gridsearch for xgboost model training
 PARAMS = {
     'max_depth': [3, 4, 5],
@@ -7,6 +9,23 @@ PARAMS = {
     'subsample': [0.7, 0.8, 0.9]
 }
 
+# Successive halving search over the same grid, with n_estimators as the boosting rounds of the rungs
+HALVING_OPTIONS = {
+    'eta': 3,
+    'cv': 3,
+    'early_stopping_rounds': 25,
+    'max_seconds': 15 * 60,
+    'max_fits': None
+}
+
+# Incremental retraining: boosting rounds added on the newly labelled term, share of its rows held back, and
+# how much worse than the saved model its holdout metrics may be before falling back to a full retrain
+INCREMENTAL_OPTIONS = {
+    'extra_rounds': 100,
+    'holdout_size': 0.2,
+    'tolerance': 0.005
+}
+
 # Path to data
 DATA_PATH = f'{Path.cwd()}/data/processed/FA19 - FA23 Demographic Cleaned Dataset.csv'
 
@@ -0,0 +1,268 @@
+# model_search.py
+import itertools
+import math
+import threading
+import time
+
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+def expand_grid(params, exclude=()):
+    """
+    Returns every combination of the parameter grid as a list of dicts, leaving out the excluded keys.
+    """
+    keys = [key for key in params if key not in exclude]
+    return [dict(zip(keys, values)) for values in itertools.product(*(params[key] for key in keys))]
+
+def halving_rounds(min_rounds, max_rounds, eta=3):
+    """
+    Returns the number of boosting rounds of each rung, growing by a factor of eta up to max_rounds.
+
+    Parameters:
+        min_rounds (int): Fewest boosting rounds a candidate is trained with.
+        max_rounds (int): Boosting rounds of the last rung.
+        eta (int): Factor the rounds grow by, and the candidates shrink by, from one rung to the next.
+
+    Returns:
+        list: Boosting rounds of each rung, smallest first. E.g. [111, 333, 1000] for 100, 1000 and 3.
+    """
+    rounds = [max_rounds]
+    while rounds[-1] // eta >= min_rounds:
+        rounds.append(rounds[-1] // eta)
+
+    return rounds[::-1]
+
+class SearchBudget:
+    """
+    Tracks the time spent and the number of fits made against optional limits.
+
+    Parameters:
+        max_seconds (float, optional): Wall-clock limit of the search.
+        max_fits (int, optional): Limit on the number of models trained.
+    """
+    def __init__(self, max_seconds=None, max_fits=None):
+        self.max_seconds = max_seconds
+        self.max_fits = max_fits
+        self.fits = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def exhausted(self):
+        return ((self.max_seconds is not None and self.elapsed >= self.max_seconds)
+                or (self.max_fits is not None and self.fits >= self.max_fits))
+
+    def charge(self):
+        with self._lock:
+            self.fits += 1
+
+def fold_matrices(X, y, folds, max_bin=256):
+    """
+    Builds the quantized training and validation matrices of each fold once, so every candidate
+    trained on the fold reuses the same histogram bins instead of re-binning the dataframe.
+
+    Parameters:
+        X (pd.DataFrame): Encoded training features.
+        y (pd.Series): Training response.
+        folds (list): (train, validation) row positions of each fold.
+        max_bin (int): Number of histogram bins per feature, XGBoost's default.
+
+    Returns:
+        list: (training matrix, validation matrix, validation response) of each fold. The validation
+              matrix uses the training matrix's bins, as when XGBClassifier.fit() is given an eval_set.
+    """
+    matrices = []
+    for train_idx, valid_idx in folds:
+        dtrain = xgb.QuantileDMatrix(X.iloc[train_idx], y.iloc[train_idx], max_bin=max_bin)
+        dvalid = xgb.QuantileDMatrix(X.iloc[valid_idx], y.iloc[valid_idx], ref=dtrain)
+        matrices.append((dtrain, dvalid, y.iloc[valid_idx].to_numpy()))
+
+    return matrices
+
+def booster_params(candidate, seed=101, nthread=None):
+    """
+    Returns the xgb.train() parameters of the XGBClassifier that train_xgboost_model() fits.
+    nthread limits the threads of each fit, which otherwise uses every core.
+    """
+    params = {'objective': 'binary:logistic', 'tree_method': 'hist', 'eval_metric': 'logloss', 'seed': seed, **candidate}
+    if nthread is not None:
+        params['nthread'] = nthread
+
+    return params
+
+def fold_accuracy(booster, dvalid, y_valid, n_rounds):
+    """
+    Returns the accuracy of the booster's first n_rounds trees, with XGBClassifier.predict()'s 0.5 cut-off.
+    """
+    probability = booster.predict(dvalid, iteration_range=(0, n_rounds))
+    return float(np.mean((probability > 0.5) == y_valid))
+
+def cross_validate_rounds(matrices, candidate, n_rounds, early_stopping_rounds, budget, seed=101, nthread=None):
+    """
+    Trains a candidate on each fold with early stopping on the fold's validation rows.
+
+    Parameters:
+        matrices (list): Quantized matrices of each fold from fold_matrices().
+        candidate (dict): XGBoost parameters other than n_estimators.
+        n_rounds (int): Most boosting rounds a fold is trained with.
+        early_stopping_rounds (int): Rounds without improvement in validation log loss before a fold stops.
+        budget (SearchBudget): Budget charged one fit per fold.
+        seed (int): Random seed of every model.
+        nthread (int, optional): XGBoost threads of each fit.
+
+    Returns:
+        tuple: Mean validation accuracy and mean number of rounds kept by early stopping, or None when
+               the budget ran out before every fold was trained.
+    """
+    accuracies, best_rounds = [], []
+    for dtrain, dvalid, y_valid in matrices:
+        if budget.exhausted():
+            return None
+
+        booster = xgb.train(booster_params(candidate, seed, nthread), dtrain, num_boost_round=n_rounds,
+                            evals=[(dvalid, 'valid')], early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+        budget.charge()
+
+        # Score the rounds kept by early stopping, as XGBClassifier.predict() does
+        accuracies.append(fold_accuracy(booster, dvalid, y_valid, booster.best_iteration + 1))
+        best_rounds.append(booster.best_iteration + 1)
+
+    return float(np.mean(accuracies)), int(round(np.mean(best_rounds)))
+
+def grid_candidate_accuracies(matrices, candidate, n_estimators, seed=101, nthread=None):
+    """
+    Trains a candidate once per fold to the largest n_estimators and returns its fold accuracies for
+    each n_estimators.
+    """
+    accuracies = {n_rounds: [] for n_rounds in n_estimators}
+    for dtrain, dvalid, y_valid in matrices:
+        booster = xgb.train(booster_params(candidate, seed, nthread), dtrain, num_boost_round=max(n_estimators))
+        for n_rounds in n_estimators:
+            accuracies[n_rounds].append(fold_accuracy(booster, dvalid, y_valid, n_rounds))
+
+    return accuracies
+
+def cached_grid_search(X, y, params, cv=5, max_bin=256, seed=101, n_jobs=1, nthread=None):
+    """
+    Exhaustive grid search that matches GridSearchCV(cv=cv, scoring='accuracy') while reusing work.
+
+    Each fold is quantized once by fold_matrices() and shared by every grid point. Grid points that only
+    differ in n_estimators share one booster trained to the largest n_estimators, and each of them
+    is scored on the booster's first n_estimators trees, which are the trees a shorter run would grow.
+
+    Parameters:
+        X (pd.DataFrame): Encoded training features.
+        y (pd.Series): Training response.
+        params (dict): Parameter grid, as given to GridSearchCV.
+        cv (int): Number of stratified folds, split as GridSearchCV splits them.
+        max_bin (int): Number of histogram bins per feature.
+        seed (int): Random seed of every model.
+        n_jobs (int): Number of candidates trained at the same time, on threads sharing the fold matrices.
+        nthread (int, optional): XGBoost threads of each fit.
+
+    Returns:
+        dict: Best parameters, the first best grid point in GridSearchCV's order.
+        dict: Search report with the time spent, number of fits, and the best CV accuracy.
+    """
+    start = time.perf_counter()
+    folds = list(StratifiedKFold(n_splits=cv).split(X, y))
+    matrices = fold_matrices(X, y, folds, max_bin)
+    n_estimators = sorted(params.get('n_estimators', [100]))
+
+    candidates = expand_grid(params, exclude=('n_estimators',))
+    results = Parallel(n_jobs=n_jobs, backend='threading')(
+        delayed(grid_candidate_accuracies)(matrices, candidate, n_estimators, seed, nthread) for candidate in candidates
+    )
+
+    scores = {}
+    for candidate, accuracies in zip(candidates, results):
+        for n_rounds, fold_scores in accuracies.items():
+            scores[tuple(sorted({**candidate, 'n_estimators': n_rounds}.items()))] = float(np.mean(fold_scores))
+
+    # Break ties the way GridSearchCV does, by taking the first best point of ParameterGrid
+    grid = list(ParameterGrid(params))
+    best_params = max(grid, key=lambda point: scores[tuple(sorted(point.items()))])
+    report = {
+        'seconds': round(time.perf_counter() - start, 1),
+        'fits': len(candidates) * cv,
+        'cv_accuracy': scores[tuple(sorted(best_params.items()))]
+    }
+
+    return best_params, report
+
+def successive_halving_search(X, y, params, eta=3, cv=3, early_stopping_rounds=25, max_seconds=None,
+                              max_fits=None, seed=101, n_jobs=1, nthread=None):
+    """
+    Searches the parameter grid with successive halving over boosting rounds.
+
+    Every combination is first trained with few boosting rounds, and only the best 1/eta of them are
+    trained again with eta times more rounds, up to the largest n_estimators in the grid. Each fold
+    stops early once its validation log loss stops improving. The search ends after the last rung,
+    or sooner when the time or fit budget runs out, and returns the best candidate of the last rung
+    that was fully evaluated.
+
+    Parameters:
+        X (pd.DataFrame): Encoded training features.
+        y (pd.Series): Training response.
+        params (dict): Parameter grid, as given to GridSearchCV. n_estimators sets the rounds of the rungs.
+        eta (int): Factor the candidates shrink by, and the rounds grow by, from one rung to the next.
+        cv (int): Number of stratified folds.
+        early_stopping_rounds (int): Rounds without improvement before a fold stops.
+        max_seconds (float, optional): Wall-clock budget of the search.
+        max_fits (int, optional): Budget on the number of models trained.
+        seed (int): Random seed of the folds and of every model.
+        n_jobs (int): Number of candidates trained at the same time, on threads sharing the fold matrices.
+        nthread (int, optional): XGBoost threads of each fit.
+
+    Returns:
+        dict: Best parameters, with n_estimators set to the rounds kept by early stopping.
+        dict: Search report with the time spent, number of fits, rungs completed, and the best CV accuracy.
+    """
+    n_estimators = params.get('n_estimators', [100])
+    rounds = halving_rounds(min(n_estimators), max(n_estimators), eta)
+    candidates = expand_grid(params, exclude=('n_estimators',))
+    folds = list(StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(X, y))
+    budget = SearchBudget(max_seconds, max_fits)
+    matrices = fold_matrices(X, y, folds)
+
+    best, rungs_completed = None, 0
+    for rung, n_rounds in enumerate(rounds):
+        # Keep the best 1/eta of the candidates for the next rung, and all of them on the first
+        if rung > 0:
+            candidates = [candidate for _, _, candidate in best[:max(1, math.ceil(len(best) / eta))]]
+
+        results = Parallel(n_jobs=n_jobs, backend='threading')(
+            delayed(cross_validate_rounds)(matrices, candidate, n_rounds, early_stopping_rounds, budget, seed, nthread)
+            for candidate in candidates
+        )
+        scores = [(result[0], result[1], candidate) for candidate, result in zip(candidates, results) if result is not None]
+
+        # When the budget runs out mid-rung, keep the ranking of the last full rung
+        if len(scores) < len(candidates):
+            if best is None and scores:
+                best = sorted(scores, key=lambda score: -score[0])
+            break
+
+        best = sorted(scores, key=lambda score: -score[0])
+        rungs_completed += 1
+        if len(candidates) == 1:
+            break
+
+    if best is None:
+        raise ValueError(f"The search budget ran out before a single candidate was evaluated on all {cv} folds.")
+
+    accuracy, best_rounds, candidate = best[0]
+    report = {
+        'seconds': round(budget.elapsed, 1),
+        'fits': budget.fits,
+        'rungs': rounds,
+        'rungs_completed': rungs_completed,
+        'cv_accuracy': accuracy
+    }
+
+    return {**candidate, 'n_estimators': best_rounds}, report
@@ -1,20 +1,37 @@
+import time
 import xgboost as xgb
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.preprocessing import LabelEncoder
+from joblib import parallel_config
+from sklearn.model_selection import train_test_split, GridSearchCV, ParameterGrid
 from sklearn.metrics import accuracy_score, classification_report
 
-from data_preparation import load_and_prepare_data
+from encoding import fit_encoding_tables, apply_encoding_tables
+from model_search import cached_grid_search, successive_halving_search
+from thread_budget import (CPUMeter, available_cores, print_thread_report, probe_thread_splits, save_thread_report,
+                           split_cores)
 
-def train_xgboost_model(prepped_xgb, response, params):
+def train_xgboost_model(prepped_xgb, response, params, search = 'grid', search_options = None, cores = None,
+                        thread_policy = 'balanced', thread_report_path = None):
     """
     Parameters:
         prepped_xgb (pd.DataFrame): Dataframe prepped for XGBoost.
         response (str): String of response variable name.
         params (dict): Parameters for GridSearch.
+        search (str): 'grid' for an exhaustive GridSearchCV, 'cached_grid' for the same search on quantized
+                      fold matrices built once (model_search.py), or 'halving' for a successive halving
+                      search over boosting rounds with early stopping.
+        search_options (dict, optional): Keyword arguments of successive_halving_search(), e.g. its
+                                         'max_seconds' and 'max_fits' budget.
+        cores (int, optional): Core budget of the search. Defaults to the cores available to the process.
+        thread_policy (str or tuple): How the cores are split between concurrent fits and XGBoost threads per
+                                      fit: 'outer', 'inner', 'balanced', 'auto' to probe every split first
+                                      (thread_budget.py), or an explicit (outer, inner) tuple.
+        thread_report_path (str or Path, optional): JSON lines file the split, the search's fits per minute and
+                                                    CPU utilization, and any probe results are appended to.
         
     Returns:
         XGBoost Model: Returns best xgboost model
-        grid_search.best_params_: Returns ideal parameters for model
+        best_params: Returns ideal parameters for model
+        encoders (dict): Returns the encoding tables of the categorical features, to be saved with the model
 
     """
     # Split data
@@ -22,26 +39,65 @@ def train_xgboost_model(prepped_xgb, response, params):
     y = prepped_xgb[response]
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size = 0.2, random_state = 101)
 
-    # Encode categorical vars
-    le = LabelEncoder()
-    for col in X_train.columns:
-        if X_train[col].dtype == 'object':
-            X_train[col] = le.fit_transform(X_train[col].astype(str))
-            X_test[col] = le.transform(X_test[col].astype(str))
+    # Encode categorical vars with tables that are saved alongside the model
+    cat_cols = [col for col in X_train.columns if X_train[col].dtype.name in ('object', 'category')]
+    encoders = fit_encoding_tables(X_train, cat_cols)
+    X_train = apply_encoding_tables(X_train, encoders)
+    X_test = apply_encoding_tables(X_test, encoders)
 
-    # Initialize and tune model
-    xgb_clf = xgb.XGBClassifier(objective = 'binary:logistic', seed = 101)
-    grid_search = GridSearchCV(
-        xgb_clf, param_grid = params, cv = 5, n_jobs = -1, scoring = 'accuracy'
-    )
-    grid_search.fit(X_train, y_train)
+    # Split the core budget between concurrent fits and XGBoost threads per fit
+    probe = None
+    if isinstance(thread_policy, tuple):
+        n_jobs, nthread = thread_policy
+        cores = cores or n_jobs * nthread
+    elif thread_policy == 'auto':
+        cores = cores or available_cores()
+        (n_jobs, nthread), probe = probe_thread_splits(X_train, y_train, cores)
+        print_thread_report(probe)
+    else:
+        cores = cores or available_cores()
+        n_jobs, nthread = split_cores(cores, thread_policy)
+
+    # Initialize and tune model, with the concurrent fits on threads so their CPU time is measured
+    start = time.perf_counter()
+    with CPUMeter(cores) as meter:
+        if search == 'halving':
+            best_params, report = successive_halving_search(X_train, y_train, params, **(search_options or {}),
+                                                            n_jobs = n_jobs, nthread = nthread)
+            meter.fits = report['fits']
+            print(f"Successive halving: {report['fits']} fits, {report['rungs_completed']} of {len(report['rungs'])} rungs")
+        elif search == 'cached_grid':
+            best_params, report = cached_grid_search(X_train, y_train, params, cv = 5, n_jobs = n_jobs, nthread = nthread)
+            meter.fits = report['fits']
+            print(f"Cached grid search: {report['fits']} fits")
+        else:
+            xgb_clf = xgb.XGBClassifier(objective = 'binary:logistic', seed = 101, n_jobs = nthread)
+            grid_search = GridSearchCV(
+                xgb_clf, param_grid = params, cv = 5, n_jobs = n_jobs, scoring = 'accuracy', refit = False
+            )
+            with parallel_config(backend = 'threading'):
+                grid_search.fit(X_train, y_train)
+            best_params = grid_search.best_params_
+            meter.fits = len(ParameterGrid(params)) * 5
+
+    search_stats = meter.summary()
+    print(f"Thread budget: {n_jobs} concurrent fits x {nthread} threads on {cores} cores, "
+          f"{search_stats['fits_per_minute']} fits/min, {search_stats['cpu_utilization']:.0%} CPU utilization")
+    if thread_report_path is not None:
+        policy = thread_policy if isinstance(thread_policy, str) else 'explicit'
+        save_thread_report(thread_report_path, cores, (n_jobs, nthread), search_stats, probe,
+                           search = search, thread_policy = policy, rows = len(X_train))
+
+    # Refit the best parameters on the whole training set with every core
+    best_model = xgb.XGBClassifier(objective = 'binary:logistic', seed = 101, n_jobs = cores, **best_params)
+    best_model.fit(X_train, y_train)
 
     # Evaluate model
-    best_model = grid_search.best_estimator_
     y_pred = best_model.predict(X_test)
-    print('Best Parameters:', grid_search.best_params_)
+    print(f'Search time: {time.perf_counter() - start:,.1f} s')
+    print('Best Parameters:', best_params)
     print('Accuracy:', accuracy_score(y_test, y_pred))
     print('Classification Report:\n', classification_report(y_test, y_pred))
 
-    return best_model, grid_search.best_params_
+    return best_model, best_params, encoders
     
@@ -0,0 +1,91 @@
+# native_model.py
+import json
+from pathlib import Path
+
+from encoding import apply_encoding_tables
+
+def native_model_paths(model_path):
+    """
+    Returns the booster path and the metadata sidecar path stored next to the pickled model.
+    """
+    model_path = Path(model_path)
+    return model_path.with_suffix('.ubj'), model_path.with_suffix('.json')
+
+def save_native_model(bundle, model_path, threshold=0.5):
+    """
+    Saves the bundled model's booster in XGBoost's native UBJSON format with a JSON metadata sidecar.
+
+    Parameters:
+        bundle (dict): Model bundle from encoding.make_model_bundle().
+        model_path (str or Path): Path of the pickled bundle. The .ubj and .json files are saved next to it.
+        threshold (float): Probability above which a student is predicted to enroll.
+
+    Returns:
+        tuple: Paths of the booster and of the metadata sidecar.
+    """
+    booster_path, metadata_path = native_model_paths(model_path)
+    bundle['model'].get_booster().save_model(booster_path)
+
+    metadata = {
+        'booster': booster_path.name,
+        'features': bundle['features'],
+        'encoders': bundle['encoders'],
+        'unseen_code': bundle['unseen_code'],
+        'threshold': threshold
+    }
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    return booster_path, metadata_path
+
+class NativeModel:
+    """
+    Scores with a booster loaded from its native format, without unpickling the sklearn wrapper.
+
+    Exposes predict() and predict_proba() like the pickled XGBClassifier, so it can be passed to
+    prediction.predict().
+
+    Parameters:
+        booster (xgboost.Booster): The loaded booster.
+        metadata (dict): Metadata sidecar written by save_native_model().
+    """
+    def __init__(self, booster, metadata):
+        self.booster = booster
+        self.features = metadata['features']
+        self.encoders = metadata['encoders']
+        self.threshold = metadata['threshold']
+
+    def predict_proba(self, X):
+        import numpy as np
+
+        # Encode categorical features if they have not been already
+        X = X[self.features]
+        if any(X[col].dtype.name in ('object', 'category') for col in self.encoders):
+            X = apply_encoding_tables(X, self.encoders)
+
+        probability = self.booster.inplace_predict(X)
+        return np.column_stack([1 - probability, probability])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > self.threshold).astype(int)
+
+def load_native_model(model_path):
+    """
+    Loads the booster and metadata saved by save_native_model(). XGBoost is only imported here.
+
+    Parameters:
+        model_path (str or Path): Path of the pickled bundle, or of the .ubj or .json file next to it.
+
+    Returns:
+        NativeModel: Model ready to score raw or encoded features.
+    """
+    import xgboost as xgb
+
+    booster_path, metadata_path = native_model_paths(model_path)
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+
+    booster = xgb.Booster()
+    booster.load_model(booster_path)
+
+    return NativeModel(booster, metadata)
@@ -7,23 +7,27 @@ from data_cleaning import (
     load_csv_files,
     record_retention,
     remove_missing_gpa,
-    combine_enrolled_and_gpa,
-    clean_demographic_data,
-    online_classes,
-    pell_grant_cleansing,
-    hs_matriculation_feature
+    enrolled_gpa_store,
+    clean_demographic_store,
+    online_classes_store,
+    pell_grant_store,
+    hs_matriculation_store,
+    materialize_training_data
 )
 
-# Define the pipeline step classes here
+# Define the pipeline step classes here. The steps from CombineEnrolledAndGPA to HSMatriculationFeature pass
+# a FeatureStore along, and MaterializeTrainingData turns it into the training dataset.
 class LoadCSVFiles(BaseEstimator, TransformerMixin):
-    def __init__(self, folder_path):
+    def __init__(self, folder_path, schema=None, cache=None):
         self.folder_path = folder_path
+        self.schema = schema
+        self.cache = cache
 
     def fit(self, X=None, y=None):
         return self
 
     def transform(self, X=None):
-        return load_csv_files(self.folder_path)
+        return load_csv_files(self.folder_path, schema=self.schema, cache=self.cache)
 
 class RecordRetention(BaseEstimator, TransformerMixin):
     def __init__(self, semesters, years):
@@ -51,14 +55,14 @@ class CombineEnrolledAndGPA(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        return combine_enrolled_and_gpa(X, self.gpa_data)
+        return enrolled_gpa_store(X, self.gpa_data)
 
 class CleanDemographicData(BaseEstimator, TransformerMixin):
     def fit(self, X, y=None):
         return self
 
     def transform(self, X):
-        return clean_demographic_data(X)
+        return clean_demographic_store(X)
 
 class OnlineClasses(BaseEstimator, TransformerMixin):
     def __init__(self, crhr_data):
@@ -68,7 +72,7 @@ class OnlineClasses(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        return online_classes(self.crhr_data, X)
+        return online_classes_store(self.crhr_data, X)
 
 class PellGrantCleansing(BaseEstimator, TransformerMixin):
     def __init__(self, pell_data):
@@ -78,7 +82,7 @@ class PellGrantCleansing(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        return pell_grant_cleansing(self.pell_data, X)
+        return pell_grant_store(self.pell_data, X)
 
 class HSMatriculationFeature(BaseEstimator, TransformerMixin):
     def __init__(self, hs_data):
@@ -88,5 +92,12 @@ class HSMatriculationFeature(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        return hs_matriculation_feature(self.hs_data, X)
+        return hs_matriculation_store(self.hs_data, X)
+
+class MaterializeTrainingData(BaseEstimator, TransformerMixin):
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        return materialize_training_data(X)
 
@@ -1,9 +1,26 @@
+import argparse
+import queue
+import threading
 import pandas as pd
 from pathlib import Path
-import joblib
-from sklearn.preprocessing import LabelEncoder
 
-def preprocess_data(input_data, model_features, categorical_features):
+from encoding import apply_encoding_tables
+from prediction_cache import PredictionCache, model_version, predict_cached
+from prediction_store import PredictionStore
+
+# joblib and sklearn are imported only by the paths that need them, so scoring with the native
+# model artifact from native_model.py does not load them at startup
+
+# Features used by the retention model
+MODEL_FEATURES = ['stype', 'gender', 'ethn_desc', 'resd', 'fully_online', 'acd_std_desc', 'age', 
+                  'term_att_crhr', 'term_earn_crhr', 'term_gpa', 'inst_gpa', 'inst_earned', 'no_pell',
+                  'pell', 'subsidized', 'unsubsidized', 'summer_plus', 'kansas_promise', 'all_fafsa', 
+                  'hs_matriculation']
+
+# Categorical features that need encoding
+CAT_FEATURES = ['stype', 'gender', 'ethn_desc', 'resd', 'fully_online', 'acd_std_desc', 'hs_matriculation']
+
+def preprocess_data(input_data, model_features, categorical_features, encoders=None):
     """
     Preprocesses new input data for the trained model.
 
@@ -11,6 +28,8 @@ def preprocess_data(input_data, model_features, categorical_features):
         input_data (pd.DataFrame): New data to run predictions on.
         model_features (list): The list of features used during training.
         categorical_features (list): The list of categorical features that need encoding.
+        encoders (dict, optional): Encoding tables bundled with the model. When given, every batch is
+                                   encoded with the same codes used in training.
 
     Returns:
         Pd.DataFrame: Preprocessed data ready for prediction.
@@ -18,7 +37,12 @@ def preprocess_data(input_data, model_features, categorical_features):
     # Select only the features used for training
     input_data = input_data[model_features]
 
-    # Encode categorical variables
+    # Encode categorical variables with the model's frozen tables
+    if encoders is not None:
+        return apply_encoding_tables(input_data, encoders)
+
+    # Models saved without encoders fall back to fitting a new encoder on each batch
+    from sklearn.preprocessing import LabelEncoder
     le = LabelEncoder()
     for col in categorical_features:
         if col in input_data.columns:
@@ -37,8 +61,27 @@ def load_model(model_path):
         Trained model
 
     """
+    import joblib
     return joblib.load(model_path)
 
+def load_model_bundle(model_path):
+    """
+    Loads the model bundle saved by run_training.py.
+
+    Parameters:
+        model_path (str): Path to pickle file.
+
+    Returns:
+        dict: The model with its 'features' and 'encoders'. Both are None for models saved before
+              they were bundled.
+
+    """
+    bundle = load_model(model_path)
+    if not isinstance(bundle, dict):
+        bundle = {'model': bundle, 'features': None, 'encoders': None}
+
+    return bundle
+
 def predict(model, preprocessed_data):
     """
     Uses the trained model to make predictions on the new data.
@@ -53,34 +96,247 @@ def predict(model, preprocessed_data):
     """
     return model.predict(preprocessed_data)
 
+def explain(model, preprocessed_data, top_k=3, chunksize=50_000):
+    """
+    Finds each student's top risk factors with the booster's built-in TreeSHAP contributions.
+
+    A feature's contribution is how much it moves the student's log-odds of enrolling. The risk factors
+    are the top_k features with the most negative contributions, i.e. those that lower the student's
+    predicted probability of enrolling the most. Only negative contributions are risk factors, so a
+    student with fewer than top_k of them has the remaining slots left empty. Contributions are computed
+    for a chunk of students at a time, and the top_k are selected with one vectorized partition per chunk.
+
+    Parameters:
+        model: The trained model, either the pickled XGBClassifier or a native_model.NativeModel.
+        preprocessed_data (pd.DataFrame): Preprocessed data ready for prediction.
+        top_k (int): Number of risk factors kept per student.
+        chunksize (int): Number of students whose contributions are computed at a time.
+
+    Returns:
+        np.ndarray: Positions of each student's risk factors in preprocessed_data.columns, shape (students, top_k),
+                    or -1 for an empty slot.
+        np.ndarray: Their contributions in log-odds, most negative first, shape (students, top_k), or NaN for an
+                    empty slot.
+    """
+    import numpy as np
+    import xgboost as xgb
+
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model.booster
+    n_students, n_features = preprocessed_data.shape
+    top_k = min(top_k, n_features)
+    factors = np.empty((n_students, top_k), dtype=np.int16)
+    contributions = np.empty((n_students, top_k), dtype=np.float32)
+
+    for start in range(0, n_students, chunksize):
+        chunk = preprocessed_data.iloc[start:start + chunksize]
+        stop = start + len(chunk)
+
+        # The last column is the bias term, which is the same for every student
+        chunk_contributions = booster.predict(xgb.DMatrix(chunk), pred_contribs=True)[:, :-1]
+
+        # Partition out the top_k most negative contributions, then order them
+        top = np.argpartition(chunk_contributions, top_k - 1, axis=1)[:, :top_k]
+        values = np.take_along_axis(chunk_contributions, top, axis=1)
+        order = np.argsort(values, axis=1)
+        factors[start:stop] = np.take_along_axis(top, order, axis=1)
+        contributions[start:stop] = np.take_along_axis(values, order, axis=1)
+
+    # A feature that does not lower the student's probability of enrolling is not a risk factor
+    empty = ~(contributions < 0)
+    factors[empty] = -1
+    contributions[empty] = np.nan
+
+    return factors, contributions
+
+def explanation_columns(model_features, factors, contributions):
+    """
+    Returns the risk factors from explain() as output columns: 'risk_factor_1' holds the feature name
+    of each student's largest risk factor and 'risk_contribution_1' its contribution, and so on. Empty
+    slots are left blank.
+    """
+    import numpy as np
+
+    names = np.where(factors >= 0, np.asarray(model_features, dtype=object)[factors], None)
+    columns = {}
+    for rank in range(factors.shape[1]):
+        columns[f'risk_factor_{rank + 1}'] = names[:, rank]
+        columns[f'risk_contribution_{rank + 1}'] = contributions[:, rank].round(4)
+
+    return columns
+
+def read_ahead(chunks, depth=1):
+    """
+    Reads chunks on a background thread, keeping at most depth chunks waiting so reading the next
+    chunk overlaps with scoring the current one.
+
+    Parameters:
+        chunks (iterator): Iterator of dataframes, e.g. from pd.read_csv(..., chunksize=...).
+        depth (int): Number of chunks read ahead of the one being scored.
+
+    Returns:
+        generator: The same chunks, in order.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+
+    def reader():
+        try:
+            for chunk in chunks:
+                buffer.put(chunk)
+        except Exception as error:
+            buffer.put(error)
+        buffer.put(done)
+
+    threading.Thread(target=reader, daemon=True).start()
+    while (chunk := buffer.get()) is not done:
+        if isinstance(chunk, Exception):
+            raise chunk
+        yield chunk
+
+def score_in_chunks(model, input_path, output_path, model_features, categorical_features,
+                    chunksize=50_000, prefetch=False, encoders=None, explain_top_k=0, cache=None, store=None,
+                    version=None):
+    """
+    Scores a CSV file chunk by chunk, appending each chunk's predictions to the output CSV, so memory
+    is bounded by the chunk size rather than by the number of students.
+
+    Parameters:
+        model: The trained model.
+        input_path (str or Path): CSV file of new data to run predictions on.
+        output_path (str or Path): CSV file the input columns and 'predicted_enrollment' are written to.
+        model_features (list): The list of features used during training.
+        categorical_features (list): The list of categorical features that need encoding.
+        chunksize (int): Number of rows read, scored, and written at a time.
+        prefetch (bool): Read the next chunk on a background thread while the current one is scored.
+        encoders (dict, optional): Encoding tables bundled with the model.
+        explain_top_k (int): Number of risk factors from explain() written next to each prediction. 0 writes none.
+        cache (PredictionCache, optional): Cache of the model's predictions. Only rows missing from it are scored.
+        store (PredictionStore, optional): Store each chunk's keys and predictions are upserted into as it is
+                                           scored, instead of writing the output CSV. A key repeated in a later
+                                           chunk replaces the earlier prediction.
+        version (str, optional): Model version recorded in the store.
+
+    Returns:
+        int: Number of rows scored.
+    """
+    chunks = pd.read_csv(input_path, chunksize=chunksize)
+    if prefetch:
+        chunks = read_ahead(chunks)
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    n_rows = 0
+    report = {'written': [], 'unchanged': [], 'rows_written': 0}
+    for i, chunk in enumerate(chunks):
+        preprocessed_chunk = preprocess_data(chunk, model_features, categorical_features, encoders)
+        if cache is not None:
+            chunk['predicted_enrollment'] = predict_cached(model, preprocessed_chunk, cache)
+        else:
+            chunk['predicted_enrollment'] = predict(model, preprocessed_chunk)
+        if explain_top_k:
+            factors, contributions = explain(model, preprocessed_chunk, top_k=explain_top_k, chunksize=chunksize)
+            chunk = chunk.assign(**explanation_columns(model_features, factors, contributions))
+
+        if store is not None:
+            # Upsert the chunk into its terms' partitions, so memory stays bounded by the chunk size
+            chunk_report = store.upsert(chunk[['id', 'term', 'predicted_enrollment']], version)
+            report['written'] += [term for term in chunk_report['written'] if term not in report['written']]
+            report['unchanged'] += [term for term in chunk_report['unchanged'] if term not in report['unchanged']]
+            report['rows_written'] += chunk_report['rows_written']
+        else:
+            # Start a new file with the first chunk and append the rest without a header
+            chunk.to_csv(output_path, index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        n_rows += len(chunk)
+
+    if store is not None:
+        report['unchanged'] = [term for term in report['unchanged'] if term not in report['written']]
+        store.print_report(report)
+
+    return n_rows
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate retention predictions for new data.")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Score the input this many rows at a time instead of loading it whole.")
+    parser.add_argument("--prefetch", action="store_true", help="Read the next chunk while scoring the current one.")
+    parser.add_argument("--native", action="store_true",
+                        help="Load the native booster and metadata sidecar saved next to the pickled model.")
+    parser.add_argument("--explain", type=int, default=0, metavar="K",
+                        help="Write each student's top K risk factors and their contributions next to the prediction.")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse the predictions of students whose features have not changed since an earlier run.")
+    parser.add_argument("--cache-entries", type=int, default=5_000_000,
+                        help="Number of predictions kept in the cache, least recently used first out.")
+    parser.add_argument("--sink", choices=['csv', 'store'], default='csv',
+                        help="Write every input column to the predictions CSV, or upsert only the (id, term) keys, "
+                             "prediction, and model version into the term-partitioned prediction store.")
+    args = parser.parse_args()
+    if args.sink == 'store' and args.explain:
+        parser.error("--explain writes risk factors to the predictions CSV and cannot be used with --sink store")
+
     MODEL_PATH = Path.cwd() / 'models/xgb_retention_model.pkl'
     INPUT_DATA_PATH = Path.cwd() / 'data/new_data/new_cleaned_data.csv'
     OUTPUT_PATH = Path.cwd() / 'data/predictions/predictions.csv'
+    CACHE_FOLDER = Path.cwd() / 'data/cache/predictions'
+    STORE_FOLDER = Path.cwd() / 'data/predictions/store'
+
+    # Load the model with its encoding tables
+    if args.native:
+        from native_model import load_native_model, native_model_paths
+        model = load_native_model(MODEL_PATH)
+        encoders = model.encoders
+        artifacts = native_model_paths(MODEL_PATH)
+    else:
+        bundle = load_model_bundle(MODEL_PATH)
+        model, encoders = bundle['model'], bundle['encoders']
+        artifacts = [MODEL_PATH]
 
-    # Load the model
-    model = load_model(MODEL_PATH)
+    # Without the bundled tables each batch is encoded on its own, so a row's hash would not identify its features
+    if args.cache and encoders is None:
+        parser.error("--cache needs a model saved with its encoding tables. Retrain it with run_training.py.")
 
-    # Load new data
-    new_data = pd.read_csv(INPUT_DATA_PATH)
+    # Tag cached and stored predictions with the version of the model artifact, so a new model starts with an empty cache
+    version = model_version(*artifacts) if args.cache or args.sink == 'store' else None
+    cache = PredictionCache(CACHE_FOLDER, version, args.cache_entries) if args.cache else None
+    store = PredictionStore(STORE_FOLDER) if args.sink == 'store' else None
 
     # Define features
-    model_features = ['stype', 'gender', 'ethn_desc', 'resd', 'fully_online', 'acd_std_desc', 'age', 
-                      'term_att_crhr', 'term_earn_crhr', 'term_gpa', 'inst_gpa', 'inst_earned', 'no_pell',
-                      'pell', 'subsidized', 'unsubsidized', 'summer_plus', 'kansas_promise', 'all_fafsa', 
-                      'hs_matriculation']
+    model_features = MODEL_FEATURES
 
     # Isolate categorical features
-    cat_features = ['stype', 'gender', 'ethn_desc', 'resd', 'fully_online', 'acd_std_desc', 'hs_matriculation']
+    cat_features = CAT_FEATURES
+
+    if args.chunksize:
+        # Score the new data in chunks, appending each chunk to the output
+        score_in_chunks(model, INPUT_DATA_PATH, OUTPUT_PATH, model_features, cat_features,
+                        chunksize=args.chunksize, prefetch=args.prefetch, encoders=encoders,
+                        explain_top_k=args.explain, cache=cache, store=store, version=version)
+    else:
+        # Load new data
+        new_data = pd.read_csv(INPUT_DATA_PATH)
+
+        # Preporcess new data
+        preprocessed_data = preprocess_data(new_data, model_features, cat_features, encoders)
+
+        # Generate predictions
+        if cache is not None:
+            predictions = predict_cached(model, preprocessed_data, cache)
+        else:
+            predictions = predict(model, preprocessed_data)
 
-    # Preporcess new data
-    preprocessed_data = preprocess_data(new_data, model_features, cat_features)
+        # Save predictions
+        output = new_data.copy()
+        output['predicted_enrollment'] = predictions
 
-    # Generate predictions
-    predictions = predict(model, preprocessed_data)
+        # Add each student's top risk factors
+        if args.explain:
+            factors, contributions = explain(model, preprocessed_data, top_k=args.explain)
+            output = output.assign(**explanation_columns(model_features, factors, contributions))
+        if store is not None:
+            store.print_report(store.upsert(output, version))
+        else:
+            OUTPUT_PATH.parent.mkdir(parents = True, exist_ok = True)
+            output.to_csv(OUTPUT_PATH, index = False)
 
-    # Save predictions
-    output = new_data.copy()
-    output['predicted_enrollment'] = predictions
-    OUTPUT_PATH.parent.mkdir(parents = True, exist_ok = True)
-    output.to_csv(OUTPUT_PATH, index = False)
+    if cache is not None:
+        cache.save()
+        cache.print_stats()
@@ -0,0 +1,168 @@
+# prediction_cache.py
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+def model_version(*paths):
+    """
+    Returns a hex digest of the contents of the model artifact files, e.g. the pickled bundle or the native
+    booster and its metadata sidecar. Any change to them gives a new version.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+    return digest.hexdigest()
+
+def row_hashes(preprocessed_data):
+    """
+    Returns one 64-bit hash per row of encoded features. The features are hashed as floats, so a row hashes
+    the same way whether a column was read as integers or floats.
+    """
+    return pd.util.hash_pandas_object(preprocessed_data.astype('float64'), index=False).to_numpy()
+
+class PredictionCache:
+    """
+    On-disk Parquet cache of predictions keyed by the hash of each student's encoded feature row.
+
+    The entries are stored under the version of the model that made them, so they are dropped as soon as
+    the model artifact changes. Each scoring run marks the entries it uses, and the least recently used
+    entries are evicted once the cache holds more than max_entries rows. The hits and new entries of a run
+    are collected as it scores, chunk by chunk, and applied to the stored entries once by save().
+
+    Parameters:
+        cache_folder (str or Path): Folder where the Parquet file is stored.
+        version (str): Version of the model, from model_version().
+        max_entries (int): Number of rows kept. Defaults to 5 million.
+    """
+    def __init__(self, cache_folder, version, max_entries=5_000_000):
+        self.cache_folder = Path(cache_folder)
+        self.version = version
+        self.max_entries = max_entries
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+        self.stats = {'hits': 0, 'misses': 0, 'evicted': 0, 'invalidated': 0}
+
+        # Drop the entries of every other model version
+        for entry in self.cache_folder.glob('*.parquet'):
+            if entry != self.entry_path:
+                self.stats['invalidated'] += len(pd.read_parquet(entry, columns=['row_hash']))
+                entry.unlink(missing_ok=True)
+
+        if self.entry_path.exists():
+            entries = pd.read_parquet(self.entry_path)
+        else:
+            entries = pd.DataFrame({'row_hash': np.empty(0, dtype=np.uint64), 'prediction': np.empty(0, dtype=np.int8),
+                                    'last_used': np.empty(0, dtype=np.int64)})
+        self.run = int(entries['last_used'].max()) + 1 if len(entries) else 0
+        self.entries = entries.set_index('row_hash')
+
+        # Positions of the entries this run used, and the predictions of the hashes it added
+        self.used = []
+        self.pending = {}
+
+    @property
+    def entry_path(self):
+        return self.cache_folder / f'{self.version}.parquet'
+
+    def lookup(self, hashes):
+        """
+        Returns the cached prediction of each hash, and a mask of the hashes that were found.
+        """
+        positions = self.entries.index.get_indexer(hashes)
+        found = positions >= 0
+
+        # Mark the entries as used by this run for eviction when the cache is saved
+        self.used.append(positions[found])
+
+        predictions = np.zeros(len(hashes), dtype=np.int8)
+        predictions[found] = self.entries['prediction'].to_numpy()[positions[found]]
+
+        # Hashes added by an earlier chunk of this run
+        if self.pending:
+            missed = np.flatnonzero(~found)
+            added = [self.pending.get(row_hash) for row_hash in hashes[missed].tolist()]
+            hit = np.array([prediction is not None for prediction in added], dtype=bool)
+            if hit.any():
+                predictions[missed[hit]] = [prediction for prediction in added if prediction is not None]
+                found[missed[hit]] = True
+
+        self.stats['hits'] += int(found.sum())
+        self.stats['misses'] += int((~found).sum())
+
+        return predictions, found
+
+    def update(self, hashes, predictions):
+        """
+        Stores the predictions of new hashes until the cache is saved. Repeated hashes, e.g. students with the
+        same features, are stored once.
+        """
+        for row_hash, prediction in zip(np.asarray(hashes).tolist(), np.asarray(predictions).tolist()):
+            self.pending.setdefault(row_hash, prediction)
+
+    def apply_run(self):
+        """
+        Marks the entries this run used and adds the ones it stored, with one copy of the entries.
+        """
+        last_used = self.entries['last_used'].to_numpy(copy=True)
+        for positions in self.used:
+            last_used[positions] = self.run
+        entries = self.entries.assign(last_used=last_used)
+
+        if self.pending:
+            new_entries = pd.DataFrame({'prediction': np.fromiter(self.pending.values(), dtype=np.int8,
+                                                                  count=len(self.pending)),
+                                        'last_used': self.run},
+                                       index=pd.Index(np.fromiter(self.pending.keys(), dtype=np.uint64,
+                                                                  count=len(self.pending)), name='row_hash'))
+            entries = pd.concat([entries, new_entries])
+
+        self.entries, self.used, self.pending = entries, [], {}
+
+    def save(self):
+        """
+        Applies this run's hits and new entries, evicts the least recently used entries past max_entries, then
+        writes the cache.
+        """
+        self.apply_run()
+        if len(self.entries) > self.max_entries:
+            self.stats['evicted'] += len(self.entries) - self.max_entries
+            self.entries = self.entries.sort_values('last_used', ascending=False, kind='stable').iloc[:self.max_entries]
+
+        temp_entry = self.entry_path.with_suffix(f'.{os.getpid()}.tmp')
+        self.entries.reset_index().to_parquet(temp_entry, index=False)
+        os.replace(temp_entry, self.entry_path)
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def print_stats(self):
+        print(f"Prediction cache: {self.stats['hits']:,} hits, {self.stats['misses']:,} misses "
+              f"({self.hit_rate():.1%} hit rate), {self.stats['evicted']:,} evicted, "
+              f"{self.stats['invalidated']:,} invalidated by a model change")
+
+def predict_cached(model, preprocessed_data, cache):
+    """
+    Predicts only the rows whose feature hash is not in the cache, and stores their predictions.
+
+    Parameters:
+        model: The trained model.
+        preprocessed_data (pd.DataFrame): Preprocessed data ready for prediction.
+        cache (PredictionCache): Cache of the model's predictions.
+
+    Returns:
+        np.ndarray: Predictions of every row, the same as model.predict(preprocessed_data).
+    """
+    hashes = row_hashes(preprocessed_data)
+    predictions, found = cache.lookup(hashes)
+    if not found.all():
+        missed = ~found
+        predictions[missed] = model.predict(preprocessed_data[missed])
+        cache.update(hashes[missed], predictions[missed])
+
+    return predictions
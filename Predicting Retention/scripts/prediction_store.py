@@ -0,0 +1,109 @@
+# prediction_store.py
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from merge_guard import duplicate_keys
+
+# Columns of the store, keyed by (id, term)
+STORE_COLUMNS = ['id', 'term', 'predicted_enrollment', 'model_version']
+
+class PredictionStore:
+    """
+    Term-partitioned Parquet store of predictions for the Power BI feed, with upserts on (id, term).
+
+    Each term is one Parquet file holding only the keys, the prediction, and the version of the model that
+    made it, sorted by id. An upsert rewrites only the partitions whose rows actually changed, so a daily run
+    where few predictions change writes little. _manifest.json records each partition's rows, model
+    versions, and when it last changed, so a refresh can pull only the partitions updated since its last run.
+
+    Parameters:
+        store_folder (str or Path): Folder of the partition files and the manifest.
+    """
+    def __init__(self, store_folder):
+        self.store_folder = Path(store_folder)
+        self.store_folder.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.store_folder / '_manifest.json'
+        self.manifest = json.loads(self.manifest_path.read_text()) if self.manifest_path.exists() else {}
+
+    def partition_path(self, term):
+        return self.store_folder / f'term={term}.parquet'
+
+    @staticmethod
+    def _write(df, path):
+        temp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        df.to_parquet(temp_path, index=False)
+        os.replace(temp_path, path)
+
+    def upsert(self, predictions, model_version):
+        """
+        Inserts or replaces the predictions of each (id, term), leaving the other rows of their terms as they were.
+
+        Parameters:
+            predictions (pd.DataFrame): 'id', 'term' and 'predicted_enrollment' columns, one row per key.
+            model_version (str): Version of the model that made the predictions, from prediction_cache.model_version().
+
+        Returns:
+            dict: Terms whose partition was written, terms left unchanged, and rows written.
+        """
+        n_rows, offending = duplicate_keys(predictions, ['id', 'term'])
+        if n_rows:
+            raise ValueError(f"The predictions have {n_rows:,} rows sharing an (id, term) key. "
+                             f"Offending keys:\n{offending.to_string(index=False)}")
+
+        rows = predictions[['id', 'term', 'predicted_enrollment']].astype({'id': str, 'predicted_enrollment': 'int8'})
+        rows = rows.assign(model_version=model_version)
+
+        report = {'written': [], 'unchanged': [], 'rows_written': 0}
+        for term, new_rows in rows.groupby('term', sort=True):
+            path = self.partition_path(term)
+            partition = new_rows
+            if path.exists():
+                # Keep the stored rows of students missing from this batch
+                existing = pd.read_parquet(path)
+                partition = pd.concat([existing[~existing['id'].isin(new_rows['id'])], new_rows])
+            partition = partition[STORE_COLUMNS].sort_values('id', ignore_index=True)
+
+            # Skip partitions whose keys, predictions, and model version are all unchanged
+            if path.exists() and partition.equals(existing):
+                report['unchanged'].append(term)
+                continue
+
+            self._write(partition, path)
+            self.manifest[str(term)] = {
+                'file': path.name,
+                'rows': len(partition),
+                'model_versions': sorted(partition['model_version'].unique().tolist()),
+                'updated': datetime.now().isoformat(timespec='microseconds')
+            }
+            report['written'].append(term)
+            report['rows_written'] += len(partition)
+
+        if report['written']:
+            self.manifest_path.write_text(json.dumps(self.manifest, indent=2))
+        return report
+
+    @staticmethod
+    def print_report(report):
+        print(f"Prediction store: wrote {report['rows_written']:,} rows in terms {report['written']}, "
+              f"{len(report['unchanged'])} terms unchanged")
+
+    def changed_since(self, timestamp):
+        """
+        Returns the terms whose partition was written after timestamp, in the manifest's ISO format.
+        """
+        return [term for term, entry in self.manifest.items() if entry['updated'] > timestamp]
+
+    def read(self, terms=None):
+        """
+        Returns the stored predictions of the given terms, or of every term.
+        """
+        terms = list(self.manifest) if terms is None else [str(term) for term in terms]
+        partitions = [pd.read_parquet(self.store_folder / self.manifest[term]['file']) for term in terms]
+        if not partitions:
+            return pd.DataFrame(columns=STORE_COLUMNS)
+
+        return pd.concat(partitions, ignore_index=True)
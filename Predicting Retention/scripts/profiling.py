@@ -0,0 +1,238 @@
+# profiling.py
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from sklearn.base import BaseEstimator, TransformerMixin
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+def frame_memory(df):
+    """
+    Returns the memory used by a dataframe in bytes, including the Python strings it holds.
+    """
+    return int(df.memory_usage(deep=True).sum())
+
+def resident_memory():
+    """
+    Returns the process's current resident set size in bytes, or None when it cannot be read.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def peak_memory():
+    """
+    Returns the process's peak resident set size in bytes, or None when it cannot be read.
+    """
+    if psutil is not None and hasattr(psutil.Process().memory_info(), 'peak_wset'):
+        return psutil.Process().memory_info().peak_wset
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def memory_report(label, df=None):
+    """
+    Prints the dataframe's memory with the process's resident and peak memory, all in MB.
+
+    Parameters:
+        label (str): Label printed at the start of the line.
+        df (pd.DataFrame, optional): Dataframe to measure.
+
+    Returns:
+        dict: The measurements in bytes, with None for anything that could not be read.
+    """
+    report = {
+        'frame': frame_memory(df) if df is not None else None,
+        'resident': resident_memory(),
+        'peak': peak_memory()
+    }
+    in_mb = {key: 'n/a' if value is None else f'{value / 1024**2:,.1f} MB' for key, value in report.items()}
+    print(f"{label}: frame {in_mb['frame']}, resident {in_mb['resident']}, peak {in_mb['peak']}")
+
+    return report
+
+class RunLog:
+    """
+    Records the wall time, CPU time, memory, and row and column counts of each instrumented step,
+    appending one JSON line per step to log_path.
+
+    Allocations are traced with tracemalloc while the log is open, so each step's peak is measured from
+    its own start rather than from the process-wide high-water mark. Tracing slows allocation-heavy steps,
+    so compare wall times between profiled runs only.
+
+    Parameters:
+        log_path (str or Path, optional): JSONL file the records are appended to. Records are only kept
+                                          in memory when it is None.
+        run_id (str, optional): Identifies the run in the log. Defaults to the start time.
+    """
+    def __init__(self, log_path=None, run_id=None):
+        self.log_path = Path(log_path) if log_path is not None else None
+        self.run_id = run_id or time.strftime('%Y%m%dT%H%M%S')
+        self.records = []
+        self.expected = []
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Only stop tracing on close if this log started it
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def close(self):
+        """
+        Stops tracing allocations, unless tracing was already on when the log was opened.
+        """
+        if self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.started_tracing = False
+
+    def measure(self, name, func, *args, **kwargs):
+        """
+        Calls func(*args, **kwargs), records its measurements under name, and returns its output.
+        The first argument is taken as the step's input when it is a dataframe.
+        """
+        X = args[0] if args and hasattr(args[0], 'shape') else None
+        tracemalloc.reset_peak()
+        traced_before, resident_before = tracemalloc.get_traced_memory()[0], resident_memory()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+
+        output = func(*args, **kwargs)
+
+        wall, cpu = time.perf_counter() - start_wall, time.process_time() - start_cpu
+        traced_peak, resident_after = tracemalloc.get_traced_memory()[1], resident_memory()
+        rows_in, cols_in = X.shape if X is not None else (None, None)
+        rows_out, cols_out = output.shape if hasattr(output, 'shape') and output.ndim == 2 else (None, None)
+
+        record = {
+            'run_id': self.run_id,
+            'step': name,
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'peak_delta_mb': _mb_delta(traced_before, traced_peak),
+            'resident_delta_mb': _mb_delta(resident_before, resident_after),
+            'rows_in': rows_in,
+            'cols_in': cols_in,
+            'rows_out': rows_out,
+            'cols_out': cols_out,
+            'fan_out': round(rows_out / rows_in, 4) if rows_in and rows_out is not None else None
+        }
+        self.records.append(record)
+        if self.log_path is not None:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+        return output
+
+    def summary(self):
+        """
+        Prints one line per recorded step. Pipeline steps that were not recorded, because their output
+        came from the stage cache, are listed as cached.
+        """
+        records = {record['step']: record for record in self.records}
+        names = list(records) + [step for step in self.expected if step not in records]
+        width = max([len(name) for name in names] + [4])
+
+        print(f"{'step':<{width}} {'wall_s':>8} {'cpu_s':>8} {'peak_mb':>8} {'rows_in':>10} {'rows_out':>10} {'cols':>5} {'fan_out':>8}")
+        for name in names:
+            if name not in records:
+                print(f"{name:<{width}} {'cached':>8}")
+                continue
+            record = records[name]
+            fmt = lambda value, spec: 'n/a' if value is None else format(value, spec)
+            print(f"{name:<{width}} {record['wall_s']:>8.3f} {record['cpu_s']:>8.3f} {fmt(record['peak_delta_mb'], '.1f'):>8} "
+                  f"{fmt(record['rows_in'], ','):>10} {fmt(record['rows_out'], ','):>10} {fmt(record['cols_out'], 'd'):>5} "
+                  f"{fmt(record['fan_out'], '.3f'):>8}")
+
+        total = sum(record['wall_s'] for record in self.records)
+        print(f"{'total':<{width}} {total:>8.3f}")
+
+def _mb_delta(before, after):
+    return None if before is None or after is None else round((after - before) / 1024**2, 1)
+
+# Run log that instrumented steps record to, or None when instrumentation is off
+_active_run_log = None
+
+def start_run_log(log_path=None, run_id=None):
+    """
+    Turns instrumentation on and returns the RunLog every instrumented step records to.
+    """
+    global _active_run_log
+    if _active_run_log is not None:
+        _active_run_log.close()
+    _active_run_log = RunLog(log_path, run_id)
+    return _active_run_log
+
+def stop_run_log():
+    """
+    Turns instrumentation off.
+    """
+    global _active_run_log
+    if _active_run_log is not None:
+        _active_run_log.close()
+    _active_run_log = None
+
+def active_run_log():
+    """
+    Returns the RunLog instrumented steps record to, or None when instrumentation is off.
+    """
+    return _active_run_log
+
+def instrumented(name, func, *args, **kwargs):
+    """
+    Calls func(*args, **kwargs), recording it under name when instrumentation is on. When it is off,
+    this is a plain call.
+    """
+    if _active_run_log is None:
+        return func(*args, **kwargs)
+
+    return _active_run_log.measure(name, func, *args, **kwargs)
+
+class InstrumentedStep(BaseEstimator, TransformerMixin):
+    """
+    Pipeline step that records the wrapped step's transform when instrumentation is on.
+
+    The run log is not a parameter, so the stage cache key of the wrapped step does not change from
+    run to run or when instrumentation is turned on.
+
+    Parameters:
+        step: The wrapped transformer.
+        name (str): Name the step is recorded under.
+    """
+    def __init__(self, step, name):
+        self.step = step
+        self.name = name
+
+    def fit(self, X, y=None):
+        self.step.fit(X, y)
+        return self
+
+    def transform(self, X):
+        return instrumented(self.name, self.step.transform, X)
+
+def instrument_steps(steps):
+    """
+    Wraps each (name, step) pair of a pipeline in InstrumentedStep, and lists the steps in the active
+    run log so the summary can show which of them came from the stage cache.
+    """
+    if _active_run_log is not None:
+        _active_run_log.expected.extend(name for name, _ in steps)
+
+    return [(name, InstrumentedStep(step, name)) for name, step in steps]
@@ -1,20 +1,56 @@
-from pathlib import Path
+import argparse
 import joblib
 from data_preparation import load_and_prepare_data
 from model_training import train_xgboost_model
+from encoding import make_model_bundle
+from native_model import save_native_model
+from incremental_training import incremental_update, print_update_report
 from model_parameters import (
     PARAMS,
+    HALVING_OPTIONS,
+    INCREMENTAL_OPTIONS,
     DATA_PATH,
     MODEL_PATH
 )
 
-def run_pipeline(data_path=None, model_path=None):
+def save_model(bundle, model_path):
+    """
+    Saves the model bundle as a .pkl file, and its booster in XGBoost's native format with a metadata sidecar.
+    """
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    print(f"Saving the trained model to {model_path}...")
+    joblib.dump(bundle, model_path)
+
+    # Save the booster in XGBoost's native format with a metadata sidecar for fast-start scoring
+    booster_path, metadata_path = save_native_model(bundle, model_path)
+    print(f"Saved the native model to {booster_path} and {metadata_path}")
+
+def thread_report_path(model_path):
+    """
+    Returns the path of the JSON lines file next to the model that records each training run's thread split.
+    """
+    return model_path.with_name(f'{model_path.stem}.threads.jsonl')
+
+def run_pipeline(data_path=None, model_path=None, compact=False, search='grid', search_options=None, cores=None,
+                 thread_policy='balanced', incremental=False, new_terms=None, incremental_options=None):
     """
     Runs the training pipeline.
 
     Parameters:
     - data_path (str or Path, optional): Path to the dataset file. Defaults to a predefined path.
     - model_path (str or Path, optional): Path to save the trained model. Defaults to a predefined path.
+    - compact (bool, optional): Load the data with compact dtypes and report memory before and after.
+    - search (str, optional): 'grid' for the exhaustive grid search, 'cached_grid' for the same search on quantized fold
+      matrices built once, or 'halving' for a budgeted successive halving search.
+    - search_options (dict, optional): Options of the halving search. Defaults to HALVING_OPTIONS.
+    - cores (int, optional): Core budget of the search. Defaults to the cores available to the process.
+    - thread_policy (str or tuple, optional): Split of the cores between concurrent fits and XGBoost threads per fit.
+    - incremental (bool, optional): Continue boosting the saved model on the newly labelled terms instead of
+      retraining it, falling back to a full retrain if its holdout metrics degrade or there is no saved model.
+    - new_terms (list, optional): Terms added by an incremental update. Defaults to the terms in the data the saved
+      model was not trained on.
+    - incremental_options (dict, optional): Extra rounds, holdout size, and tolerance of the incremental update.
+      Defaults to INCREMENTAL_OPTIONS.
 
     Returns:
     - best_model: The trained model.
@@ -28,23 +64,85 @@ def run_pipeline(data_path=None, model_path=None):
 
     # Load and prepare data
     print(f"Loading and preparing data from {data_path}...")
-    data = load_and_prepare_data(data_path)
+    data = load_and_prepare_data(data_path, compact=compact, keep_term=True)
+
+    # Refresh the saved model with the new terms, keeping it only if its holdout metrics hold up
+    if incremental:
+        if model_path.exists():
+            bundle = joblib.load(model_path)
+            updated, report = incremental_update(data, bundle, response='enrolled', new_terms=new_terms, cores=cores,
+                                                 **(incremental_options or INCREMENTAL_OPTIONS))
+            print_update_report(report)
+            if report['up_to_date']:
+                updated = bundle
+            elif updated is not None:
+                save_model(updated, model_path)
+            if updated is not None:
+                print("Training pipeline completed successfully!")
+                best_model = updated['model']
+                best_params = {key: best_model.get_params()[key] for key in PARAMS}
+                best_params['n_estimators'] = best_model.get_booster().num_boosted_rounds()
+                return best_model, best_params
+        else:
+            print(f"No saved model at {model_path}.")
+        print("Falling back to a full retrain...")
+
+    # Record the terms the model is trained on, so an incremental update only adds terms it has not seen
+    terms = data['term'].unique()
+    data = data.drop('term', axis=1)
 
     # Define model params
     params = PARAMS
 
     # Train the model
     print("Training the model...")
-    best_model, best_params = train_xgboost_model(data, response='enrolled', params=params)
+    if search_options is None:
+        search_options = HALVING_OPTIONS
+    best_model, best_params, encoders = train_xgboost_model(data, response='enrolled', params=params, search=search,
+                                                            search_options=search_options, cores=cores,
+                                                            thread_policy=thread_policy,
+                                                            thread_report_path=thread_report_path(model_path))
 
-    # Save the trained model
-    model_path.parent.mkdir(parents=True, exist_ok=True)
-    print(f"Saving the trained model to {model_path}...")
-    joblib.dump(best_model, model_path)
+    # Save the trained model bundled with its feature list and encoding tables
+    bundle = make_model_bundle(best_model, data.drop('enrolled', axis=1).columns, encoders, terms=terms)
+    save_model(bundle, model_path)
 
     print("Training pipeline completed successfully!")
     return best_model, best_params
 
 if __name__ == "__main__":
-    run_pipeline()
+    parser = argparse.ArgumentParser(description="Train the retention model.")
+    parser.add_argument("--compact", action="store_true", help="Load the data with compact dtypes.")
+    parser.add_argument("--search", choices=['grid', 'cached_grid', 'halving'], default='grid',
+                        help="Exhaustive grid search, the same search on reused quantized fold matrices, "
+                             "or successive halving with early stopping and a budget.")
+    parser.add_argument("--max-minutes", type=float, default=HALVING_OPTIONS['max_seconds'] / 60,
+                        help="Wall-clock budget of the halving search.")
+    parser.add_argument("--max-fits", type=int, default=HALVING_OPTIONS['max_fits'],
+                        help="Budget on the number of models the halving search trains.")
+    parser.add_argument("--cores", type=int, default=None, help="Core budget of the search. Defaults to every available core.")
+    parser.add_argument("--thread-policy", default='balanced',
+                        help="Split of the cores between concurrent fits and XGBoost threads per fit: outer, inner, "
+                             "balanced, auto, or an explicit OUTERxINNER such as 4x2.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Continue boosting the saved model on the newly labelled terms, falling back to a full "
+                             "retrain if its holdout metrics degrade.")
+    parser.add_argument("--new-terms", type=int, nargs='+', default=None,
+                        help="Terms added by --incremental. Defaults to the terms the saved model was not trained on. "
+                             "Terms it was trained on are skipped.")
+    parser.add_argument("--extra-rounds", type=int, default=INCREMENTAL_OPTIONS['extra_rounds'],
+                        help="Boosting rounds added by --incremental.")
+    parser.add_argument("--tolerance", type=float, default=INCREMENTAL_OPTIONS['tolerance'],
+                        help="How much worse than the saved model each holdout metric of --incremental may be.")
+    args = parser.parse_args()
+
+    thread_policy = args.thread_policy
+    if 'x' in thread_policy:
+        thread_policy = tuple(int(n) for n in thread_policy.split('x'))
+
+    options = {**HALVING_OPTIONS, 'max_seconds': args.max_minutes * 60, 'max_fits': args.max_fits}
+    incremental_options = {**INCREMENTAL_OPTIONS, 'extra_rounds': args.extra_rounds, 'tolerance': args.tolerance}
+    run_pipeline(compact=args.compact, search=args.search, search_options=options, cores=args.cores,
+                 thread_policy=thread_policy, incremental=args.incremental, new_terms=args.new_terms,
+                 incremental_options=incremental_options)
 
@@ -0,0 +1,259 @@
+# scoring_server.py
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from prediction import MODEL_FEATURES, CAT_FEATURES, load_model_bundle, preprocess_data
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-student requests into batches before they reach the model.
+
+    A batch is scored once it holds max_batch students, or max_wait seconds after its first
+    student arrived, whichever comes first.
+
+    Parameters:
+        score_batch (callable): Function that takes a list of student dicts and returns one probability each.
+        max_batch (int): Largest number of students scored together.
+        max_wait (float): Longest time in seconds a student waits for the batch to fill.
+        prepare (callable, optional): Validates and coerces a student dict before it is queued. Its errors
+                                      fail only that student's request, not the batch it would have joined.
+    """
+    def __init__(self, score_batch, max_batch=64, max_wait=0.005, prepare=None):
+        self.score_batch = score_batch
+        self.prepare = prepare
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = asyncio.Queue()
+        self.batch_sizes = deque(maxlen=10_000)
+
+    async def submit(self, student):
+        if self.prepare is not None:
+            student = self.prepare(student)
+        future = asyncio.get_running_loop().create_future()
+        await self.pending.put((student, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Wait for the first student, then collect more until the batch is full or the wait is over
+            batch = [await self.pending.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Score on a worker thread so the event loop keeps accepting requests
+            students = [student for student, _ in batch]
+            try:
+                probabilities = await loop.run_in_executor(None, self.score_batch, students)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.batch_sizes.append(len(batch))
+            for (_, future), probability in zip(batch, probabilities):
+                if not future.done():
+                    future.set_result(float(probability))
+
+class LatencyStats:
+    """
+    Keeps the latency of recent requests and the request count since the server started.
+    """
+    def __init__(self, window=10_000):
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+        self.requests += 1
+
+    def summary(self, batch_sizes=()):
+        latencies_ms = np.array(self.latencies) * 1000
+        uptime = time.perf_counter() - self.started
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'uptime_s': round(uptime, 3),
+            'throughput_rps': round(self.requests / uptime, 1) if uptime else 0.0,
+            'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3) if len(latencies_ms) else None,
+            'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3) if len(latencies_ms) else None,
+            'mean_batch_size': round(float(np.mean(batch_sizes)), 2) if len(batch_sizes) else None
+        }
+
+def prepare_student(student, features):
+    """
+    Returns one student's features as a dict the batch scorer can use, or raises ValueError or TypeError.
+
+    Missing features and JSON nulls become NaN, so a missing category is encoded as 'nan' like in training
+    and prediction.py, and numeric features are converted to floats. A batch's columns then have the same
+    dtypes whichever students it holds.
+    """
+    if not isinstance(student, dict):
+        raise TypeError(f"Each student must be a JSON object, not {type(student).__name__}.")
+
+    prepared = {}
+    for col in features:
+        value = student.get(col)
+        if value is None:
+            prepared[col] = np.nan
+        elif col in CAT_FEATURES:
+            prepared[col] = value
+        else:
+            try:
+                prepared[col] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Feature '{col}' must be a number or null, not {value!r}.") from None
+
+    return prepared
+
+def make_batch_scorer(bundle):
+    """
+    Returns a function that scores a list of student dicts from prepare_student() with the bundled model
+    and encoders.
+    """
+    model, encoders = bundle['model'], bundle['encoders']
+    features = bundle['features'] or MODEL_FEATURES
+
+    # Fitting an encoder on each micro-batch would make a student's codes depend on the rest of the batch
+    if encoders is None:
+        raise ValueError("The model was saved without its encoding tables, so the server cannot encode single "
+                         "students consistently. Retrain it with run_training.py to bundle them.")
+
+    def score_batch(students):
+        batch = pd.DataFrame.from_records(students, columns=features)
+        return model.predict_proba(preprocess_data(batch, features, CAT_FEATURES, encoders))[:, 1]
+
+    return score_batch
+
+async def read_request(reader):
+    """
+    Reads one HTTP/1.1 request. Returns (method, path, body), or None when the client closed the connection.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return method, path, body
+
+def http_response(status, payload):
+    body = json.dumps(payload).encode()
+    head = (f'HTTP/1.1 {status}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\nConnection: keep-alive\r\n\r\n')
+    return head.encode() + body
+
+class ScoringServer:
+    """
+    Long-lived local scoring service that loads the model once.
+
+    Routes:
+        POST /score: Body is one student's features as a JSON object, or a list of them. Returns the
+                     probability of enrolling and the predicted enrollment for each.
+        GET /stats:  Returns request count, throughput, p50/p99 latency, and mean batch size.
+
+    Parameters:
+        bundle (dict): Model bundle from prediction.load_model_bundle().
+        max_batch (int): Largest number of students scored together.
+        max_wait (float): Longest time in seconds a request waits for its batch to fill.
+        threshold (float): Probability above which a student is predicted to enroll, as in model.predict().
+    """
+    def __init__(self, bundle, max_batch=64, max_wait=0.005, threshold=0.5):
+        features = bundle['features'] or MODEL_FEATURES
+        self.batcher = MicroBatcher(make_batch_scorer(bundle), max_batch=max_batch, max_wait=max_wait,
+                                    prepare=lambda student: prepare_student(student, features))
+        self.stats = LatencyStats()
+        self.threshold = threshold
+
+    async def score(self, body):
+        students = json.loads(body)
+        single = isinstance(students, dict)
+        if single:
+            students = [students]
+
+        probabilities = await asyncio.gather(*(self.batcher.submit(student) for student in students))
+        results = [{'probability': p, 'predicted_enrollment': int(p > self.threshold)} for p in probabilities]
+
+        return results[0] if single else results
+
+    async def handle(self, reader, writer):
+        try:
+            while (request := await read_request(reader)) is not None:
+                method, path, body = request
+                start = time.perf_counter()
+                if method == 'POST' and path == '/score':
+                    try:
+                        response = http_response('200 OK', await self.score(body))
+                        self.stats.record(time.perf_counter() - start)
+                    except (ValueError, KeyError, TypeError) as error:
+                        self.stats.errors += 1
+                        response = http_response('400 Bad Request', {'error': str(error)})
+                    except Exception as error:
+                        # Scoring failures, e.g. from XGBoost, still get a response
+                        self.stats.errors += 1
+                        response = http_response('500 Internal Server Error', {'error': str(error)})
+                elif method == 'GET' and path == '/stats':
+                    response = http_response('200 OK', self.stats.summary(self.batcher.batch_sizes))
+                else:
+                    response = http_response('404 Not Found', {'error': f'No route for {method} {path}'})
+
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_socket=None):
+        batcher_task = asyncio.create_task(self.batcher.run())
+        if unix_socket is not None:
+            server = await asyncio.start_unix_server(self.handle, path=unix_socket)
+            print(f"Scoring server listening on {unix_socket}")
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            print(f"Scoring server listening on http://{host}:{port}")
+
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                batcher_task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve retention scores for single students on localhost.")
+    parser.add_argument("--model-path", type=Path, default=Path.cwd() / 'models/xgb_retention_model.pkl')
+    parser.add_argument("--host", default='127.0.0.1')
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix-socket", default=None, help="Listen on this Unix socket instead of TCP.")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    try:
+        server = ScoringServer(load_model_bundle(args.model_path), max_batch=args.max_batch,
+                               max_wait=args.max_wait_ms / 1000)
+    except ValueError as error:
+        parser.error(str(error))
+    asyncio.run(server.serve(args.host, args.port, args.unix_socket))
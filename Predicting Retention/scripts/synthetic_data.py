@@ -0,0 +1,211 @@
+# synthetic_data.py
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Labels and probabilities of each generated category column. Pass overrides to make_extracts() to
+# change any of them, e.g. {'loc': {'V': 0.6, 'M': 0.4}}.
+DISTRIBUTIONS = {
+    'status': {'AS': 0.92, 'IS': 0.08},
+    'stype': {'C': 0.55, 'N': 0.25, 'T': 0.12, 'H': 0.08},
+    'resd': {'I': 0.62, 'O': 0.36, 'Z': 0.02},
+    'degcode': {'AA': 0.35, 'AS': 0.30, 'AAS': 0.25, 'CERT': 0.10},
+    'majr_desc1': {'Nursing': 0.18, 'Business': 0.16, 'Welding': 0.10, 'General Studies': 0.30,
+                   'Agriculture': 0.08, 'Criminal Justice': 0.08, 'Undeclared': 0.10},
+    'gender': {'F': 0.52, 'M': 0.45, None: 0.03},
+    'mrtl': {'S': 0.80, 'M': 0.12, None: 0.08},
+    'ethn_desc': {'White': 0.55, 'Hispanic': 0.20, 'Black': 0.10, 'Asian': 0.03, 'Two or More': 0.04,
+                  'DO NOT USE - Hispanic': 0.02, None: 0.06},
+    'cnty_desc1': {'Barton': 0.45, 'Ellis': 0.15, 'Sedgwick': 0.12, 'Rice': 0.10, 'Out of State': 0.15, None: 0.03},
+    'loc': {'V': 0.35, 'M': 0.55, 'C': 0.10},
+    'pell_nopell': {'NO PELL': 0.30, 'PELL': 0.25, 'Subsidized': 0.20, 'Unsubsidized': 0.15,
+                    'Summer Plus': 0.05, 'Kansas Promise': 0.05}
+}
+
+# Residency description of each residency code
+RESD_DESC = {'I': 'In County', 'O': 'Out of State', 'Z': 'Unknown'}
+
+def draw(rng, distribution, size):
+    """
+    Draws size labels from a {label: probability} distribution, normalizing the probabilities.
+    """
+    labels = np.array(list(distribution.keys()), dtype = object)
+    p = np.array(list(distribution.values()), dtype = float)
+    return labels[rng.choice(len(labels), size, p = p / p.sum())]
+
+def make_extracts(n_students, n_terms = 5, first_year = 2019, distributions = None, retention = 0.55,
+                  fully_online = 0.2, missing_ages = 0.0, seed = 101):
+    """
+    Generates synthetic Banner extracts with the columns load_csv_files() expects. No real student's data is used.
+
+    Each student starts in one of the Fall terms and returns the next Fall with a probability that rises with
+    their term GPA and credit hours, so the retention labels have a signal for the model to learn.
+
+    Parameters:
+        n_students (int): Number of distinct students across all terms.
+        n_terms (int): Number of consecutive Fall terms.
+        first_year (int): Year of the first Fall term.
+        distributions (dict, optional): Overrides of DISTRIBUTIONS.
+        retention (float): Fall to Fall retention of a student with a 2.0 term GPA and 12 credit hours.
+        fully_online (float): Share of students who take every class online.
+        missing_ages (float): Share of enrollment rows with a blank AGE.
+        seed (int): Random seed.
+
+    Returns:
+        dict: 'enrollment', 'gpa', 'pell' and 'location' map each term to its extract, and 'high_school'
+              is a single extract. 'semesters' and 'years' are the term codes and two digit years.
+    """
+    rng = np.random.default_rng(seed)
+    dists = {**DISTRIBUTIONS, **(distributions or {})}
+    terms = [int(f'{first_year + i}80') for i in range(n_terms)]
+
+    # Attributes that stay the same from term to term
+    students = pd.DataFrame({
+        'ID': np.char.add('@', np.char.zfill(np.arange(1, n_students + 1).astype(str), 8)),
+        'PIDM': np.arange(100_001, 100_001 + n_students, dtype = np.int64),
+        'start': rng.integers(0, n_terms, n_students),
+        'age_at_start': np.clip(np.rint(rng.gamma(2.0, 4.0, n_students) + 16), 15, 70).astype(int),
+        'ability': rng.normal(2.8, 0.8, n_students),
+        'online': rng.random(n_students) < fully_online,
+        'aid_rows': rng.poisson(1.3, n_students)
+    })
+    for col in ['STATUS', 'STYPE', 'RESD', 'DEGCODE', 'MAJR_DESC1', 'GENDER', 'MRTL', 'ETHN_DESC', 'CNTY_DESC1']:
+        students[col] = draw(rng, dists[col.lower()], n_students)
+    students['RESD_DESC'] = students['RESD'].map(RESD_DESC)
+    students['STYP'] = students['STYPE']
+
+    extracts = {'enrollment': {}, 'gpa': {}, 'pell': {}, 'location': {}}
+    active = students['start'].to_numpy() == 0
+    earned = np.zeros(n_students)
+    for i, term in enumerate(terms):
+        idx = np.flatnonzero(active)
+        k = len(idx)
+        cohort = students.iloc[idx]
+
+        # Enrollment
+        totcr = rng.integers(3, 19, k)
+        enrollment = cohort[['PIDM', 'ID', 'STATUS', 'STYPE', 'RESD_DESC', 'DEGCODE', 'MAJR_DESC1',
+                             'GENDER', 'MRTL', 'ETHN_DESC', 'CNTY_DESC1', 'STYP', 'RESD']].copy()
+        enrollment.insert(0, 'TERM', term)
+        enrollment.insert(2, 'AGE', cohort['age_at_start'].to_numpy() + i - cohort['start'].to_numpy())
+        enrollment.insert(4, 'TOTCR', totcr)
+        if missing_ages:
+            enrollment['AGE'] = enrollment['AGE'].where(rng.random(k) >= missing_ages)
+        extracts['enrollment'][term] = enrollment.reset_index(drop = True)
+
+        # GPA and credit hours, which are only pulled for terms that have finished
+        term_gpa = np.clip(cohort['ability'].to_numpy() + rng.normal(0, 0.6, k), 0, 4).round(2)
+        term_earned = np.where(term_gpa < 1.0, np.minimum(rng.integers(0, 4, k), totcr), totcr)
+        earned[idx] += term_earned
+        inst_gpa = np.clip((term_gpa + cohort['ability'].to_numpy()) / 2, 0, 4).round(2)
+        gpa = pd.DataFrame({
+            'STUDENTID': cohort['ID'].to_numpy(),
+            'GPATRM': term,
+            'ACD_STD_DESC': np.select([term_gpa < 1.5, term_gpa < 2.0], ['Academic Probation', 'Academic Warning'],
+                                      'Good Standing'),
+            'TERM_ATT_CRHR': totcr,
+            'TERM_EARN_CRHR': term_earned,
+            'TERM_GPA': term_gpa,
+            'INST_GPA': inst_gpa,
+            'INST_EARNED': earned[idx],
+            'INST_HRS_ATT': earned[idx] + (totcr - term_earned),
+            'OVERALL_GPA': np.where(rng.random(k) < 0.05, np.nan, inst_gpa)
+        })
+        if i < n_terms - 1:
+            extracts['gpa'][term] = gpa
+
+        # One row per class, with fully online students taking every class online
+        n_classes = np.maximum(1, totcr // 3)
+        class_students = np.repeat(np.arange(k), n_classes)
+        loc = draw(rng, dists['loc'], len(class_students))
+        loc[cohort['online'].to_numpy()[class_students]] = 'V'
+        extracts['location'][term] = pd.DataFrame({
+            'ID': cohort['ID'].to_numpy()[class_students],
+            'TERM': term,
+            'CRN': rng.integers(10_000, 100_000, len(class_students)),
+            'LOC': loc
+        })
+
+        # Financial aid offers, some of which were never accepted or paid out
+        aid_students = np.repeat(np.arange(k), cohort['aid_rows'].to_numpy())
+        n_aid = len(aid_students)
+        extracts['pell'][term] = pd.DataFrame({
+            'ID': cohort['ID'].to_numpy()[aid_students],
+            'LOAN_GRANT_TERM': term,
+            'ACCEPT_AMT': np.where(rng.random(n_aid) < 0.1, np.nan, rng.integers(0, 3_500, n_aid)),
+            'PAID_DATE': np.where(rng.random(n_aid) < 0.15, None, f'{str(term)[:4]}-09-15'),
+            'PELL_NOPELL': draw(rng, dists['pell_nopell'], n_aid)
+        })
+
+        # Students return with a probability that rises with GPA and credit hours, and new students start
+        logit = (np.log(retention / (1 - retention)) + 0.9 * (term_gpa - 2.0) + 0.08 * (totcr - 12)
+                 - 0.4 * cohort['online'].to_numpy())
+        returning = np.zeros(n_students, dtype = bool)
+        returning[idx] = rng.random(k) < 1 / (1 + np.exp(-logit))
+        active = returning | (students['start'].to_numpy() == i + 1)
+
+    # High school graduation dates, entered once in each student's first term
+    start_year = first_year + students['start'].to_numpy()
+    grad_year = np.where(rng.random(n_students) < 0.45, start_year, start_year - rng.integers(1, 15, n_students))
+    hs_graddte = pd.Series(pd.to_datetime({'year': grad_year, 'month': 5, 'day': 20})).dt.strftime('%m/%d/%Y')
+    extracts['high_school'] = pd.DataFrame({
+        'STDTID': students['ID'],
+        'TERMENTERED': np.array(terms)[students['start'].to_numpy()],
+        'HSGRADDTE': hs_graddte.where(rng.random(n_students) >= 0.25, None)
+    })
+    extracts['semesters'] = [str(term) for term in terms]
+    extracts['years'] = [term // 100 % 100 for term in terms]
+
+    return extracts
+
+def write_extracts(root, extracts):
+    """
+    Writes the extracts as CSV files in the folder layout main_pipeline.py reads.
+
+    Parameters:
+        root (str or Path): Folder standing in for the repo root. The files go to 'Predicting Retention/Files'
+                            and 'Enrollments/High School Enrollments/Files' under it.
+        extracts (dict): Extracts from make_extracts().
+
+    Returns:
+        dict: Folder of each source, keyed like main_pipeline.main()'s config.
+    """
+    files = Path(root) / 'Predicting Retention/Files'
+    folders = {
+        'enrollment_folder': files / 'Enrollment',
+        'gpa_folder': files / 'GPA and CrHrs',
+        'pell_folder': files / 'Pell and Loan',
+        'online_folder': files / 'Location',
+        'high_school_folder': Path(root) / 'Enrollments/High School Enrollments/Files'
+    }
+    for folder in folders.values():
+        folder.mkdir(parents = True, exist_ok = True)
+
+    for term, df in extracts['enrollment'].items():
+        df.to_csv(folders['enrollment_folder'] / f'{term} Enrollment.csv', index = False)
+    for term, df in extracts['gpa'].items():
+        df.to_csv(folders['gpa_folder'] / f'{term} GPA and Crhrs.csv', index = False)
+    for term, df in extracts['pell'].items():
+        df.to_csv(folders['pell_folder'] / f'{term} Pell and Loan.csv', index = False)
+    for term, df in extracts['location'].items():
+        df.to_csv(folders['online_folder'] / f'{term} Location.csv', index = False)
+    extracts['high_school'].to_csv(folders['high_school_folder'] / 'High School Enrollments.csv', index = False)
+
+    return folders
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic Banner extracts for running the pipeline without student data.")
+    parser.add_argument("root", type = Path, help = "Folder standing in for the repo root.")
+    parser.add_argument("--students", type = int, default = 10_000)
+    parser.add_argument("--terms", type = int, default = 5)
+    parser.add_argument("--first-year", type = int, default = 2019)
+    parser.add_argument("--retention", type = float, default = 0.55)
+    parser.add_argument("--seed", type = int, default = 101)
+    args = parser.parse_args()
+
+    extracts = make_extracts(args.students, n_terms = args.terms, first_year = args.first_year,
+                             retention = args.retention, seed = args.seed)
+    for name, folder in write_extracts(args.root, extracts).items():
+        print(f"{name}: {folder}")
@@ -0,0 +1,154 @@
+# thread_budget.py
+import json
+import math
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, delayed
+
+# Ways of splitting a core budget between concurrent fits (outer) and XGBoost threads per fit (inner)
+#   outer:    One single-threaded fit per core.
+#   inner:    One fit at a time using every core.
+#   balanced: About the square root of the cores for each.
+#   auto:     Whichever split makes the most fits per minute in a short probe.
+THREAD_POLICIES = ('outer', 'inner', 'balanced', 'auto')
+
+def available_cores():
+    """
+    Returns the number of cores this process may run on, which can be fewer than the machine has.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+
+    return os.cpu_count() or 1
+
+def thread_splits(cores):
+    """
+    Returns every (outer, inner) split whose threads fit in the core budget, without duplicates.
+    """
+    return sorted({(outer, cores // outer) for outer in range(1, cores + 1)})
+
+def split_cores(cores, policy='balanced'):
+    """
+    Splits a core budget between outer search parallelism and inner XGBoost threads.
+
+    Parameters:
+        cores (int): Total number of cores the search may use.
+        policy (str): 'outer', 'inner' or 'balanced'. 'auto' is resolved by probe_thread_splits().
+
+    Returns:
+        tuple: Number of concurrent fits and number of XGBoost threads per fit.
+    """
+    if policy == 'outer':
+        return cores, 1
+    if policy == 'inner':
+        return 1, cores
+    if policy == 'balanced':
+        outer = max(1, math.isqrt(cores))
+        return outer, cores // outer
+
+    raise ValueError(f"Unknown thread policy '{policy}', expected one of {THREAD_POLICIES}")
+
+class CPUMeter:
+    """
+    Measures the wall time and CPU time of a block, to report fits per minute and CPU utilization.
+
+    CPU time is the process's, so concurrent fits must run on threads rather than in child processes.
+
+    Parameters:
+        cores (int): Core budget the utilization is measured against.
+    """
+    def __init__(self, cores):
+        self.cores = cores
+        self.fits = 0
+
+    def __enter__(self):
+        self.wall_start, self.cpu_start = time.perf_counter(), time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.wall_start
+        self.cpu_seconds = time.process_time() - self.cpu_start
+
+    def summary(self):
+        return {
+            'fits': self.fits,
+            'seconds': round(self.seconds, 2),
+            'fits_per_minute': round(60 * self.fits / self.seconds, 1) if self.seconds else None,
+            'cpu_utilization': round(self.cpu_seconds / (self.seconds * self.cores), 3) if self.seconds else None
+        }
+
+def probe_thread_splits(X, y, cores, candidate=None, n_rounds=50, fits_per_thread=2, max_rows=20_000, seed=101):
+    """
+    Times a short burst of fits for every split of the core budget.
+
+    Parameters:
+        X (pd.DataFrame): Encoded training features. At most max_rows of them are used.
+        y (pd.Series): Training response.
+        cores (int): Total number of cores the search may use.
+        candidate (dict, optional): XGBoost parameters of the probe fits.
+        n_rounds (int): Boosting rounds of each probe fit.
+        fits_per_thread (int): Probe fits made by each outer thread.
+        max_rows (int): Largest number of rows the probe trains on.
+        seed (int): Random seed of the sample and of every model.
+
+    Returns:
+        tuple: Best (outer, inner) split by fits per minute, and each split's measurements.
+    """
+    if len(X) > max_rows:
+        sample = np.random.default_rng(seed).choice(len(X), max_rows, replace=False)
+        X, y = X.iloc[sample], y.iloc[sample]
+    dtrain = xgb.QuantileDMatrix(X, y)
+    params = {'objective': 'binary:logistic', 'tree_method': 'hist', 'seed': seed, 'max_depth': 4, **(candidate or {})}
+
+    results = []
+    for outer, inner in thread_splits(cores):
+        with CPUMeter(cores) as meter:
+            Parallel(n_jobs=outer, backend='threading')(
+                delayed(xgb.train)({**params, 'nthread': inner}, dtrain, num_boost_round=n_rounds)
+                for _ in range(outer * fits_per_thread)
+            )
+            meter.fits = outer * fits_per_thread
+        results.append({'outer': outer, 'inner': inner, **meter.summary()})
+
+    best = max(results, key=lambda result: result['fits_per_minute'])
+    return (best['outer'], best['inner']), results
+
+def print_thread_report(results):
+    """
+    Prints the measurements of each split as a table.
+    """
+    print(f"{'outer':>6} {'inner':>6} {'fits':>6} {'seconds':>9} {'fits/min':>9} {'cpu_util':>9}")
+    for result in results:
+        print(f"{result['outer']:>6} {result['inner']:>6} {result['fits']:>6} {result['seconds']:>9.2f} "
+              f"{result['fits_per_minute']:>9.1f} {result['cpu_utilization']:>9.1%}")
+
+def save_thread_report(report_path, cores, split, search_stats, probe=None, **details):
+    """
+    Appends one line of JSON with a run's thread split and its measurements, so splits can be compared across runs.
+
+    Parameters:
+        report_path (str or Path): JSON lines file the run is appended to.
+        cores (int): Core budget of the run.
+        split (tuple): (outer, inner) split the run used.
+        search_stats (dict): CPUMeter.summary() of the search.
+        probe (list, optional): Each split's measurements from probe_thread_splits().
+        **details: Other fields to record, e.g. the search and thread policy.
+    """
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'cores': cores,
+        'outer': split[0],
+        'inner': split[1],
+        **details,
+        'search_stats': search_stats,
+        'probe': probe
+    }
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_path, 'a') as f:
+        f.write(json.dumps(record) + '\n')